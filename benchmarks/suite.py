@@ -0,0 +1,129 @@
+""" Offline benchmark suite for the Python side of gphoto2-cffi.
+
+All benchmarks run against :py:class:`gphoto2cffi.simulator.SimulatedLibrary`,
+so no camera needs to be attached. With the default latency and bandwidth
+of zero, the timings consist almost entirely of the overhead of the
+bindings, which makes them suitable for catching regressions in CI.
+
+Usage::
+
+    $ python benchmarks/suite.py [--latency SECONDS] [--bandwidth BYTES/S]
+                                 [--only NAME [NAME ...]]
+"""
+from __future__ import print_function, division
+
+import argparse
+import gc
+import shutil
+import tempfile
+import time
+
+import gphoto2cffi as gp
+from gphoto2cffi import simulator
+
+
+def bench_listing(camera, repeat):
+    """ List all files on a card with several folders. """
+    for _ in range(repeat):
+        files = list(camera.list_all_files())
+    return len(files) * repeat
+
+
+def bench_config(camera, repeat):
+    """ Fetch the full configuration tree. """
+    for _ in range(repeat):
+        camera.config
+    return repeat
+
+
+def bench_status(camera, repeat):
+    """ Read the status information. """
+    for _ in range(repeat):
+        camera.status
+    return repeat
+
+
+def bench_download(camera, repeat):
+    """ Download all files into memory and onto disk. """
+    files = list(camera.list_all_files())
+    target_dir = tempfile.mkdtemp()
+    try:
+        for _ in range(repeat):
+            for idx, fobj in enumerate(files):
+                if idx % 2:
+                    fobj.get_data()
+                else:
+                    fobj.save("{0}/{1}".format(target_dir, fobj.name))
+    finally:
+        shutil.rmtree(target_dir)
+    return len(files) * repeat
+
+
+def bench_capture(camera, repeat):
+    """ Capture images into RAM and download them. """
+    for _ in range(repeat):
+        camera.capture()
+    return repeat
+
+
+def bench_preview(camera, repeat):
+    """ Grab live view frames, the result is given in frames per second. """
+    for _ in range(repeat * 50):
+        camera.get_preview()
+    return repeat * 50
+
+
+BENCHMARKS = (
+    ("listing", bench_listing, 10),
+    ("config", bench_config, 20),
+    ("status", bench_status, 20),
+    ("download", bench_download, 1),
+    ("capture", bench_capture, 20),
+    ("preview", bench_preview, 10))
+
+
+def run(latency=0.0, bandwidth=None, only=None, num_files=2000,
+        file_size=2**18):
+    """ Run the benchmarks and return the results.
+
+    :return:    Tuples of the benchmark name, the total duration in seconds
+                and the number of operations per second
+    :rtype:     list of tuples
+    """
+    results = []
+    for name, func, repeat in BENCHMARKS:
+        if only and name not in only:
+            continue
+        sim = simulator.SimulatedLibrary(
+            cameras=[simulator.SimulatedCamera(num_files=num_files,
+                                               file_size=file_size,
+                                               files_per_folder=500)],
+            latency=latency, bandwidth=bandwidth)
+        with simulator.installed(sim):
+            camera = gp.Camera()
+            start = time.time()
+            num_ops = func(camera, repeat)
+            duration = time.time() - start
+            del camera
+            gc.collect()
+        results.append((name, duration, num_ops / duration))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="Simulated latency per camera call in seconds")
+    parser.add_argument("--bandwidth", type=float, default=None,
+                        help="Simulated transfer speed in bytes/s")
+    parser.add_argument("--only", nargs="+",
+                        choices=[b[0] for b in BENCHMARKS],
+                        help="Only run the specified benchmarks")
+    args = parser.parse_args()
+    print("{0:<10} {1:>10} {2:>12}".format("benchmark", "total [s]", "ops/s"))
+    for name, duration, ops in run(args.latency, args.bandwidth, args.only):
+        print("{0:<10} {1:>10.3f} {2:>12.1f}".format(name, duration, ops))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+""" Microbenchmark for the Python-side overhead of
+:py:class:`gphoto2cffi.backend.LibraryWrapper`.
+
+The wrapped library is replaced by a stub whose functions return
+immediately, so the timings only contain the cost of the attribute lookup
+and the error check. The legacy wrapper that created a new lambda on every
+call is included for comparison.
+
+Usage::
+
+    $ python benchmarks/wrapper_overhead.py [number]
+"""
+from __future__ import print_function, division
+
+import sys
+import timeit
+
+from gphoto2cffi import backend
+
+
+class StubLibrary(object):
+    GP_LOG_DEBUG = 2
+
+    @staticmethod
+    def gp_log_add_func(level, func, data):
+        return 0
+
+    @staticmethod
+    def gp_widget_count_children(widget):
+        return 0
+
+
+class LegacyWrapper(object):
+    """ The wrapper as it was before bindings were cached. """
+    NO_ERROR_CHECK = backend.LibraryWrapper.NO_ERROR_CHECK
+
+    def __init__(self, to_wrap):
+        self._lib = to_wrap
+
+    @staticmethod
+    def _check_error(rval):
+        if rval < 0:
+            raise backend.errors.error_from_code(rval)
+        else:
+            return rval
+
+    def __getattr__(self, name):
+        val = getattr(self._lib, name)
+        if not isinstance(val, int) and name not in self.NO_ERROR_CHECK:
+            return lambda *a, **kw: self._check_error(val(*a, **kw))
+        else:
+            return val
+
+
+def main(number=1000000):
+    stub = StubLibrary()
+    candidates = (
+        ("unwrapped", stub),
+        ("legacy", LegacyWrapper(stub)),
+        ("cached", backend.LibraryWrapper(stub)))
+    for name, lib in candidates:
+        elapsed = min(timeit.repeat(
+            lambda: lib.gp_widget_count_children(None), number=number,
+            repeat=5))
+        print("{0:<10} {1:8.1f} ns/call".format(name, elapsed/number*1e9))
+
+
+if __name__ == '__main__':
+    main(*(int(x) for x in sys.argv[1:]))
@@ -1,7 +1,7 @@
-from .gphoto2 import (Camera, list_cameras, supported_cameras,
+from .gphoto2 import (Camera, CancelToken, list_cameras, supported_cameras,
                       get_library_version)
 
 __version__ = "0.3"
 
-__all__ = [__version__, Camera, list_cameras, supported_cameras,
+__all__ = [__version__, Camera, CancelToken, list_cameras, supported_cameras,
            get_library_version]
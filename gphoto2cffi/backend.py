@@ -1,4 +1,7 @@
 import logging
+import threading
+import time
+from collections import deque, namedtuple
 
 from enum import IntEnum
 
@@ -20,13 +23,26 @@ FILE_TYPES = {
     'audio': _lib.GP_FILE_TYPE_AUDIO}
 
 
-#: Mapping from libgphoto2 types to their appropriate constructor functions.
+#: Mapping from libgphoto2 types to the names of their appropriate
+#: constructor functions.
 CONSTRUCTORS = {
-    "Camera":       _lib.gp_camera_new,
-    "GPPortInfo":   _lib.gp_port_info_new,
-    "CameraList":   _lib.gp_list_new,
-    "CameraAbilitiesList": _lib.gp_abilities_list_new,
-    "GPPortInfoList": _lib.gp_port_info_list_new}
+    "Camera":       "gp_camera_new",
+    "GPPortInfo":   "gp_port_info_new",
+    "CameraList":   "gp_list_new",
+    "CameraAbilitiesList": "gp_abilities_list_new",
+    "GPPortInfoList": "gp_port_info_list_new",
+    "CameraFile":   "gp_file_new"}
+
+#: Mapping from libgphoto2 types to the names of the functions that free
+#: them.
+DESTRUCTORS = {
+    "Camera":       "gp_camera_unref",
+    "CameraList":   "gp_list_free",
+    "CameraAbilitiesList": "gp_abilities_list_free",
+    "GPPortInfoList": "gp_port_info_list_free",
+    "CameraFile":   "gp_file_free",
+    "CameraWidget": "gp_widget_free",
+    "GPContext":    "gp_context_unref"}
 
 
 #: Mapping from libgphoto2 widget type constants to human-readable strings
@@ -81,56 +97,312 @@ def _logging_callback(level, domain, message, data):
     :param message: logging message
     :param data:    Other data in the logging record (unused)
     """
-    domain = ffi.string(domain).decode()
-    message = ffi.string(message).decode()
-    logger = LOGGER.getChild(domain)
-
-    if level not in LOG_LEVELS:
+    if level not in LOG_LEVELS or not LOGGER.isEnabledFor(LOG_LEVELS[level]):
         return
+    domain = ffi.string(domain).decode('utf8', 'replace')
+    message = ffi.string(message).decode('utf8', 'replace')
+    logger = LOGGER.getChild(domain)
     logger.log(LOG_LEVELS[level], message)
 
 
+class LogRecord(namedtuple("LogRecord",
+                           ('created', 'level', 'domain', 'message'))):
+    """ A raw libgphoto2 logging record (:py:attr:`created`,
+        :py:attr:`level`, :py:attr:`domain`, :py:attr:`message`)
+    """
+    pass
+
+
+class LogRingBuffer(object):
+    """ Fixed-size in-memory buffer of the most recent libgphoto2 logging
+        records.
+
+    Records are stored undecoded and appended without locking (appending to
+    a bounded :py:class:`collections.deque` is atomic), so capturing stays
+    cheap until the records are actually needed, e.g. after a failed
+    transfer.
+
+    :param size:    Maximum number of records to keep
+    :param level:   Most verbose libgphoto2 logging level to capture
+    """
+    def __init__(self, size=1000, level=_lib.GP_LOG_DEBUG):
+        self.level = level
+        self._records = deque(maxlen=size)
+
+    def append(self, level, domain, message):
+        """ Store a raw record.
+
+        :param level:   libgphoto2 logging level
+        :param domain:  component the message originates from
+        :param message: logging message
+        """
+        if level <= self.level:
+            self._records.append((time.time(), level, ffi.string(domain),
+                                  ffi.string(message)))
+
+    def dump(self):
+        """ Get the buffered records, oldest first.
+
+        :rtype: list of :py:class:`LogRecord`
+        """
+        return [LogRecord(created, level, domain.decode('utf8', 'replace'),
+                          message.decode('utf8', 'replace'))
+                for created, level, domain, message in list(self._records)]
+
+    def clear(self):
+        """ Discard all buffered records. """
+        self._records.clear()
+
+    def __len__(self):
+        return len(self._records)
+
+
 class LibraryWrapper(object):
     NO_ERROR_CHECK = (
         "gp_log_add_func",
         "gp_context_new",
+        "gp_context_unref",
+        "gp_context_set_progress_funcs",
+        "gp_context_set_cancel_func",
         "gp_list_count",
         "gp_result_as_string",
-        "gp_library_version",)
+        "gp_library_version",
+        "free",)
 
     def __init__(self, to_wrap):
         """ Wrapper around our FFI object that performs error checking.
 
-        Wraps functions inside an anonymous function that checks the inner
-        function's return code for libgphoto2 errors and throws a
+        Wraps functions inside a closure that checks the inner function's
+        return code for libgphoto2 errors and throws a
         :py:class:`gphoto2.errors.GPhoto2Error` if needed.
 
+        The wrapped functions are created on first access and then stored as
+        instance attributes, so subsequent lookups bypass
+        :py:meth:`__getattr__` entirely.
+
         :param to_wrap:     FFI library to wrap
         """
         self._lib = to_wrap
+        # Names of all bindings that were cached as instance attributes
+        self._bound = set()
+        #: :py:class:`gphoto2cffi.metrics.CallMetrics` instance that records
+        #: all calls, `None` if instrumentation is disabled.
+        self.metrics = None
+        #: :py:class:`gphoto2cffi.trace.TraceRecorder` instance that records
+        #: all calls to a trace file, `None` if recording is disabled.
+        self.recorder = None
+
+        #: :py:class:`gphoto2cffi.retry.RetryPolicy` that repeats calls
+        #: failing with transient errors, `None` if retrying is disabled.
+        self.retry_policy = None
+        #: :py:class:`gphoto2cffi.leaks.LeakTracker` that keeps track of
+        #: all native objects, `None` if tracking is disabled.
+        self.leak_tracker = None
+        #: :py:class:`LogRingBuffer` that captures raw logging records,
+        #: `None` if capturing is disabled.
+        self.log_buffer = None
+        self._log_func_id = None
+        self._log_level = None
+        # Most verbose libgphoto2 level that is passed on to `logging`
+        self._forward_level = None
+        self._log_lock = threading.Lock()
 
         # Register logging callback with FFI
         self.logging_cb = ffi.callback(
             "void(GPLogLevel, const char*, const char*, void*)",
-            _logging_callback)
-        self._lib.gp_log_add_func(_lib.GP_LOG_DEBUG, self.logging_cb,
-                                  ffi.NULL)
+            self._log_callback)
+        self.sync_log_level()
+
+    def _log_callback(self, level, domain, message, data):
+        log_buffer = self.log_buffer
+        if log_buffer is not None:
+            log_buffer.append(level, domain, message)
+        forward_level = self._forward_level
+        if forward_level is not None and level <= forward_level:
+            _logging_callback(level, domain, message, data)
+
+    def sync_log_level(self):
+        """ Register the logging callback with libgphoto2 at the level that
+            is actually needed.
+
+        The level follows the effective level of the `libgphoto2` logger
+        and the level of the :py:attr:`log_buffer`, so that messages no one
+        listens to are never passed to Python. It is checked at the start of
+        every camera operation, so changes to the logging configuration take
+        effect with the next operation.
+        """
+        effective = LOGGER.getEffectiveLevel()
+        if effective <= logging.DEBUG:
+            forward_level = _lib.GP_LOG_DEBUG
+        elif effective <= logging.INFO:
+            forward_level = _lib.GP_LOG_VERBOSE
+        elif effective <= logging.ERROR:
+            forward_level = _lib.GP_LOG_ERROR
+        else:
+            forward_level = None
+        level = forward_level
+        if self.log_buffer is not None:
+            level = max(level, self.log_buffer.level) if level is not None \
+                else self.log_buffer.level
+        self._forward_level = forward_level
+        if level == self._log_level:
+            return
+        with self._log_lock:
+            if level == self._log_level:
+                return
+            if self._log_func_id is not None:
+                self._lib.gp_log_remove_func(self._log_func_id)
+                self._log_func_id = None
+            if level is not None:
+                self._log_func_id = self._lib.gp_log_add_func(
+                    level, self.logging_cb, ffi.NULL)
+            self._log_level = level
+
+    def enable_log_buffer(self, size=1000, level=_lib.GP_LOG_DEBUG):
+        """ Capture the most recent raw logging records in memory.
+
+        :param size:    Maximum number of records to keep
+        :param level:   Most verbose libgphoto2 logging level to capture
+        :return:        The buffer records are captured to
+        :rtype:         :py:class:`LogRingBuffer`
+        """
+        self.log_buffer = LogRingBuffer(size, level)
+        self.sync_log_level()
+        return self.log_buffer
+
+    def disable_log_buffer(self):
+        """ Stop capturing raw logging records. """
+        self.log_buffer = None
+        self.sync_log_level()
 
     @staticmethod
-    def _check_error(rval):
-        """ Check a return value for a libgphoto2 error. """
-        if rval < 0:
-            raise errors.error_from_code(rval)
-        else:
+    def _make_checked(func):
+        """ Wrap a function so that its return value is checked for
+            libgphoto2 errors.
+        """
+        def checked(*args):
+            rval = func(*args)
+            if rval < 0:
+                raise errors.error_from_code(rval)
             return rval
+        return checked
+
+    def _clear_bindings(self):
+        """ Drop all cached bindings, they will be rebuilt on next access. """
+        for name in list(self._bound):
+            self.__dict__.pop(name, None)
+        self._bound.clear()
+
+    def use_library(self, to_wrap):
+        """ Replace the wrapped library, e.g. with a
+            :py:class:`gphoto2cffi.simulator.SimulatedLibrary`.
+
+        :param to_wrap:     Library to wrap from now on
+        :return:            The previously wrapped library
+        """
+        if self._log_func_id is not None:
+            self._lib.gp_log_remove_func(self._log_func_id)
+        self._log_func_id = self._log_level = None
+        previous, self._lib = self._lib, to_wrap
+        self._clear_bindings()
+        self.sync_log_level()
+        return previous
+
+    def enable_metrics(self, metrics=None):
+        """ Record call counts, errors and latencies of all library calls.
+
+        :param metrics: Collector to record to, a new one is created if
+                        not specified
+        :type metrics:  :py:class:`gphoto2cffi.metrics.CallMetrics`
+        :return:        The collector that is recorded to
+        """
+        from .metrics import CallMetrics
+        self.metrics = metrics if metrics is not None else CallMetrics()
+        self._clear_bindings()
+        return self.metrics
+
+    def disable_metrics(self):
+        """ Stop recording library calls. """
+        self.metrics = None
+        self._clear_bindings()
+
+    def enable_recording(self, path):
+        """ Record all library calls to a trace file that can be replayed
+            with :py:class:`gphoto2cffi.trace.ReplayLibrary`.
+
+        :param path:    Path of the trace file to write
+        :return:        The recorder
+        :rtype:         :py:class:`gphoto2cffi.trace.TraceRecorder`
+        """
+        from .trace import TraceRecorder
+        self.disable_recording()
+        self.recorder = TraceRecorder(path)
+        self._clear_bindings()
+        return self.recorder
+
+    def disable_recording(self):
+        """ Stop recording library calls and close the trace file. """
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+            self._clear_bindings()
+
+    def enable_retries(self, policy=None):
+        """ Repeat library calls that fail with transient errors.
+
+        :param policy:  Policy to retry calls with, a default one is created
+                        if not specified
+        :type policy:   :py:class:`gphoto2cffi.retry.RetryPolicy`
+        :return:        The policy that is applied
+        """
+        from .retry import RetryPolicy
+        self.retry_policy = policy if policy is not None else RetryPolicy()
+        self._clear_bindings()
+        return self.retry_policy
+
+    def disable_retries(self):
+        """ Stop retrying failed library calls. """
+        self.retry_policy = None
+        self._clear_bindings()
+
+    def enable_leak_tracking(self, tracker=None):
+        """ Keep track of the native objects that are created and freed.
+
+        Only objects created after tracking was enabled are accounted for.
+
+        :param tracker: Tracker to record to, a new one is created if not
+                        specified
+        :type tracker:  :py:class:`gphoto2cffi.leaks.LeakTracker`
+        :return:        The tracker that is recorded to
+        """
+        from .leaks import LeakTracker
+        self.leak_tracker = tracker if tracker is not None else LeakTracker()
+        self._clear_bindings()
+        return self.leak_tracker
+
+    def disable_leak_tracking(self):
+        """ Stop keeping track of native objects. """
+        self.leak_tracker = None
+        self._clear_bindings()
 
     def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
         val = getattr(self._lib, name)
-        if not isinstance(val, int) and name not in self.NO_ERROR_CHECK:
-            return lambda *a, **kw: self._check_error(val(*a, **kw))
-        else:
-            return val
-
+        if not isinstance(val, int):
+            if self.recorder is not None:
+                val = self.recorder.wrap(name, val)
+            if self.leak_tracker is not None:
+                val = self.leak_tracker.wrap(name, val)
+            if self.metrics is not None:
+                val = self.metrics.wrap(name, val)
+            if self.retry_policy is not None:
+                val = self.retry_policy.wrap(name, val)
+            if name not in self.NO_ERROR_CHECK:
+                val = self._make_checked(val)
+        self.__dict__[name] = val
+        self._bound.add(name)
+        return val
 
 
 #: The wrapped library
@@ -9,6 +9,7 @@ SOURCE = """
 #include "gphoto2/gphoto2-version.h"
 #include "gphoto2/gphoto2-context.h"
 #include "gphoto2/gphoto2-camera.h"
+#include <stdlib.h>
 #include <time.h>
 """
 
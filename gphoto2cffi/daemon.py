@@ -0,0 +1,351 @@
+""" Local daemon that shares cameras between processes.
+
+A :py:class:`CameraDaemon` owns the :py:class:`gphoto2cffi.Camera` objects
+and serves requests from any number of :py:class:`CameraClient` instances
+over a Unix domain socket, so the devices are only initialized once and
+several processes (e.g. an ingest service and a live view UI) can use the
+same camera.
+
+Messages consist of a five byte header (an opcode or status byte and the
+length of the body) followed by a small JSON body. File contents and
+preview frames are never sent through the socket: the daemon writes them to
+an anonymous memory file, passes its descriptor along with the response and
+the client maps it into memory.
+
+.. code:: python
+
+    # Daemon process
+    daemon = CameraDaemon("/run/gphoto2.sock")
+    daemon.serve_forever()
+
+    # Client processes
+    client = CameraClient("/run/gphoto2.sock")
+    camera = client.list()[0]['id']
+    frame = client.preview(camera)
+
+Requires Python 3 on a platform that supports passing file descriptors over
+Unix domain sockets.
+"""
+from __future__ import absolute_import
+
+import array
+import json
+import logging
+import mmap
+import os
+import socket
+import socketserver
+import struct
+import tempfile
+import threading
+
+from . import errors
+from .gphoto2 import list_cameras
+
+OP_LIST = 1
+OP_FILES = 2
+OP_CONFIG = 3
+OP_SET_CONFIG = 4
+OP_CAPTURE = 5
+OP_PREVIEW = 6
+OP_DOWNLOAD = 7
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+_HEADER = struct.Struct("!BI")
+_FD_SIZE = array.array("i").itemsize
+
+LOGGER = logging.getLogger(__name__)
+
+# Errors caused by the request or the camera, which are not worth a
+# traceback in the log
+_EXPECTED_ERRORS = (errors.GPhoto2Error, ValueError, LookupError)
+
+
+class DaemonError(Exception):
+    """ The daemon could not carry out a request. """
+    pass
+
+
+def _recv_exactly(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            raise EOFError("Connection closed.")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _send_message(sock, code, body, fd=None):
+    data = json.dumps(body, separators=(',', ':')).encode()
+    message = _HEADER.pack(code, len(data)) + data
+    if fd is None:
+        sock.sendall(message)
+    else:
+        ancillary = [(socket.SOL_SOCKET, socket.SCM_RIGHTS,
+                      array.array("i", [fd]))]
+        sent = sock.sendmsg([message], ancillary)
+        if sent < len(message):
+            sock.sendall(message[sent:])
+
+
+def _recv_message(sock):
+    """ Receive a message along with a file descriptor, if one was sent.
+
+    :return:    Tuple of code, body and file descriptor (or `None`)
+    """
+    header, ancillary, _, _ = sock.recvmsg(
+        _HEADER.size, socket.CMSG_SPACE(_FD_SIZE))
+    if not header:
+        raise EOFError("Connection closed.")
+    if len(header) < _HEADER.size:
+        header += _recv_exactly(sock, _HEADER.size - len(header))
+    fd = None
+    for level, ctype, cdata in ancillary:
+        if level == socket.SOL_SOCKET and ctype == socket.SCM_RIGHTS:
+            fd = array.array("i", cdata[:_FD_SIZE])[0]
+    code, length = _HEADER.unpack(header)
+    body = None
+    if length:
+        body = json.loads(_recv_exactly(sock, length).decode())
+    return code, body, fd
+
+
+def _new_memory_file():
+    """ Create an empty anonymous file and return its descriptor. """
+    if hasattr(os, 'memfd_create'):
+        return os.memfd_create("gphoto2cffi")
+    return os.dup(tempfile.TemporaryFile().fileno())
+
+
+def _memory_file(data):
+    """ Write data to an anonymous file and return its descriptor. """
+    fd = _new_memory_file()
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+    return fd
+
+
+def _config_to_dict(config):
+    out = {}
+    for section, items in config.items():
+        out[section] = {}
+        for name, item in items.items():
+            entry = {'type': item.type, 'value': item.value,
+                     'readonly': item.readonly}
+            if item.type == 'selection':
+                entry['choices'] = item.choices
+            elif item.type == 'range':
+                entry['range'] = list(item.range)
+            out[section][name] = entry
+    return out
+
+
+class _RequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                opcode, body, _ = _recv_message(self.request)
+            except (EOFError, ConnectionError):
+                return
+            fd = None
+            try:
+                result, fd = self.server.daemon.dispatch(opcode, body or {})
+                _send_message(self.request, STATUS_OK, result, fd)
+            except ConnectionError:
+                return
+            except Exception as e:
+                # Any failure is reported, so that the connection stays
+                # usable for further requests
+                if not isinstance(e, _EXPECTED_ERRORS):
+                    LOGGER.error("Request {0} failed".format(opcode),
+                                 exc_info=True)
+                try:
+                    _send_message(self.request, STATUS_ERROR,
+                                  {'error': type(e).__name__,
+                                   'message': str(e)})
+                except ConnectionError:
+                    return
+            finally:
+                if fd is not None:
+                    os.close(fd)
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class CameraDaemon(object):
+    """ Serves the attached cameras over a Unix domain socket.
+
+    :param socket_path: Path of the socket to listen on
+    :param cameras:     Cameras to serve, defaults to all attached cameras
+    :type cameras:      list of :py:class:`gphoto2cffi.Camera`
+    """
+    def __init__(self, socket_path, cameras=None):
+        self.socket_path = socket_path
+        if cameras is None:
+            cameras = list_cameras()
+        self.cameras = {"usb:{0:03},{1:03}".format(*cam._usb_address): cam
+                        for cam in cameras}
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        self._server = _Server(socket_path, _RequestHandler)
+        self._server.daemon = self
+        os.chmod(socket_path, 0o600)
+
+    def serve_forever(self):
+        """ Handle requests until :py:meth:`shutdown` is called. """
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    def start(self):
+        """ Handle requests in a background thread.
+
+        :rtype: :py:class:`threading.Thread`
+        """
+        thread = threading.Thread(target=self.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def shutdown(self):
+        """ Stop handling requests. """
+        self._server.shutdown()
+
+    def dispatch(self, opcode, body):
+        """ Carry out a request.
+
+        :return:    Tuple of the response body and a file descriptor with the
+                    payload (or `None`)
+        """
+        if opcode == OP_LIST:
+            return [{'id': key, 'model': cam.model_name}
+                    for key, cam in sorted(self.cameras.items())], None
+        camera = self.cameras[body['camera']]
+        if opcode == OP_FILES:
+            return [f.path for f in camera.list_all_files()], None
+        elif opcode == OP_CONFIG:
+            return _config_to_dict(camera.config), None
+        elif opcode == OP_SET_CONFIG:
+            camera.config[body['section']][body['name']].set(body['value'])
+            return None, None
+        elif opcode == OP_CAPTURE:
+            if body.get('to_camera_storage'):
+                fobj = camera.capture(to_camera_storage=True)
+                return {'path': fobj.path}, None
+            data = camera.capture()
+            return {'size': len(data)}, _memory_file(data)
+        elif opcode == OP_PREVIEW:
+            data = camera.get_preview()
+            return {'size': len(data)}, _memory_file(data)
+        elif opcode == OP_DOWNLOAD:
+            fobj = camera._file_from_path(body['path'])
+            fd = _new_memory_file()
+            try:
+                # Saved straight into the memory file by libgphoto2
+                with open(fd, 'wb', closefd=False) as fp:
+                    fobj.save_to_file(fp, ftype=body.get('ftype', 'normal'))
+                return {'size': os.fstat(fd).st_size}, fd
+            except BaseException:
+                os.close(fd)
+                raise
+        raise ValueError("Unknown opcode: {0}".format(opcode))
+
+
+class CameraClient(object):
+    """ Client for a :py:class:`CameraDaemon`.
+
+    A client holds a single connection and may be shared between threads.
+
+    :param socket_path: Path of the daemon's socket
+    """
+    def __init__(self, socket_path):
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.connect(socket_path)
+        self._lock = threading.Lock()
+
+    def _request(self, opcode, **body):
+        with self._lock:
+            _send_message(self._sock, opcode, body)
+            status, result, fd = _recv_message(self._sock)
+        if status != STATUS_OK:
+            if fd is not None:
+                os.close(fd)
+            raise DaemonError("{error}: {message}".format(**result))
+        return result, fd
+
+    def _payload(self, opcode, **body):
+        result, fd = self._request(opcode, **body)
+        try:
+            if not result['size']:
+                return b""
+            return mmap.mmap(fd, result['size'], access=mmap.ACCESS_READ)
+        finally:
+            os.close(fd)
+
+    def list(self):
+        """ List the cameras served by the daemon.
+
+        :return:    Dictionaries with the keys `id` and `model`
+        :rtype:     list of dict
+        """
+        return self._request(OP_LIST)[0]
+
+    def list_files(self, camera):
+        """ List the paths of all files on a camera. """
+        return self._request(OP_FILES, camera=camera)[0]
+
+    def config(self, camera):
+        """ Get the writeable configuration of a camera.
+
+        :return:    Mapping from sections to mappings from option names to
+                    dictionaries with the keys `type`, `value`, `readonly`
+                    and, depending on the type, `choices` or `range`
+        :rtype:     dict
+        """
+        return self._request(OP_CONFIG, camera=camera)[0]
+
+    def set_config(self, camera, section, name, value):
+        """ Update a configuration value of a camera. """
+        self._request(OP_SET_CONFIG, camera=camera, section=section,
+                      name=name, value=value)
+
+    def capture(self, camera, to_camera_storage=False):
+        """ Capture an image.
+
+        :return:    The path of the image on the camera if
+                    `to_camera_storage` is set, otherwise the image data
+        :rtype:     str or :py:class:`mmap.mmap`
+        """
+        if to_camera_storage:
+            return self._request(OP_CAPTURE, camera=camera,
+                                 to_camera_storage=True)[0]['path']
+        return self._payload(OP_CAPTURE, camera=camera)
+
+    def preview(self, camera):
+        """ Get a live view frame.
+
+        :rtype: :py:class:`mmap.mmap`
+        """
+        return self._payload(OP_PREVIEW, camera=camera)
+
+    def download(self, camera, path, ftype='normal'):
+        """ Get the content of a file on the camera.
+
+        :rtype: :py:class:`mmap.mmap`
+        """
+        return self._payload(OP_DOWNLOAD, camera=camera, path=path,
+                             ftype=ftype)
+
+    def close(self):
+        """ Close the connection to the daemon. """
+        self._sock.close()
@@ -1,23 +1,38 @@
 from __future__ import unicode_literals, division, absolute_import
 
+import array
+import contextlib
 import functools
+import heapq
 import itertools
 import logging
-import math
 import os
 import re
 import string
 import sys
+import threading
 import time
-from collections import namedtuple
+import weakref
+from collections import OrderedDict, namedtuple
 from datetime import datetime
 
-from . import errors, backend
+from . import errors, backend, metrics, models
 from .backend import ffi, lib
-from .util import SimpleNamespace, get_string, get_ctype, new_gp_object
+from .util import (SimpleNamespace, PriorityRLock, get_string, get_ctype,
+                   new_gp_object, free_gp_object, gc_gp_object, gp_object,
+                   gp_file_from_fd, NativePool, PRIORITY_LOW, PRIORITY_NORMAL,
+                   PRIORITY_HIGH)
 
 if sys.version_info > (3,):
     basestring = str
+    import queue
+    from sys import intern
+else:
+    import Queue as queue
+
+    def intern(value, _interned={}):
+        # The builtin only accepts byte strings
+        return _interned.setdefault(value, value)
 
 
 def get_library_version():
@@ -36,74 +51,92 @@ def list_cameras():
     :return:    All recognized cameras
     :rtype:     list of :py:class:`Camera`
     """
-    ctx = lib.gp_context_new()
-    camlist_p = new_gp_object("CameraList")
-    port_list_p = new_gp_object("GPPortInfoList")
-    lib.gp_port_info_list_load(port_list_p)
-    abilities_list_p = new_gp_object("CameraAbilitiesList")
-    lib.gp_abilities_list_load(abilities_list_p, ctx)
-    lib.gp_abilities_list_detect(abilities_list_p, port_list_p,
-                                 camlist_p, ctx)
+    ctx = gc_gp_object("GPContext", lib.gp_context_new())
     out = []
-    for idx in range(lib.gp_list_count(camlist_p)):
-        name = get_string(lib.gp_list_get_name, camlist_p, idx)
-        value = get_string(lib.gp_list_get_value, camlist_p, idx)
-
-        # Skip iteration if no matches
-        matches = re.match(r"usb:(\d+),(\d+)", value)
-        if not matches:
-            continue
-
-        bus_no, device_no = (int(x) for x in matches.groups())
-        abilities = ffi.new("CameraAbilities*")
-        ability_idx = lib.gp_abilities_list_lookup_model(
-            abilities_list_p, name.encode())
-        lib.gp_abilities_list_get_abilities(abilities_list_p, ability_idx,
-                                            abilities)
-        if abilities.device_type == lib.GP_DEVICE_STILL_CAMERA:
-            out.append(Camera(bus_no, device_no, lazy=True,
-                              _abilities=abilities))
-    lib.gp_list_free(camlist_p)
-    lib.gp_port_info_list_free(port_list_p)
-    lib.gp_abilities_list_free(abilities_list_p)
+    with gp_object("CameraList") as camlist_p, \
+            gp_object("GPPortInfoList") as port_list_p, \
+            gp_object("CameraAbilitiesList") as abilities_list_p:
+        lib.gp_port_info_list_load(port_list_p)
+        lib.gp_abilities_list_load(abilities_list_p, ctx)
+        lib.gp_abilities_list_detect(abilities_list_p, port_list_p,
+                                     camlist_p, ctx)
+        for idx in range(lib.gp_list_count(camlist_p)):
+            name = get_string(lib.gp_list_get_name, camlist_p, idx)
+            value = get_string(lib.gp_list_get_value, camlist_p, idx)
+
+            # Skip iteration if no matches
+            matches = re.match(r"usb:(\d+),(\d+)", value)
+            if not matches:
+                continue
+
+            bus_no, device_no = (int(x) for x in matches.groups())
+            abilities = ffi.new("CameraAbilities*")
+            ability_idx = lib.gp_abilities_list_lookup_model(
+                abilities_list_p, name.encode())
+            lib.gp_abilities_list_get_abilities(abilities_list_p,
+                                                ability_idx, abilities)
+            if abilities.device_type == lib.GP_DEVICE_STILL_CAMERA:
+                out.append(Camera(bus_no, device_no, lazy=True,
+                                  _abilities=abilities))
     return out
 
 
 def supported_cameras():
     """ List the names of all cameras supported by libgphoto2, grouped by the
     name of their driver.
+
+    The names are taken from the cached
+    :py:class:`gphoto2cffi.models.ModelDatabase`, which also provides USB
+    ids and supported operations.
     """
-    ctx = lib.gp_context_new()
-    abilities_list_p = new_gp_object("CameraAbilitiesList")
-    lib.gp_abilities_list_load(abilities_list_p, ctx)
-    abilities = ffi.new("CameraAbilities*")
-    out = []
-    for idx in range(lib.gp_abilities_list_count(abilities_list_p)):
-        lib.gp_abilities_list_get_abilities(abilities_list_p, idx, abilities)
-        if abilities.device_type == lib.GP_DEVICE_STILL_CAMERA:
-            libname = os.path.basename(ffi.string(abilities.library)
-                                       .decode())
-            out.append((ffi.string(abilities.model).decode(), libname))
-    lib.gp_abilities_list_free(abilities_list_p)
-    key_func = lambda name, driver: driver
-    out = sorted(out, key=key_func)
-    return {k: tuple(x[0] for x in v)
-            for k, v in itertools.groupby(out, key_func)}
-    return out
+    out = {}
+    for model in models.get_database():
+        if model.device_type == 'still_camera':
+            out.setdefault(model.driver, []).append(model.model)
+    return {driver: tuple(names) for driver, names in out.items()}
+
+
+#: Locks shared by all :py:class:`Camera` instances for the same device
+_DEVICE_LOCKS = weakref.WeakValueDictionary()
+_DEVICE_LOCKS_GUARD = threading.Lock()
 
 
-def exit_after(meth=None, cam_struc=None):
+def _device_lock(usb_address):
+    """ Get the lock that serializes access to the device at the given USB
+        address.
+    """
+    if usb_address == (None, None):
+        return PriorityRLock()
+    with _DEVICE_LOCKS_GUARD:
+        lock = _DEVICE_LOCKS.get(usb_address)
+        if lock is None:
+            lock = _DEVICE_LOCKS[usb_address] = PriorityRLock()
+        return lock
+
+
+def _release_camera(lock, cam, ctx, address):
+    """ Free a camera once the device lock is available. """
+    with lock:
+        metrics.CAMERA_LABELS.pop(address, None)
+        try:
+            lib.gp_camera_exit(cam, ctx)
+        finally:
+            free_gp_object("Camera", cam)
+
+
+def exit_after(meth=None, cam_struc=None, priority=PRIORITY_NORMAL):
     if meth is None:
-        return functools.partial(exit_after, cam_struc=cam_struc)
+        return functools.partial(exit_after, cam_struc=cam_struc,
+                                 priority=priority)
 
     @functools.wraps(meth)
     def wrapped(self, *args, **kwargs):
-        if not isinstance(self, Camera):
-            cam, ctx = self._cam._cam, self._cam._ctx
-        else:
-            cam, ctx = self._cam, self._ctx
-        rval = meth(self, *args, **kwargs)
-        lib.gp_camera_exit(cam, ctx)
+        camera = self if isinstance(self, Camera) else self._cam
+        # Follow changes to the logging configuration
+        lib.sync_log_level()
+        with camera._lock.held(priority):
+            rval = meth(self, *args, **kwargs)
+            lib.gp_camera_exit(camera._cam, camera._ctx)
         return rval
     return wrapped
 
@@ -131,6 +164,106 @@ class UsbInformation(namedtuple(
     pass
 
 
+class TransferProgress(namedtuple(
+        "TransferProgress", ('current', 'total', 'rate', 'eta'))):
+    """ Progress of a running transfer (:py:attr:`current`,
+        :py:attr:`total`, :py:attr:`rate`, :py:attr:`eta`)
+
+    :py:attr:`current` and :py:attr:`total` are in the units reported by
+    the camera driver, which are bytes for most file transfers.
+    :py:attr:`rate` is given in units per second and :py:attr:`eta` in
+    seconds, the latter is `None` if it cannot be estimated yet.
+    """
+    pass
+
+
+class CancelToken(object):
+    """ Token that allows cancelling a running transfer from another thread.
+
+    Pass it as the `cancel` argument to a transfer method and call
+    :py:meth:`cancel` to abort the transfer, which will then raise
+    :py:class:`gphoto2cffi.errors.OperationCancelled`.
+    """
+    def __init__(self):
+        self._event = threading.Event()
+
+    @property
+    def cancelled(self):
+        """ Whether cancellation was requested. """
+        return self._event.is_set()
+
+    def cancel(self):
+        """ Request cancellation of the transfer. """
+        self._event.set()
+
+    def reset(self):
+        """ Clear the cancellation request so the token can be reused. """
+        self._event.clear()
+
+
+class _TransferMonitor(object):
+    """ Receives the progress and cancellation callbacks of a camera's
+        context and dispatches them to the currently active transfer.
+    """
+    def __init__(self):
+        self.handle = ffi.new_handle(self)
+        self.callback = None
+        self.cancel_token = None
+        self._total = 0
+        self._start_time = None
+
+    @contextlib.contextmanager
+    def watch(self, progress=None, cancel=None):
+        old = (self.callback, self.cancel_token)
+        self.callback, self.cancel_token = progress, cancel
+        try:
+            yield
+        finally:
+            self.callback, self.cancel_token = old
+
+    def start(self, target):
+        self._total = target
+        self._start_time = time.time()
+
+    def update(self, current):
+        if self.callback is None or self._start_time is None:
+            return
+        elapsed = time.time() - self._start_time
+        rate = current / elapsed if elapsed else 0.0
+        eta = (self._total - current) / rate if rate else None
+        self.callback(TransferProgress(current, self._total, rate, eta))
+
+    def stop(self):
+        self._start_time = None
+
+    @property
+    def cancelled(self):
+        return self.cancel_token is not None and self.cancel_token.cancelled
+
+
+@ffi.callback("unsigned int(GPContext*, float, const char*, void*)")
+def _progress_start_callback(context, target, text, data):
+    ffi.from_handle(data).start(target)
+    return 0
+
+
+@ffi.callback("void(GPContext*, unsigned int, float, void*)")
+def _progress_update_callback(context, progress_id, current, data):
+    ffi.from_handle(data).update(current)
+
+
+@ffi.callback("void(GPContext*, unsigned int, void*)")
+def _progress_stop_callback(context, progress_id, data):
+    ffi.from_handle(data).stop()
+
+
+@ffi.callback("GPContextFeedback(GPContext*, void*)")
+def _cancel_callback(context, data):
+    if ffi.from_handle(data).cancelled:
+        return lib.GP_CONTEXT_FEEDBACK_CANCEL
+    return lib.GP_CONTEXT_FEEDBACK_OK
+
+
 class VideoCaptureContext(object):
     """ Context object that allows the stopping of a video capture via the
     :py:meth:`start` method.
@@ -153,12 +286,13 @@ class VideoCaptureContext(object):
 
     def stop(self):
         """ Stop the capture. """
-        self.camera._get_config()['actions']['movie'].set(False)
-        self.videofile = self.camera._wait_for_event(
-            event_type=lib.GP_EVENT_FILE_ADDED)
-        if self._old_captarget != "Memory card":
-            self.camera.config['settings']['capturetarget'].set(
-                self._old_captarget)
+        with self.camera._lock.held(PRIORITY_HIGH):
+            self.camera._get_config()['actions']['movie'].set(False)
+            self.videofile = self.camera._wait_for_event(
+                event_type=lib.GP_EVENT_FILE_ADDED)
+            if self._old_captarget != "Memory card":
+                self.camera.config['settings']['capturetarget'].set(
+                    self._old_captarget)
 
     def __enter__(self):
         return self
@@ -166,30 +300,801 @@ class VideoCaptureContext(object):
     def __exit__(self, exc_type, exc_val, exc_tb):
         if self.videofile is None:
             self.stop()
-        lib.gp_camera_exit(self.camera._cam, self.camera._ctx)
+        with self.camera._lock:
+            lib.gp_camera_exit(self.camera._cam, self.camera._ctx)
+
+
+class TetherContext(object):
+    """ Context object for a tethering session started with
+    :py:meth:`Camera.watch`.
+
+    A listener thread waits for files to be added on the camera, e.g. when
+    the shutter button on the body is pressed, and puts them on a bounded
+    queue. A download thread saves them to the target directory. When the
+    downloads fall behind and the queue is full, the listener stops picking
+    up events until there is room again, so that the camera keeps the files
+    instead of them being dropped on the host.
+
+    Can also be used as a context manager, where the session will be stopped
+    upon leaving.
+
+    :param camera:          Camera to watch
+    :param target_dir:      Directory to save new files to
+    :param delete:          Remove the files from the camera after they were
+                            downloaded
+    :param queue_size:      Maximum number of files waiting for download
+    :param callback:        Called with the :py:class:`File` and the local
+                            path after each download
+    """
+    #: Timeout for a single wait for an event in milliseconds
+    poll_timeout = 100
+
+    def __init__(self, camera, target_dir, delete=False, queue_size=16,
+                 callback=None):
+        #: Camera that is watched
+        self.camera = camera
+        #: Directory new files are saved to
+        self.target_dir = target_dir
+        self.delete = delete
+        self.callback = callback
+        #: Error that ended the session, if any
+        self.error = None
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stopped = threading.Event()
+        self._stats_lock = threading.Lock()
+        self._downloaded = 0
+        self._failed = 0
+        self._last_lag = None
+        self._max_lag = None
+        self._listener = threading.Thread(target=self._listen)
+        self._listener.daemon = True
+        self._downloader = threading.Thread(target=self._download)
+        self._downloader.daemon = True
+        self._downloader.start()
+        self._listener.start()
+
+    @property
+    def running(self):
+        """ Whether the session is still listening for new files. """
+        return self._listener.is_alive()
+
+    @property
+    def stats(self):
+        """ Progress of the session.
+
+        `queue_depth` is the number of files waiting for download, `lag` the
+        time between a file being announced by the camera and its download
+        finishing (for the last file and the maximum so far) and `pending`
+        the age of the oldest file that is still waiting.
+
+        :rtype: :py:class:`SimpleNamespace`
+        """
+        with self._queue.mutex:
+            waiting = [item[2] for item in self._queue.queue
+                       if item is not None]
+        with self._stats_lock:
+            return SimpleNamespace(
+                queue_depth=len(waiting), downloaded=self._downloaded,
+                failed=self._failed, lag=self._last_lag,
+                max_lag=self._max_lag,
+                pending=(time.time() - min(waiting)) if waiting else 0.0)
+
+    def stop(self):
+        """ Stop listening for new files and wait until all files that
+            were already announced are downloaded.
+        """
+        self._stopped.set()
+        self._listener.join()
+        self._enqueue(None)
+        self._downloader.join()
+        with self.camera._lock:
+            lib.gp_camera_exit(self.camera._cam, self.camera._ctx)
+
+    def _listen(self):
+        camera = self.camera
+        event_type_p = ffi.new("CameraEventType*")
+        event_data_p = ffi.new("void**")
+        try:
+            while not self._stopped.is_set():
+                # Downloads and all other operations take precedence over
+                # the wait for new events
+                with camera._lock.held(PRIORITY_LOW):
+                    lib.gp_camera_wait_for_event(
+                        camera._cam, self.poll_timeout, event_type_p,
+                        event_data_p, camera._ctx)
+                    try:
+                        if event_type_p[0] != lib.GP_EVENT_FILE_ADDED:
+                            continue
+                        camera._storage_changed()
+                        path_p = ffi.cast("CameraFilePath*",
+                                          event_data_p[0])
+                        item = (ffi.string(path_p.folder).decode(),
+                                ffi.string(path_p.name).decode(),
+                                time.time())
+                    finally:
+                        # Event data is allocated by libgphoto2
+                        lib.free(event_data_p[0])
+                        event_data_p[0] = ffi.NULL
+                camera._logger.info("File added: {0}/{1}".format(*item[:2]))
+                if not self._enqueue(item):
+                    camera._logger.error(
+                        "Tethering stopped: download thread ended, {0}/{1} "
+                        "was not downloaded".format(*item[:2]))
+                    return
+        except errors.GPhoto2Error as e:
+            camera._logger.error("Tethering stopped: {0}".format(e))
+            self.error = e
+
+    def _enqueue(self, item):
+        """ Put an item on the queue, waiting for room as long as the
+            download thread is running.
+
+        :return:    Whether the item was queued
+        """
+        while self._downloader.is_alive():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _download(self):
+        camera = self.camera
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            folder, name, announced = item
+            fobj = camera._file_from_path("{0}/{1}".format(
+                folder.rstrip("/"), name))
+            target_path = os.path.join(self.target_dir, name)
+            try:
+                with camera._lock:
+                    fobj._save(target_path)
+                    if self.delete:
+                        lib.gp_camera_file_delete(
+                            camera._cam, folder.encode(), name.encode(),
+                            camera._ctx)
+                        camera._file_infos.forget(fobj.path)
+                        camera._storage_changed()
+            except (errors.GPhoto2Error, IOError) as e:
+                camera._logger.error("Could not download {0}: {1}"
+                                     .format(fobj.path, e))
+                with self._stats_lock:
+                    self._failed += 1
+                continue
+            lag = time.time() - announced
+            with self._stats_lock:
+                self._downloaded += 1
+                self._last_lag = lag
+                self._max_lag = max(lag, self._max_lag or 0.0)
+            if self.callback is not None:
+                try:
+                    self.callback(fobj, target_path)
+                except Exception:
+                    camera._logger.error(
+                        "Callback failed for {0}".format(fobj.path),
+                        exc_info=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+class StatusMonitor(object):
+    """ Polls a set of configuration options in the background and notifies
+    subscribers about changed values.
+
+    Only the requested options are read from the device, which is much
+    cheaper than fetching the whole configuration like
+    :py:attr:`Camera.status` does. All options are read in one go with a
+    low priority on the device, so captures and downloads are not delayed.
+
+    Can also be used as a context manager, where polling will be stopped
+    upon leaving.
+
+    :param camera:      Camera to poll
+    :param names:       Names of the options to poll, e.g. `batterylevel`
+    :param interval:    Seconds between two polls
+    :param callback:    Subscriber to register right away, see
+                        :py:meth:`subscribe`
+    """
+    def __init__(self, camera, names, interval=1.0, callback=None):
+        #: Camera that is polled
+        self.camera = camera
+        #: Names of the polled options
+        self.names = list(names)
+        self.interval = interval
+        #: Most recent value of every option
+        self.values = {}
+        #: Error that ended polling, if any
+        self.error = None
+        self._subscribers = []
+        if callback is not None:
+            self._subscribers.append(callback)
+        self._single_config = True
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    @property
+    def running(self):
+        """ Whether the options are still being polled. """
+        return self._thread.is_alive()
+
+    def subscribe(self, callback):
+        """ Register a function that is called with a dictionary of the
+            options that changed, mapped to their new values, after every
+            poll that found changes.
+
+        The first poll reports all options.
+
+        :param callback:    Function to call
+        :type callback:     callable
+        """
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        """ Stop calling a function registered with :py:meth:`subscribe`. """
+        self._subscribers.remove(callback)
+
+    def poll(self):
+        """ Read the options now and notify the subscribers about changes.
+
+        :return:    Changed options mapped to their new values
+        :rtype:     dict
+        """
+        with self.camera._lock.held(PRIORITY_LOW):
+            current = self._read()
+        changes = {name: value for name, value in current.items()
+                   if name not in self.values or self.values[name] != value}
+        self.values.update(current)
+        if changes:
+            for callback in list(self._subscribers):
+                try:
+                    callback(changes)
+                except Exception:
+                    # A broken subscriber must not end polling for the others
+                    self.camera._logger.error(
+                        "Status subscriber {0!r} failed".format(callback),
+                        exc_info=True)
+        return changes
+
+    def stop(self):
+        """ Stop polling. """
+        self._stopped.set()
+        self._thread.join()
+        with self.camera._lock:
+            lib.gp_camera_exit(self.camera._cam, self.camera._ctx)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self.poll()
+            except errors.GPhoto2Error as e:
+                self.camera._logger.error(
+                    "Status polling stopped: {0}".format(e))
+                self.error = e
+                return
+            self._stopped.wait(self.interval)
+
+    def _read(self):
+        camera = self.camera
+        widget_p = ffi.new("CameraWidget**")
+        if self._single_config:
+            try:
+                out = {}
+                for name in self.names:
+                    lib.gp_camera_get_single_config(
+                        camera._cam, name.encode(), widget_p, camera._ctx)
+                    try:
+                        out[name] = ConfigItem(widget_p[0], camera).value
+                    finally:
+                        lib.gp_widget_free(widget_p[0])
+                return out
+            except errors.GPhoto2Error as e:
+                if e.error_code != lib.GP_ERROR_NOT_SUPPORTED:
+                    raise
+                # Driver can only return the full tree
+                self._single_config = False
+        root_p = ffi.new("CameraWidget**")
+        lib.gp_camera_get_config(camera._cam, root_p, camera._ctx)
+        try:
+            out = {}
+            for name in self.names:
+                lib.gp_widget_get_child_by_name(root_p[0], name.encode(),
+                                                widget_p)
+                out[name] = ConfigItem(widget_p[0], camera).value
+            return out
+        finally:
+            lib.gp_widget_free(root_p[0])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+class StorageWatcher(object):
+    """ Notifies about the camera's storage running low.
+
+    The thresholds are checked whenever the storage information of the
+    camera is refreshed, i.e. on the first access to
+    :py:attr:`Camera.storage_info` after a capture, upload or removal, on
+    :py:meth:`Camera.refresh_storage_info` and, if an interval is given,
+    periodically in the background.
+
+    Can also be used as a context manager, where watching will be stopped
+    upon leaving.
+
+    :param camera:              Camera to watch
+    :param free_space:          Threshold for the free space in KiB
+    :param remaining_images:    Threshold for the number of images that still
+                                fit on the storage
+    :param callback:            Called with the storage information (see
+                                :py:attr:`Camera.storage_info`), the name of
+                                the value (`free_space` or
+                                `remaining_images`) and whether it fell below
+                                the threshold (`True`) or rose to or above
+                                it again (`False`)
+    :param interval:            Seconds between two refreshes in the
+                                background, `None` to only check refreshes
+                                caused by other users of the camera
+    """
+    def __init__(self, camera, free_space=None, remaining_images=None,
+                 callback=None, interval=None):
+        #: Camera that is watched
+        self.camera = camera
+        #: Thresholds by the name of the value
+        self.thresholds = {name: value for name, value in (
+            ('free_space', free_space),
+            ('remaining_images', remaining_images)) if value is not None}
+        self.callback = callback
+        self.interval = interval
+        #: Error that ended background refreshes, if any
+        self.error = None
+        self._below = {}
+        self._stopped = threading.Event()
+        self._thread = None
+        camera._storage_watchers.append(self)
+        if interval is not None:
+            self._thread = threading.Thread(target=self._run)
+            self._thread.daemon = True
+            self._thread.start()
+
+    def check(self, infos):
+        """ Compare storage information with the thresholds and notify the
+            callback about crossings.
+
+        Values that are below their threshold when they are first checked
+        count as a crossing.
+
+        :param infos:   Storage information as returned by
+                        :py:attr:`Camera.storage_info`
+        """
+        for idx, info in enumerate(infos):
+            for name, threshold in self.thresholds.items():
+                value = getattr(info, name, None)
+                if value is None:
+                    continue
+                below = value < threshold
+                if self._below.get((idx, name), False) != below:
+                    self._below[idx, name] = below
+                    if self.callback is not None:
+                        self.callback(info, name, below)
+
+    def stop(self):
+        """ Stop watching. """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        try:
+            self.camera._storage_watchers.remove(self)
+        except ValueError:
+            pass
+
+    def _run(self):
+        camera = self.camera
+        while not self._stopped.wait(self.interval):
+            try:
+                with camera._lock.held(PRIORITY_LOW):
+                    camera._refresh_storage_info()
+                    lib.gp_camera_exit(camera._cam, camera._ctx)
+            except errors.GPhoto2Error as e:
+                camera._logger.error(
+                    "Storage watching stopped: {0}".format(e))
+                self.error = e
+                return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+class DownloadJob(object):
+    """ A download submitted to a :py:class:`DownloadScheduler`.
+
+    :param fobj:        File to download
+    :param ftype:       Type of the file to download, one of the keys of
+                        :py:data:`gphoto2cffi.backend.FILE_TYPES`
+    :param priority:    Priority of the job, higher values are served first
+    :param target_path: Local path to save the file to, `None` to keep the
+                        content in memory
+    :param progress:    Called with a :py:class:`TransferProgress` after
+                        every chunk
+    """
+    def __init__(self, fobj, ftype, priority, target_path=None,
+                 progress=None):
+        #: The :py:class:`File` that is downloaded
+        self.file = fobj
+        self.ftype = ftype
+        self.priority = priority
+        self.target_path = target_path
+        self.progress = progress
+        #: Number of bytes that were downloaded so far
+        self.offset = 0
+        #: Number of times the job was interrupted for a more urgent one
+        self.preemptions = 0
+        self._cancel = CancelToken()
+        self._done = threading.Event()
+        self._result = None
+        self._error = None
+        self._chunks = []
+        self._fp = None
+        self._start_time = None
+
+    def cancel(self):
+        """ Abort the job, at the latest after the current chunk. """
+        self._cancel.cancel()
+
+    @property
+    def cancelled(self):
+        """ Whether cancellation was requested. """
+        return self._cancel.cancelled
+
+    def done(self):
+        """ Whether the job finished, failed or was cancelled. """
+        return self._done.is_set()
+
+    def result(self, timeout=None):
+        """ Wait for the job to finish.
+
+        :param timeout: Maximum number of seconds to wait
+        :return:        The file content if no `target_path` was given,
+                        otherwise the `target_path`
+        :rtype:         bytes or str
+        :raises RuntimeError:   If the job did not finish in time
+        """
+        if not self._done.wait(timeout):
+            raise RuntimeError("Download did not finish in time.")
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+    def _write(self, buf_p, size):
+        if self.target_path is None:
+            self._chunks.append(ffi.buffer(buf_p, size)[:])
+        else:
+            if self._fp is None:
+                self._fp = open(self.target_path, 'wb')
+            self._fp.write(ffi.buffer(buf_p, size))
+        self.offset += size
+        if self.progress is not None:
+            total = self.file.size if self.ftype == 'normal' else 0
+            rate = self.offset / max(time.time() - self._start_time, 1e-9)
+            self.progress(TransferProgress(
+                self.offset, total, rate,
+                (total - self.offset) / rate if total and rate else None))
+
+    def _finish(self, result=None, error=None):
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
+        if error is None and result is None:
+            result = (self.target_path if self.target_path is not None
+                      else b"".join(self._chunks))
+        self._chunks = []
+        self._result, self._error = result, error
+        self._done.set()
+
+
+class DownloadScheduler(object):
+    """ Serves downloads from a camera by priority.
+
+    Jobs are downloaded one after another on a background thread, the most
+    urgent first. Large files are read in chunks with partial reads, and a
+    job is suspended at a chunk boundary as soon as a more urgent job is
+    submitted, then resumed from where it left off. Operations with a
+    higher priority from other threads, e.g. captures, are also let through
+    between chunks.
+
+    Drivers that do not support partial reads for a file type fall back to
+    downloading the whole file at once, which cannot be interrupted.
+
+    :param camera:      Camera to download from
+    :param chunk_size:  Size of the chunks in bytes
+    """
+    #: Default priorities of the file types
+    PRIORITIES = {'preview': PRIORITY_HIGH,
+                  'exif': PRIORITY_HIGH,
+                  'metadata': PRIORITY_HIGH,
+                  'normal': PRIORITY_NORMAL,
+                  'raw': PRIORITY_LOW,
+                  'audio': PRIORITY_LOW}
+
+    #: File types that are small enough to always be downloaded at once
+    WHOLE_TYPES = ('preview', 'exif', 'metadata')
+
+    def __init__(self, camera, chunk_size=2**20):
+        self.camera = camera
+        self.chunk_size = chunk_size
+        self._cond = threading.Condition(threading.Lock())
+        self._queue = []
+        self._tickets = itertools.count()
+        self._thread = None
+        self._current = None
+        self._closed = False
+
+    def submit(self, fobj, ftype='normal', priority=None, target_path=None,
+               progress=None):
+        """ Queue a download.
+
+        :param fobj:        File to download
+        :type fobj:         :py:class:`File`
+        :param ftype:       Type of the file to download, one of the keys
+                            of :py:data:`gphoto2cffi.backend.FILE_TYPES`
+        :type ftype:        str
+        :param priority:    Priority of the job, defaults to the priority of
+                            the file type in :py:attr:`PRIORITIES`
+        :type priority:     int
+        :param target_path: Local path to save the file to, `None` to keep
+                            the content in memory
+        :type target_path:  str/unicode
+        :param progress:    Called with a :py:class:`TransferProgress` after
+                            every chunk
+        :type progress:     callable
+        :rtype:             :py:class:`DownloadJob`
+        """
+        if priority is None:
+            priority = self.PRIORITIES.get(ftype, PRIORITY_NORMAL)
+        job = DownloadJob(fobj, ftype, priority, target_path, progress)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Scheduler is closed.")
+            self._push(job, next(self._tickets))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run)
+                self._thread.daemon = True
+                self._thread.start()
+        return job
+
+    @property
+    def pending(self):
+        """ Number of jobs that wait to be served, including suspended ones.
+        """
+        with self._cond:
+            return len(self._queue)
+
+    def close(self):
+        """ Cancel all jobs and wait for the current one to stop, which
+            happens at the next chunk boundary.
+        """
+        with self._cond:
+            self._closed = True
+            queued, self._queue = self._queue, []
+            thread, current = self._thread, self._current
+        if current is not None:
+            current.cancel()
+        for _, _, job in queued:
+            job.cancel()
+            job._finish(error=errors.OperationCancelled(
+                lib.GP_ERROR_CANCEL))
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def _push(self, job, ticket):
+        heapq.heappush(self._queue, (-job.priority, ticket, job))
+
+    def _more_urgent_waiting(self, job):
+        with self._cond:
+            return bool(self._queue) and -self._queue[0][0] > job.priority
+
+    def _run(self):
+        camera = self.camera
+        buf_p = camera.native_pool.take_buffer(self.chunk_size)
+        size_p = ffi.new("uint64_t*")
+        try:
+            while True:
+                with self._cond:
+                    if not self._queue:
+                        # Started again by the next submit
+                        self._thread = None
+                        return
+                    _, ticket, job = heapq.heappop(self._queue)
+                    self._current = job
+                try:
+                    finished = self._serve(job, buf_p, size_p)
+                except errors.OperationCancelled as e:
+                    job._finish(error=e)
+                    finished = True
+                except (errors.GPhoto2Error, IOError, ValueError) as e:
+                    camera._logger.error("Could not download {0}: {1}"
+                                         .format(job.file.path, e))
+                    job._finish(error=e)
+                    finished = True
+                if not finished:
+                    job.preemptions += 1
+                    with self._cond:
+                        closed = self._closed
+                        if not closed:
+                            # Resumed before jobs of the same priority that
+                            # were submitted later
+                            self._push(job, ticket)
+                    if closed:
+                        job._finish(error=errors.OperationCancelled(
+                            lib.GP_ERROR_CANCEL))
+                with self._cond:
+                    self._current = None
+                    idle = not self._queue
+                if idle:
+                    with camera._lock:
+                        lib.gp_camera_exit(camera._cam, camera._ctx)
+        finally:
+            camera.native_pool.put_buffer(buf_p)
+
+    def _serve(self, job, buf_p, size_p):
+        """ Download a job until it is finished or preempted.
+
+        :return:    Whether the job is finished
+        """
+        camera = self.camera
+        fobj = job.file
+        if job._start_time is None:
+            job._start_time = time.time()
+        with camera._lock.held(job.priority):
+            if job.ftype in self.WHOLE_TYPES:
+                return self._serve_whole(job)
+            while True:
+                if job.cancelled:
+                    job._finish(error=errors.OperationCancelled(
+                        lib.GP_ERROR_CANCEL))
+                    return True
+                try:
+                    size = fobj._read_chunk(job.offset, buf_p, size_p,
+                                            job.ftype, self.chunk_size)
+                except errors.GPhoto2Error as e:
+                    if (job.offset or
+                            e.error_code != lib.GP_ERROR_NOT_SUPPORTED):
+                        raise
+                    return self._serve_whole(job)
+                job._write(buf_p, size)
+                if size < self.chunk_size:
+                    job._finish()
+                    return True
+                if self._more_urgent_waiting(job):
+                    return False
+                camera.yield_if_preempted()
+
+    def _serve_whole(self, job):
+        fobj = job.file
+        if job.target_path is None:
+            job._finish(fobj._get_data(job.ftype, job.progress, job._cancel))
+        else:
+            fobj._save(job.target_path, job.ftype, job.progress, job._cancel)
+            job._finish(job.target_path)
+        return True
+
+
+class _FileInfoTable(object):
+    """ Information about the files on a camera, shared by all
+        :py:class:`File` objects with the same path.
+
+    Every field is kept in its own :py:class:`array.array` with one row per
+    file, so the information for a large number of files takes up little
+    memory. Rows of files that are forgotten are reused.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows = {}
+        self._free_rows = []
+        self.sizes = array.array(str('d'))
+        self.mtimes = array.array(str('d'))
+        self.widths = array.array(str('I'))
+        self.heights = array.array(str('I'))
+        self.permissions = array.array(str('B'))
+        self.mimetypes = array.array(str('H'))
+        self.mimetype_names = []
+        self._mimetype_ids = {}
+
+    def find(self, path):
+        """ Get the row for a path, `None` if the file is not known. """
+        return self._rows.get(path)
+
+    def add(self, path, info):
+        """ Store the information for a file.
+
+        :param path:    Path of the file
+        :param info:    Information to store
+        :type info:     `CameraFileInfo*`
+        :return:        Row of the file
+        """
+        mimetype = ffi.string(info.file.type).decode()
+        values = (float(info.file.size), float(info.file.mtime),
+                  info.file.width, info.file.height, info.file.permissions)
+        columns = (self.sizes, self.mtimes, self.widths, self.heights,
+                   self.permissions)
+        with self._lock:
+            mimetype_id = self._mimetype_ids.get(mimetype)
+            if mimetype_id is None:
+                mimetype_id = len(self.mimetype_names)
+                self.mimetype_names.append(mimetype)
+                self._mimetype_ids[mimetype] = mimetype_id
+            row = self._rows.get(path)
+            if row is None and self._free_rows:
+                row = self._free_rows.pop()
+            if row is None:
+                row = len(self.sizes)
+                for column, value in zip(columns, values):
+                    column.append(value)
+                self.mimetypes.append(mimetype_id)
+            else:
+                for column, value in zip(columns, values):
+                    column[row] = value
+                self.mimetypes[row] = mimetype_id
+            self._rows[path] = row
+        return row
+
+    def forget(self, path):
+        """ Drop the information for a file. """
+        with self._lock:
+            row = self._rows.pop(path, None)
+            if row is not None:
+                self._free_rows.append(row)
+
+    def forget_directory(self, path):
+        """ Drop the information for all files below a directory. """
+        prefix = path.rstrip("/") + "/"
+        with self._lock:
+            for known in [p for p in self._rows if p.startswith(prefix)]:
+                self._free_rows.append(self._rows.pop(known))
+
+    def clear(self):
+        """ Drop all information. """
+        with self._lock:
+            self._free_rows.extend(self._rows.values())
+            self._rows.clear()
 
 
 class Directory(object):
     """ A directory on the camera. """
+    __slots__ = ('name', 'parent', '_cam', '_path')
+
     def __init__(self, name, parent, camera):
-        self.name = name
+        self.name = intern(name)
         self.parent = parent
-        self._file_ops = camera._abilities.file_operations
-        self._dir_ops = camera._abilities.folder_operations
         self._cam = camera
+        if parent is None:
+            self._path = "/"
+        else:
+            self._path = intern(os.path.join(parent.path, name))
 
     @property
     def path(self):
         """ Absolute path to the directory on the camera's filesystem. """
-        if self.parent is None:
-            return "/"
-        else:
-            return os.path.join(self.parent.path, self.name)
+        return self._path
 
     @property
     def supported_operations(self):
         """ All directory operations supported by the camera. """
-        return tuple(op for op in backend.DIR_OPS if self._dir_ops & op)
+        dir_ops = self._cam._abilities.folder_operations
+        return tuple(op for op in backend.DIR_OPS if dir_ops & op)
 
     @property
     def exists(self):
@@ -202,28 +1107,23 @@ class Directory(object):
     @property
     @exit_after
     def files(self):
-        """ Get a generator that yields all files in the directory. """
-        filelist_p = new_gp_object("CameraList")
-        lib.gp_camera_folder_list_files(self._cam._cam, self.path.encode(),
-                                        filelist_p, self._cam._ctx)
-        for idx in range(lib.gp_list_count(filelist_p)):
-            fname = get_string(lib.gp_list_get_name, filelist_p, idx)
-            yield File(name=fname, directory=self, camera=self._cam)
-        lib.gp_list_free(filelist_p)
+        """ Get an iterator that yields all files in the directory. """
+        return iter([File(name=fname, directory=self, camera=self._cam)
+                     for fname in self._cam._list_file_names(self.path)])
 
     @property
     @exit_after
     def directories(self):
-        """ Get a generator that yields all subdirectories in the directory.
+        """ Get an iterator that yields all subdirectories in the directory.
         """
-        dirlist_p = new_gp_object("CameraList")
-        lib.gp_camera_folder_list_folders(self._cam._cam, self.path.encode(),
-                                          dirlist_p, self._cam._ctx)
-        for idx in range(lib.gp_list_count(dirlist_p)):
-            name = os.path.join(
-                self.path, get_string(lib.gp_list_get_name, dirlist_p, idx))
-            yield Directory(name=name, parent=self, camera=self._cam)
-        lib.gp_list_free(dirlist_p)
+        with gp_object("CameraList") as dirlist_p:
+            lib.gp_camera_folder_list_folders(
+                self._cam._cam, self.path.encode(), dirlist_p,
+                self._cam._ctx)
+            names = [get_string(lib.gp_list_get_name, dirlist_p, idx)
+                     for idx in range(lib.gp_list_count(dirlist_p))]
+        return iter([Directory(name=name, parent=self, camera=self._cam)
+                     for name in names])
 
     @exit_after
     def create(self):
@@ -238,45 +1138,130 @@ class Directory(object):
         lib.gp_camera_folder_remove_dir(
             self._cam._cam, self.parent.path.encode(), self.name.encode(),
             self._cam._ctx)
+        self._cam._file_infos.forget_directory(self.path)
+        self._cam._storage_changed()
+
+    @exit_after
+    def delete_all(self):
+        """ Remove all files in the directory.
+
+        Subdirectories and their contents are left untouched.
+        """
+        lib.gp_camera_folder_delete_all(self._cam._cam, self.path.encode(),
+                                        self._cam._ctx)
+        self._cam._file_infos.forget_directory(self.path)
+        self._cam._storage_changed()
 
     @exit_after
-    def upload(self, local_path):
+    def upload(self, local_path, progress=None, cancel=None):
         """ Upload a file to the camera's permanent storage.
 
         :param local_path: Path to file to copy
         :type local_path:  str/unicode
+        :param progress:   Called with a :py:class:`TransferProgress` while
+                           the upload is running
+        :type progress:    callable
+        :param cancel:     Token to abort the upload with
+        :type cancel:      :py:class:`CancelToken`
         """
-        camerafile_p = ffi.new("CameraFile**")
-        with open(local_path, 'rb') as fp:
-            lib.gp_file_new_from_fd(camerafile_p, fp.fileno())
+        with open(local_path, 'rb') as fp, gp_file_from_fd(fp) as camfile, \
+                self._cam._transfer.watch(progress, cancel):
             lib.gp_camera_folder_put_file(
                 self._cam._cam, self.path.encode() + b"/",
                 os.path.basename(local_path).encode(),
-                backend.FILE_TYPES['normal'], camerafile_p[0],
-                self._cam.ctx)
+                backend.FILE_TYPES['normal'], camfile, self._cam._ctx)
+        self._cam._storage_changed()
+
+    @exit_after
+    def upload_many(self, local_paths, progress=None, cancel=None):
+        """ Upload multiple files to the camera's permanent storage in a
+            single session.
+
+        Like :py:meth:`upload`, libgphoto2 reads every file straight from
+        its descriptor, so no file is loaded into memory. Failed uploads are
+        logged and do not abort the remaining transfers.
+
+        :param local_paths: Paths to files to copy
+        :type local_paths:  iterable of str/unicode
+        :param progress:    Called with a :py:class:`TransferProgress` while
+                            a file is being uploaded
+        :type progress:     callable
+        :param cancel:      Token to abort the batch with, files that were
+                            not yet uploaded are skipped
+        :type cancel:       :py:class:`CancelToken`
+        :return:            Transfer results with the attributes `path`,
+                            `size`, `duration` (of the transfer), `rate` (in
+                            bytes/s) and `error` (`None` if the upload
+                            succeeded)
+        :rtype:             list of :py:class:`SimpleNamespace`
+        """
+        folder = self.path.encode() + b"/"
+        results = []
+        for local_path in local_paths:
+            result = SimpleNamespace(path=local_path, size=0, duration=0.0,
+                                     rate=0.0, error=None)
+            try:
+                with open(local_path, 'rb') as fp, \
+                        gp_file_from_fd(fp) as camfile, \
+                        self._cam._transfer.watch(progress, cancel):
+                    result.size = os.fstat(fp.fileno()).st_size
+                    start_time = time.time()
+                    lib.gp_camera_folder_put_file(
+                        self._cam._cam, folder,
+                        os.path.basename(local_path).encode(),
+                        backend.FILE_TYPES['normal'], camfile,
+                        self._cam._ctx)
+                    result.duration = time.time() - start_time
+            except errors.OperationCancelled as e:
+                result.error = e
+                results.append(result)
+                break
+            except (errors.GPhoto2Error, IOError) as e:
+                self._cam._logger.warning(
+                    "Could not upload {0}: {1}".format(local_path, e))
+                result.error = e
+            if result.error is None and result.duration:
+                result.rate = result.size / result.duration
+            results.append(result)
+        self._cam._storage_changed()
+        return results
 
     def __eq__(self, other):
-        return (self.name == other.name and
-                self.parent == other.parent and
-                self._cam == other._cam)
+        return self.path == other.path and self._cam == other._cam
+
+    def __ne__(self, other):
+        return not self == other
 
     def __repr__(self):
         return "Directory(\"{0}\")".format(self.path)
 
 
 class File(object):
-    """ A file on the camera. """
+    """ A file on the camera.
+
+    The file information (size, type, ...) is fetched on first access and
+    shared with all other objects for the same path on the camera, until the
+    file is removed or the camera is closed.
+    """
+    __slots__ = ('name', 'directory', '_cam', '_path')
+
     def __init__(self, name, directory, camera):
-        self.name = name
+        self.name = intern(name)
         self.directory = directory
         self._cam = camera
-        self._operations = camera._abilities.file_operations
-        self.__info = None
+        self._path = intern("{0}/{1}".format(directory.path.rstrip("/"),
+                                             name))
+
+    @property
+    def path(self):
+        """ Absolute path to the file on the camera's filesystem. """
+        return self._path
 
     @property
     def supported_operations(self):
         """ All file operations supported by the camera. """
-        return tuple(op for op in backend.FILE_OPS if self._operations & op)
+        file_ops = self._cam._abilities.file_operations
+        return tuple(op for op in backend.FILE_OPS if file_ops & op)
 
     @property
     def size(self):
@@ -284,7 +1269,7 @@ class File(object):
 
         :rtype: int
         """
-        return int(self._info.file.size)
+        return int(self._cam._file_infos.sizes[self._info_row])
 
     @property
     def mimetype(self):
@@ -292,7 +1277,8 @@ class File(object):
 
         :rtype: str
         """
-        return ffi.string(self._info.file.type).decode()
+        infos = self._cam._file_infos
+        return infos.mimetype_names[infos.mimetypes[self._info_row]]
 
     @property
     def dimensions(self):
@@ -300,7 +1286,9 @@ class File(object):
 
         :rtype: :py:class:`ImageDimensions`
         """
-        return ImageDimensions(self._info.file.width, self._info.file.height)
+        infos = self._cam._file_infos
+        row = self._info_row
+        return ImageDimensions(infos.widths[row], infos.heights[row])
 
     @property
     def permissions(self):
@@ -311,8 +1299,9 @@ class File(object):
 
         :rtype: str
         """
-        can_read = self._info.file.permissions & lib.GP_FILE_PERM_READ
-        can_write = self._info.file.permissions & lib.GP_FILE_PERM_DELETE
+        permissions = self._cam._file_infos.permissions[self._info_row]
+        can_read = permissions & lib.GP_FILE_PERM_READ
+        can_write = permissions & lib.GP_FILE_PERM_DELETE
         return "{0}{1}".format("r" if can_read else "-",
                                "w" if can_write else "-")
 
@@ -322,108 +1311,302 @@ class File(object):
 
         :rtype: :py:class:`datetime.datetime`
         """
-        return datetime.fromtimestamp(self._info.file.mtime)
+        return datetime.fromtimestamp(
+            self._cam._file_infos.mtimes[self._info_row])
 
     @exit_after
-    def save(self, target_path, ftype='normal'):
+    def save(self, target_path, ftype='normal', progress=None, cancel=None):
         """ Save file content to a local file.
 
         :param target_path: Path to save remote file as.
         :type target_path:  str/unicode
         :param ftype:       Select 'view' on file.
         :type ftype:        str
+        :param progress:    Called with a :py:class:`TransferProgress` while
+                            the download is running
+        :type progress:     callable
+        :param cancel:      Token to abort the download with
+        :type cancel:       :py:class:`CancelToken`
         """
-        camfile_p = ffi.new("CameraFile**")
+        self._save(target_path, ftype, progress, cancel)
+
+    @exit_after
+    def save_to_file(self, fileobj, ftype='normal', progress=None,
+                     cancel=None):
+        """ Save file content to a file object, e.g. a memory file.
+
+        libgphoto2 writes to the file's descriptor directly, without copying
+        the content into Python objects.
+
+        :param fileobj:     Empty file object that is opened for writing in
+                            binary mode
+        :param ftype:       Select 'view' on file.
+        :type ftype:        str
+        :param progress:    Called with a :py:class:`TransferProgress` while
+                            the download is running
+        :type progress:     callable
+        :param cancel:      Token to abort the download with
+        :type cancel:       :py:class:`CancelToken`
+        """
+        self._save_to_file(fileobj, ftype, progress, cancel)
+
+    def _save(self, target_path, ftype='normal', progress=None, cancel=None):
         with open(target_path, 'wb') as fp:
-            lib.gp_file_new_from_fd(camfile_p, fp.fileno())
-            lib.gp_camera_file_get(
-                self._cam._cam, self.directory.path.encode(),
-                self.name.encode(), backend.FILE_TYPES[ftype], camfile_p[0],
-                self._cam._ctx)
+            self._save_to_file(fp, ftype, progress, cancel)
+
+    def _save_to_file(self, fp, ftype='normal', progress=None, cancel=None):
+        with gp_file_from_fd(fp) as camfile, \
+                self._cam._transfer.watch(progress, cancel):
+            try:
+                lib.gp_camera_file_get(
+                    self._cam._cam, self.directory.path.encode(),
+                    self.name.encode(), backend.FILE_TYPES[ftype], camfile,
+                    self._cam._ctx)
+            except errors.GPhoto2Error as e:
+                policy = lib.retry_policy
+                if policy is None or not policy.is_retriable(e.error_code):
+                    raise
+                self._resume_save(fp, ftype, e)
+
+    def _resume_save(self, fp, ftype, error):
+        """ Continue an interrupted download with partial reads, starting
+            after the data that already made it to the file.
+        """
+        offset = os.fstat(fp.fileno()).st_size
+        self._cam._logger.warning(
+            "Download of {0} failed at {1} bytes, resuming: {2}"
+            .format(self.path, offset, error))
+        fp.seek(offset)
+        chunk_size = 2**20
+        size_p = ffi.new("uint64_t*")
+        with self._cam.native_pool.buffer(chunk_size) as buf_p:
+            try:
+                size = self._read_chunk(offset, buf_p, size_p, ftype,
+                                        chunk_size)
+            except errors.GPhoto2Error:
+                # Partial reads are not supported by the driver
+                raise error
+            lib.retry_policy.record("gp_camera_file_get", 'resumed')
+            while size:
+                fp.write(ffi.buffer(buf_p, size))
+                if size < chunk_size:
+                    break
+                offset += size
+                size = self._read_chunk(offset, buf_p, size_p, ftype,
+                                        chunk_size)
 
     @exit_after
-    def get_data(self, ftype='normal'):
+    def get_data(self, ftype='normal', progress=None, cancel=None):
         """ Get file content as a bytestring.
 
         :param ftype:       Select 'view' on file.
         :type ftype:        str
+        :param progress:    Called with a :py:class:`TransferProgress` while
+                            the download is running
+        :type progress:     callable
+        :param cancel:      Token to abort the download with
+        :type cancel:       :py:class:`CancelToken`
         :return:            File content
         :rtype:             bytes
         """
-        camfile_p = ffi.new("CameraFile**")
-        lib.gp_file_new(camfile_p)
-        lib.gp_camera_file_get(
-            self._cam._cam, self.directory.path.encode(), self.name.encode(),
-            backend.FILE_TYPES[ftype], camfile_p[0], self._cam._ctx)
-        data_p = ffi.new("char**")
-        length_p = ffi.new("unsigned long*")
-        lib.gp_file_get_data_and_size(camfile_p[0], data_p, length_p)
-        byt = bytes(ffi.buffer(data_p[0], length_p[0]))
-        # gphoto2 camera files MUST be freed.
-        lib.gp_file_free(camfile_p[0])
-        # just to be safe.
-        del data_p, length_p, camfile_p
-        return byt
+        return self._get_data(ftype, progress, cancel)
+
+    def _get_data(self, ftype='normal', progress=None, cancel=None):
+        with self._cam.native_pool.camera_file() as pooled, \
+                self._cam._transfer.watch(progress, cancel):
+            lib.gp_camera_file_get(
+                self._cam._cam, self.directory.path.encode(),
+                self.name.encode(), backend.FILE_TYPES[ftype],
+                pooled.camfile, self._cam._ctx)
+            return pooled.get_data()
 
-    @exit_after
     def iter_data(self, chunk_size=2**16, ftype='normal'):
         """ Get an iterator that yields chunks of the file content.
 
+        The device is only reserved while a chunk is read, so other
+        operations can be carried out between chunks.
+
         :param chunk_size:  Size of yielded chunks in bytes
         :type chunk_size:   int
         :param ftype:       Select 'view' on file.
         :type ftype:        str
         :return:            Iterator
         """
-        self._check_type_supported(ftype)
-        buf_p = ffi.new("char[{0}]".format(chunk_size))
+        buf_p = self._cam.native_pool.take_buffer(chunk_size)
         size_p = ffi.new("uint64_t*")
-        offset_p = ffi.new("uint64_t*")
-        for chunk_idx in range(int(math.ceil(self.size/chunk_size))):
-            size_p[0] = chunk_size
+        offset = 0
+        try:
+            while True:
+                size = self._read_chunk(offset, buf_p, size_p, ftype,
+                                        chunk_size)
+                if size:
+                    yield ffi.buffer(buf_p, size)[:]
+                    offset += size
+                if size < chunk_size:
+                    break
+        finally:
+            self._cam.native_pool.put_buffer(buf_p)
+            with self._cam._lock:
+                lib.gp_camera_exit(self._cam._cam, self._cam._ctx)
+
+    def save_streaming(self, target_path, chunk_size=2**22, num_buffers=4,
+                       ftype='normal', progress=None, cancel=None):
+        """ Save file content to a local file, overlapping reads from the
+            camera with writes to disk.
+
+        Chunks are read from the camera on the calling thread and written to
+        disk on a separate thread through a fixed set of buffers, so memory
+        use stays constant regardless of the file size and a slow disk does
+        not leave the USB bus idle. The device is only reserved while a chunk
+        is read. Meant for large files like movies, requires support for
+        partial reads in the camera driver.
+
+        :param target_path: Path to save remote file as.
+        :type target_path:  str/unicode
+        :param chunk_size:  Size of the chunks read from the camera in bytes
+        :type chunk_size:   int
+        :param num_buffers: Number of chunk buffers, i.e. how far reading may
+                            get ahead of writing
+        :type num_buffers:  int
+        :param ftype:       Select 'view' on file.
+        :type ftype:        str
+        :param progress:    Called with a :py:class:`TransferProgress` after
+                            every chunk
+        :type progress:     callable
+        :param cancel:      Token to abort the download with
+        :type cancel:       :py:class:`CancelToken`
+        """
+        native_pool = self._cam.native_pool
+        buffers = [native_pool.take_buffer(chunk_size)
+                   for _ in range(num_buffers)]
+        free = queue.Queue()
+        for buf_p in buffers:
+            free.put(buf_p)
+        filled = queue.Queue()
+        write_errors = []
+
+        def write():
+            fp = None
+            try:
+                fp = open(target_path, 'wb')
+            except (IOError, OSError) as e:
+                write_errors.append(e)
+            try:
+                while True:
+                    item = filled.get()
+                    if item is None:
+                        return
+                    buf_p, size = item
+                    # Keep returning buffers after an error, so the reader
+                    # does not block
+                    if not write_errors:
+                        try:
+                            fp.write(ffi.buffer(buf_p, size))
+                        except (IOError, OSError) as e:
+                            write_errors.append(e)
+                    free.put(buf_p)
+            finally:
+                if fp is not None:
+                    fp.close()
+
+        writer = threading.Thread(target=write)
+        writer.daemon = True
+        writer.start()
+        size_p = ffi.new("uint64_t*")
+        total = self.size if ftype == 'normal' else 0
+        offset = 0
+        start_time = time.time()
+        try:
+            while not write_errors:
+                if cancel is not None and cancel.cancelled:
+                    raise errors.OperationCancelled(lib.GP_ERROR_CANCEL)
+                buf_p = free.get()
+                size = self._read_chunk(offset, buf_p, size_p, ftype,
+                                        chunk_size)
+                filled.put((buf_p, size))
+                offset += size
+                if progress is not None:
+                    rate = offset / max(time.time() - start_time, 1e-9)
+                    progress(TransferProgress(
+                        offset, total, rate,
+                        (total - offset) / rate if total and rate else None))
+                if size < chunk_size:
+                    break
+        finally:
+            filled.put(None)
+            writer.join()
+            # Every buffer goes back to the pool, including the ones still
+            # queued or being read into when an error occurred
+            for buf_p in buffers:
+                native_pool.put_buffer(buf_p)
+            with self._cam._lock:
+                lib.gp_camera_exit(self._cam._cam, self._cam._ctx)
+        if write_errors:
+            raise write_errors[0]
+
+    def _read_chunk(self, offset, buf_p, size_p, ftype, size):
+        """ Read a part of the file into a buffer.
+
+        :param size:    Number of bytes to read, at most the size of the
+                        buffer
+        :return:        Number of bytes read, less than `size` at the end of
+                        the file
+        """
+        size_p[0] = size
+        with self._cam._lock:
             lib.gp_camera_file_read(
                 self._cam._cam, self.directory.path.encode(),
-                self.name.encode(), backend.FILE_TYPES[ftype], offset_p[0],
+                self.name.encode(), backend.FILE_TYPES[ftype], offset,
                 buf_p, size_p, self._cam._ctx)
-            yield ffi.buffer(buf_p, size_p[0])[:]
+        return size_p[0]
 
     @exit_after
     def remove(self):
         """ Remove file from device. """
         lib.gp_camera_file_delete(self._cam._cam, self.directory.path.encode(),
                                   self.name.encode(), self._cam._ctx)
+        self._cam._file_infos.forget(self.path)
+        self._cam._storage_changed()
 
     @property
-    def _info(self):
-        if self.__info is None:
-            self.__info = ffi.new("CameraFileInfo*")
+    def _info_row(self):
+        """ Row of the file in the camera's :py:class:`_FileInfoTable`. """
+        row = self._cam._file_infos.find(self.path)
+        if row is None:
+            info = ffi.new("CameraFileInfo*")
             try:
-                lib.gp_camera_file_get_info(
-                    self._cam._cam, self.directory.path.encode(),
-                    self.name.encode(), self.__info, self._cam._ctx)
-                lib.gp_camera_exit(self._cam._cam, self._cam._ctx)
+                with self._cam._lock:
+                    lib.gp_camera_file_get_info(
+                        self._cam._cam, self.directory.path.encode(),
+                        self.name.encode(), info, self._cam._ctx)
+                    lib.gp_camera_exit(self._cam._cam, self._cam._ctx)
             except errors.GPhoto2Error:
                 raise ValueError("Could not get file info, are you sure the "
                                  "file exists on the device?")
-        return self.__info
+            row = self._cam._file_infos.add(self.path, info)
+        return row
 
     def __eq__(self, other):
-        return (self.name == other.name and
-                self.directory == other.directory and
-                self._cam == other._cam)
+        return self.path == other.path and self._cam == other._cam
+
+    def __ne__(self, other):
+        return not self == other
 
     def __repr__(self):
-        return "File(\"{0}/{1}\")".format(self.directory.path.rstrip("/"),
-                                          self.name)
+        return "File(\"{0}\")".format(self.path)
 
 
 class ConfigItem(object):
     """ A configuration option on the device. """
-    def __init__(self, widget, camera):
+    def __init__(self, widget, camera, root=None):
         self._widget = widget
-        root_p = ffi.new("CameraWidget**")
-        lib.gp_widget_get_root(self._widget, root_p)
-        self._root = root_p[0]
+        if root is None:
+            root_p = ffi.new("CameraWidget**")
+            lib.gp_widget_get_root(self._widget, root_p)
+            root = root_p[0]
+        # Keeps the widget tree alive if it is owned by a garbage collected
+        # pointer
+        self._root = root
         self._cam = camera
         #: Short name
         self.name = get_string(lib.gp_widget_get_name, widget)
@@ -476,19 +1659,22 @@ class ConfigItem(object):
 
         :param value:   Value to set
         """
+        self._set_value(value)
+        lib.gp_camera_set_config(self._cam._cam, self._root, self._cam._ctx)
+
+    def _validate(self, value):
+        """ Check whether a value can be set, raises a :py:class:`ValueError`
+            if not.
+        """
         if self.readonly:
             raise ValueError("Option is read-only.")
-        val_p = None
         if self.type == 'selection':
             if value not in self.choices:
                 raise ValueError("Invalid choice (valid: {0})".format(
                                  repr(self.choices)))
-            val_p = ffi.new("const char[]", value.encode())
         elif self.type == 'text':
             if not isinstance(value, basestring):
                 raise ValueError("Value must be a string.")
-            val_p = ffi.new("char**")
-            val_p[0] = ffi.new("char[]", value.encode())
         elif self.type == 'range':
             if value < self.range.min or value > self.range.max:
                 raise ValueError("Value exceeds valid range ({0}-{1}."
@@ -496,18 +1682,27 @@ class ConfigItem(object):
             if value % self.range.step:
                 raise ValueError("Value can only be changed in steps of {0}."
                                  .format(self.range.step))
-            val_p = ffi.new("float*")
-            val_p[0] = value
         elif self.type == 'toggle':
             if not isinstance(value, bool):
                 raise ValueError("Value must be bool.")
+
+    def _set_value(self, value):
+        """ Validate and update the value on the widget, without writing the
+            configuration to the device.
+        """
+        self._validate(value)
+        if self.type == 'selection':
+            val_p = ffi.new("const char[]", value.encode())
+        elif self.type == 'text':
+            val_p = ffi.new("char[]", value.encode())
+        elif self.type == 'range':
+            val_p = ffi.new("float*")
+            val_p[0] = value
+        else:
+            # 'toggle' and 'date'
             val_p = ffi.new("int*")
             val_p[0] = int(value)
-        elif self.type == 'date':
-            val_p = ffi.new("int*")
-            val_p[0] = value
         lib.gp_widget_set_value(self._widget, val_p)
-        lib.gp_camera_set_config(self._cam._cam, self._root, self._cam._ctx)
         self.value = value
 
     def _read_choices(self):
@@ -539,33 +1734,53 @@ class Camera(object):
     The specific device can be auto-detected or set manually by
     specifying the USB bus and device number.
 
+    All operations on a device are serialized through a reentrant lock
+    that is shared by all instances for the same USB address, so instances
+    and the objects obtained from them can be used from multiple threads.
+    Waiting operations are served by priority: captures go before regular
+    operations, which go before live view frames.
+
     :param bus:         USB bus number
     :param device:      USB device number
     :param lazy:        Only initialize the device when needed
     """
     def __init__(self, bus=None, device=None, lazy=False, _abilities=None):
         self._logger = logging.getLogger()
+        lib.sync_log_level()
 
         # NOTE: It is not strictly neccessary to create a context for every
         #       device, however it is significantly (>500ms) faster when
         #       actions are to be performed simultaneously.
-        self._ctx = lib.gp_context_new()
+        self._ctx = gc_gp_object("GPContext", lib.gp_context_new())
+        # Progress and cancellation of transfers are reported through the
+        # context, the monitor dispatches them to the active transfer.
+        self._transfer = _TransferMonitor()
+        lib.gp_context_set_progress_funcs(
+            self._ctx, _progress_start_callback, _progress_update_callback,
+            _progress_stop_callback, self._transfer.handle)
+        lib.gp_context_set_cancel_func(self._ctx, _cancel_callback,
+                                       self._transfer.handle)
         self._usb_address = (bus, device)
+        self._lock = _device_lock(self._usb_address)
         self.__abilities = _abilities
         self.__cam = None
-        if not lazy:
-            # Trigger the property
-            self._cam
 
         # pre-Allocate dynamic memory for the events
         self.__event_type_p = ffi.new('CameraEventType *')
         self.__event_data_p = ffi.new('void **', ffi.NULL)
 
-        # pre-Allocate some more dynamic memory to be used for preview capture
-        self.__camfile_p = ffi.new("CameraFile**")
-        lib.gp_file_new(self.__camfile_p)
-        self.__data_p = ffi.new("char**")
-        self.__length_p = ffi.new("unsigned long*")
+        #: Camera files and chunk buffers that are reused by downloads,
+        #: previews and captures, see
+        #: :py:class:`gphoto2cffi.util.NativePool`
+        self.native_pool = NativePool()
+        self._file_infos = _FileInfoTable()
+        self._storage_info = None
+        self._storage_watchers = []
+        self.__downloads = None
+
+        if not lazy:
+            # Trigger the property
+            self._cam
 
     @property
     def supported_operations(self):
@@ -593,11 +1808,68 @@ class Camera(object):
 
         :rtype:     dict
         """
-        config = self._get_config()
-        return {section: {itm.name: itm for itm in config[section].values()
-                          if not itm.readonly}
-                for section in config
-                if 'settings' in section or section == 'other'}
+        return self._writable_config(self._get_config())
+
+    def snapshot_config(self):
+        """ Get the current values of the writeable configuration parameters
+            as a profile that can be serialized to JSON.
+
+        Options of type `date` (i.e. the camera's clock) are not included,
+        since restoring them would turn the clock back.
+
+        :return:    Profile with the keys `model` and `config`, the latter a
+                    mapping from sections to mappings from option names to
+                    values
+        :rtype:     dict
+        """
+        config = self.config
+        return {'model': self.model_name,
+                'config': {section: {name: itm.value
+                                     for name, itm in items.items()
+                                     if itm.type != 'date'}
+                           for section, items in config.items()}}
+
+    @exit_after
+    def restore_config(self, profile):
+        """ Apply a profile created by :py:meth:`snapshot_config`.
+
+        Only options whose values differ from the current ones are changed,
+        and all changes are written to the device at once. Options that the
+        camera does not have are skipped. If any value is invalid, nothing is
+        written.
+
+        :param profile: Profile to apply
+        :type profile:  dict
+        :return:        Names of the changed options, prefixed with their
+                        section (e.g. `imgsettings/iso`)
+        :rtype:         list of str
+        """
+        if profile.get('model') not in (None, self.model_name):
+            self._logger.warning(
+                "Profile was created for {0}, applying it to {1}."
+                .format(profile['model'], self.model_name))
+        root = None
+        changed = []
+        config = self._writable_config(self._read_config())
+        for section, values in profile['config'].items():
+            for name, value in values.items():
+                item = config.get(section, {}).get(name)
+                if item is None:
+                    self._logger.warning("Skipping unknown option {0}/{1}."
+                                         .format(section, name))
+                    continue
+                if item.value == value:
+                    continue
+                try:
+                    item._set_value(value)
+                except ValueError as e:
+                    raise ValueError("Invalid value for {0}/{1}: {2}"
+                                     .format(section, name, e))
+                root = item._root
+                changed.append("{0}/{1}".format(section, name))
+        if root is not None:
+            lib.gp_camera_set_config(self._cam, root, self._ctx)
+        return changed
 
     @property
     def status(self):
@@ -615,60 +1887,139 @@ class Camera(object):
                     setattr(out, itm.name, itm.value)
         return out
 
+    def monitor_status(self, names, interval=1.0, callback=None):
+        """ Start polling a set of options in the background.
+
+        :param names:       Names of the options to poll, e.g.
+                            `batterylevel` or `availableshots`
+        :type names:        iterable of str
+        :param interval:    Seconds between two polls
+        :type interval:     float
+        :param callback:    Called with a dictionary of the changed options
+                            and their new values
+        :type callback:     callable
+        :rtype:             :py:class:`StatusMonitor`
+        """
+        return StatusMonitor(self, names, interval=interval,
+                             callback=callback)
+
+    @property
+    def downloads(self):
+        """ The camera's :py:class:`DownloadScheduler`, which serves
+            downloads by priority.
+        """
+        if self.__downloads is None:
+            with self._lock:
+                if self.__downloads is None:
+                    self.__downloads = DownloadScheduler(self)
+        return self.__downloads
+
     @property
     def filesystem(self):
         """ The camera's root directory. """
         return Directory(name="/", parent=None, camera=self)
 
     @property
-    @exit_after
     def storage_info(self):
-        """ Information about the camera's storage. """
+        """ Information about the camera's storage.
+
+        The information is cached. It is fetched again on the first access
+        after a file was captured, uploaded or removed through this object,
+        other changes require a call to :py:meth:`refresh_storage_info`.
+        """
+        infos = self._storage_info
+        if infos is None:
+            infos = self.refresh_storage_info()
+        return infos
+
+    @exit_after
+    def refresh_storage_info(self):
+        """ Fetch the information about the camera's storage and check the
+            thresholds of all :py:class:`StorageWatcher` objects.
+
+        :return:    The new :py:attr:`storage_info`
+        """
+        return self._refresh_storage_info()
+
+    def watch_storage(self, free_space=None, remaining_images=None,
+                      callback=None, interval=None):
+        """ Get notified when the storage runs low.
+
+        :param free_space:          Threshold for the free space in KiB
+        :type free_space:           int
+        :param remaining_images:    Threshold for the number of images that
+                                    still fit on the storage
+        :type remaining_images:     int
+        :param callback:            Called with the storage information,
+                                    the name of the value and whether it is
+                                    below the threshold now
+        :type callback:             callable
+        :param interval:            Seconds between two refreshes in the
+                                    background, `None` for no background
+                                    refreshes
+        :type interval:             float
+        :rtype:                     :py:class:`StorageWatcher`
+        """
+        return StorageWatcher(self, free_space=free_space,
+                              remaining_images=remaining_images,
+                              callback=callback, interval=interval)
+
+    def _storage_changed(self):
+        """ Invalidate the cached storage information. """
+        self._storage_info = None
+
+    def _refresh_storage_info(self):
         info_p = ffi.new("CameraStorageInformation**")
         num_info_p = ffi.new("int*")
         lib.gp_camera_get_storageinfo(self._cam, info_p, num_info_p, self._ctx)
-        infos = []
-        for idx in range(num_info_p[0]):
-            out = SimpleNamespace()
-            struc = (info_p[0] + idx)
-            fields = struc.fields
-            if lib.GP_STORAGEINFO_BASE & fields:
-                out.directory = next(
-                    (d for d in self.list_all_directories()
-                     if d.path == ffi.string(struc.basedir).decode()),
-                    None)
-            if lib.GP_STORAGEINFO_LABEL & fields:
-                out.label = ffi.string(struc.label).decode()
-            if lib.GP_STORAGEINFO_DESCRIPTION & fields:
-                out.description = ffi.string(struc.description).decode()
-            if lib.GP_STORAGEINFO_STORAGETYPE & fields:
-                stype = struc.type
-                if lib.GP_STORAGEINFO_ST_FIXED_ROM & stype:
-                    out.type = 'fixed_rom'
-                elif lib.GP_STORAGEINFO_ST_REMOVABLE_ROM & stype:
-                    out.type = 'removable_rom'
-                elif lib.GP_STORAGEINFO_ST_FIXED_RAM & stype:
-                    out.type = 'fixed_ram'
-                elif lib.GP_STORAGEINFO_ST_REMOVABLE_RAM & stype:
-                    out.type = 'removable_ram'
-                else:
-                    out.type = 'unknown'
-            if lib.GP_STORAGEINFO_ACCESS & fields:
-                if lib.GP_STORAGEINFO_AC_READWRITE & struc.access:
-                    out.access = 'read-write'
-                elif lib.GP_STORAGEINFO_AC_READONLY & struc.access:
-                    out.access = 'read-only'
-                elif lib.GP_STORAGEINFO_AC_READONLY_WITH_DELETE & struc.access:
-                    out.access = 'read-delete'
-            if lib.GP_STORAGEINFO_MAXCAPACITY & fields:
-                out.capacity = int(struc.capacitykbytes)
-            if lib.GP_STORAGEINFO_FREESPACEKBYTES & fields:
-                out.free_space = int(struc.freekbytes)
-            if lib.GP_STORAGEINFO_FREESPACEIMAGES & fields:
-                out.remaining_images = int(struc.freeimages)
-            infos.append(out)
+        try:
+            infos = [self._parse_storage_info(info_p[0] + idx)
+                     for idx in range(num_info_p[0])]
+        finally:
+            # The array is allocated by libgphoto2 and owned by the caller
+            lib.free(info_p[0])
+        self._storage_info = infos
+        for watcher in list(self._storage_watchers):
+            watcher.check(infos)
         return infos
 
+    def _parse_storage_info(self, struc):
+        out = SimpleNamespace()
+        fields = struc.fields
+        if lib.GP_STORAGEINFO_BASE & fields:
+            out.directory = self._directory_from_path(
+                ffi.string(struc.basedir).decode())
+        if lib.GP_STORAGEINFO_LABEL & fields:
+            out.label = ffi.string(struc.label).decode()
+        if lib.GP_STORAGEINFO_DESCRIPTION & fields:
+            out.description = ffi.string(struc.description).decode()
+        if lib.GP_STORAGEINFO_STORAGETYPE & fields:
+            stype = struc.type
+            if lib.GP_STORAGEINFO_ST_FIXED_ROM & stype:
+                out.type = 'fixed_rom'
+            elif lib.GP_STORAGEINFO_ST_REMOVABLE_ROM & stype:
+                out.type = 'removable_rom'
+            elif lib.GP_STORAGEINFO_ST_FIXED_RAM & stype:
+                out.type = 'fixed_ram'
+            elif lib.GP_STORAGEINFO_ST_REMOVABLE_RAM & stype:
+                out.type = 'removable_ram'
+            else:
+                out.type = 'unknown'
+        if lib.GP_STORAGEINFO_ACCESS & fields:
+            if lib.GP_STORAGEINFO_AC_READWRITE & struc.access:
+                out.access = 'read-write'
+            elif lib.GP_STORAGEINFO_AC_READONLY & struc.access:
+                out.access = 'read-only'
+            elif lib.GP_STORAGEINFO_AC_READONLY_WITH_DELETE & struc.access:
+                out.access = 'read-delete'
+        if lib.GP_STORAGEINFO_MAXCAPACITY & fields:
+            out.capacity = int(struc.capacitykbytes)
+        if lib.GP_STORAGEINFO_FREESPACEKBYTES & fields:
+            out.free_space = int(struc.freekbytes)
+        if lib.GP_STORAGEINFO_FREESPACEIMAGES & fields:
+            out.remaining_images = int(struc.freeimages)
+        return out
+
     def list_all_files(self):
         """ Utility method that yields all files on the device's file
             systems.
@@ -687,17 +2038,17 @@ class Camera(object):
             systems.
         """
         def list_dirs_recursively(directory):
-            if directory == self.filesystem:
+            if directory.parent is None:
                 yield directory
+            subdirs = tuple(directory.directories)
             d_gen = itertools.chain(
-                directory.directories,
-                *tuple(list_dirs_recursively(d)
-                       for d in directory.directories))
+                subdirs,
+                *tuple(list_dirs_recursively(d) for d in subdirs))
             for d in d_gen:
                 yield d
         return list_dirs_recursively(self.filesystem)
 
-    @exit_after
+    @exit_after(priority=PRIORITY_HIGH)
     def capture(self, to_camera_storage=False):
         """ Capture an image.
 
@@ -734,6 +2085,140 @@ class Camera(object):
                 pass
             return data
 
+    @exit_after(priority=PRIORITY_HIGH)
+    def bracket(self, setting, values, to_camera_storage=False,
+                restore=True):
+        """ Capture a series of images with different values for a setting,
+            e.g. for exposure bracketing.
+
+        All values are validated before the first image is taken. The
+        images are captured back to back in a single session, with only one
+        configuration write per image, and are downloaded once the series
+        is complete. The device serves one request at a time, so downloading
+        a frame while the series is running would only widen the gaps
+        between the frames. The capture target is reset afterwards.
+
+        :param setting:             Name of the option to change, e.g.
+                                    `shutterspeed` or `exposurecompensation`
+        :type setting:              str
+        :param values:              Value of the option for each image
+        :type values:               iterable
+        :param to_camera_storage:   Save the images to the camera's internal
+                                    storage, see :py:meth:`capture`
+        :type to_camera_storage:    bool
+        :param restore:             Reset the option to its previous value
+                                    afterwards
+        :type restore:              bool
+        :return:    A :py:class:`File` for every image if `to_camera_storage`
+                    was `True`, otherwise the images as bytestrings.
+        :rtype:     list of :py:class:`File` or list of bytes
+        """
+        config = self._writable_config(self._read_config())
+        item = next((itm for items in config.values()
+                     for itm in items.values() if itm.name == setting), None)
+        if item is None:
+            raise ValueError("Unknown or read-only option: {0}"
+                             .format(setting))
+        values = list(values)
+        for value in values:
+            item._validate(value)
+        original = item.value
+        target = config['settings']['capturetarget']
+        original_target = target.value
+        wanted_target = "Memory card" if to_camera_storage else "Internal RAM"
+        pending = original_target != wanted_target
+        if pending:
+            target._set_value(wanted_target)
+        files = []
+        try:
+            try:
+                for value in values:
+                    if pending or item.value != value:
+                        item._set_value(value)
+                        lib.gp_camera_set_config(self._cam, item._root,
+                                                 self._ctx)
+                        pending = False
+                    lib.gp_camera_trigger_capture(self._cam, self._ctx)
+                    files.append(self._wait_for_event(
+                        event_type=lib.GP_EVENT_FILE_ADDED))
+            finally:
+                if restore and item.value != original:
+                    item._set_value(original)
+                    lib.gp_camera_set_config(self._cam, item._root,
+                                             self._ctx)
+            if to_camera_storage:
+                return files
+            images = []
+            for fobj in files:
+                images.append(fobj._get_data())
+                try:
+                    lib.gp_camera_file_delete(
+                        self._cam, fobj.directory.path.encode(),
+                        fobj.name.encode(), self._ctx)
+                except errors.CameraIOError:
+                    # Already gone from RAM, see capture()
+                    pass
+                self._file_infos.forget(fobj.path)
+            self._storage_changed()
+            return images
+        finally:
+            # Only after the download, the images may be in the camera's RAM
+            if target.value != original_target:
+                target._set_value(original_target)
+                lib.gp_camera_set_config(self._cam, target._root, self._ctx)
+
+    @exit_after
+    def remove_files(self, files):
+        """ Remove multiple files from the device in a single session.
+
+        Files are grouped by their directory. If all files in a directory are
+        to be removed and the camera supports it, the directory is purged
+        with a single folder-level operation, otherwise the files are removed
+        one by one. Errors for individual files do not abort the operation.
+
+        :param files:   Files to remove
+        :type files:    iterable of :py:class:`File`
+        :return:        Files that could not be removed, along with the
+                        error that occured
+        :rtype:         list of (:py:class:`File`, :py:class:`Exception`)
+        """
+        by_dir = OrderedDict()
+        for fobj in files:
+            by_dir.setdefault(fobj.directory.path, []).append(fobj)
+        can_purge = bool(self._abilities.folder_operations &
+                         backend.DIR_OPS.delete_all)
+        failed = []
+        for path, dir_files in by_dir.items():
+            if can_purge:
+                names = set(f.name for f in dir_files)
+                try:
+                    listed = self._list_file_names(path)
+                except errors.GPhoto2Error as e:
+                    # The files are removed one by one, which reports the
+                    # error for each of them
+                    self._logger.warning(
+                        "Could not list {0}: {1}".format(path, e))
+                    listed = None
+                if listed is not None and names.issuperset(listed):
+                    try:
+                        lib.gp_camera_folder_delete_all(
+                            self._cam, path.encode(), self._ctx)
+                        self._file_infos.forget_directory(path)
+                        continue
+                    except errors.GPhoto2Error as e:
+                        self._logger.warning(
+                            "Could not purge {0}, removing files "
+                            "individually: {1}".format(path, e))
+            for fobj in dir_files:
+                try:
+                    lib.gp_camera_file_delete(self._cam, path.encode(),
+                                              fobj.name.encode(), self._ctx)
+                    self._file_infos.forget(fobj.path)
+                except errors.GPhoto2Error as e:
+                    failed.append((fobj, e))
+        self._storage_changed()
+        return failed
+
     def capture_video_context(self):
         """ Get a :py:class:`VideoCaptureContext` object.
 
@@ -743,6 +2228,29 @@ class Camera(object):
         """
         return VideoCaptureContext(self)
 
+    def watch(self, target_dir, delete=False, queue_size=16, callback=None):
+        """ Start a tethering session that downloads every new file.
+
+        Files that are added on the camera, e.g. because the shutter button
+        on the body was pressed, are saved to `target_dir` in the background
+        until :py:meth:`TetherContext.stop` is called.
+
+        :param target_dir:  Directory to save new files to
+        :type target_dir:   str
+        :param delete:      Remove the files from the camera after they were
+                            downloaded, e.g. to free its internal RAM
+        :type delete:       bool
+        :param queue_size:  Maximum number of files waiting for download
+                            before new events are no longer picked up
+        :type queue_size:   int
+        :param callback:    Called with the :py:class:`File` and the local
+                            path after each download
+        :type callback:     callable
+        :rtype:             :py:class:`TetherContext`
+        """
+        return TetherContext(self, target_dir, delete=delete,
+                             queue_size=queue_size, callback=callback)
+
     @exit_after
     def capture_video(self, length):
         """ Capture a video.
@@ -768,37 +2276,81 @@ class Camera(object):
         the camera.  You will need to call the exit() method manually after
         you are done capturing a live preview.
 
+        Live view frames are requested with a low priority, so other
+        operations waiting for the device are served first.
+
         :return:    The preview image as a bytestring
         :rtype:     bytes
         """
-        lib.gp_camera_capture_preview(self._cam, self.__camfile_p[0], self._ctx)
-        lib.gp_file_get_data_and_size(self.__camfile_p[0], self.__data_p, self.__length_p)
-        return ffi.buffer(self.__data_p[0], self.__length_p[0])[:]
+        with self._lock.held(PRIORITY_LOW):
+            with self.native_pool.camera_file() as pooled:
+                lib.gp_camera_capture_preview(self._cam, pooled.camfile,
+                                              self._ctx)
+                return pooled.get_data()
+
+    def session(self, priority=PRIORITY_NORMAL):
+        """ Get a context manager that reserves the device for a sequence of
+            operations.
+
+        Operations from other threads wait until the block is left. In
+        long-running, low-priority sessions, call
+        :py:meth:`yield_if_preempted` regularly to let more important
+        operations through.
+
+        :param priority:    Priority to wait for the device with, one of
+                            :py:data:`gphoto2cffi.util.PRIORITY_LOW`,
+                            `PRIORITY_NORMAL` or `PRIORITY_HIGH`
+        :type priority:     int
+        """
+        return self._lock.held(priority)
+
+    def yield_if_preempted(self):
+        """ Let operations with a higher priority than the current
+            :py:meth:`session` through, then continue.
+
+        :return:    Whether the device was handed over
+        :rtype:     bool
+        """
+        return self._lock.yield_if_preempted()
 
     @property
     def _cam(self):
         if self.__cam is None:
-            self.__cam = new_gp_object("Camera")
+            with self._lock:
+                if self.__cam is None:
+                    self._init_camera()
+        return self.__cam
+
+    def _init_camera(self):
+        cam = new_gp_object("Camera")
+        try:
             if self._usb_address != (None, None):
                 port_name = ("usb:{0:03},{1:03}".format(*self._usb_address)
                                                 .encode())
-                port_list_p = new_gp_object("GPPortInfoList")
-                lib.gp_port_info_list_load(port_list_p)
                 port_info_p = ffi.new("GPPortInfo*")
                 lib.gp_port_info_new(port_info_p)
-                port_num = lib.gp_port_info_list_lookup_path(
-                    port_list_p, port_name)
-                lib.gp_port_info_list_get_info(port_list_p, port_num,
-                                               port_info_p)
-                lib.gp_camera_set_port_info(self.__cam, port_info_p[0])
-                lib.gp_camera_init(self.__cam, self._ctx)
+                with gp_object("GPPortInfoList") as port_list_p:
+                    lib.gp_port_info_list_load(port_list_p)
+                    port_num = lib.gp_port_info_list_lookup_path(
+                        port_list_p, port_name)
+                    lib.gp_port_info_list_get_info(port_list_p, port_num,
+                                                   port_info_p)
+                    lib.gp_camera_set_port_info(cam, port_info_p[0])
+                lib.gp_camera_init(cam, self._ctx)
             else:
                 try:
-                    lib.gp_camera_init(self.__cam, self._ctx)
+                    lib.gp_camera_init(cam, self._ctx)
                 except errors.UnsupportedDevice as e:
                     raise errors.UnsupportedDevice(
                         e.error_code, "Could not find any supported devices.")
-        return self.__cam
+        except Exception:
+            # Nothing refers to the handle yet, so it would never be freed
+            free_gp_object("Camera", cam)
+            raise
+        self.__cam = cam
+        metrics.CAMERA_LABELS[self._cam_address] = (
+            "usb:{0:03},{1:03}".format(*self._usb_address)
+            if self._usb_address != (None, None) else "auto")
 
     @property
     def _abilities(self):
@@ -807,6 +2359,10 @@ class Camera(object):
             lib.gp_camera_get_abilities(self._cam, self.__abilities)
         return self.__abilities
 
+    @property
+    def _cam_address(self):
+        return int(ffi.cast("uintptr_t", self.__cam))
+
     def _wait_for_event(self, event_type=None, duration=0):
         if event_type is None and not duration:
             raise ValueError("Please specifiy either `event_type` or "
@@ -820,6 +2376,7 @@ class Camera(object):
                 self._logger.info("Capture completed.")
             elif self.__event_type_p[0] == lib.GP_EVENT_FILE_ADDED:
                 self._logger.info("File added.")
+                self._storage_changed()
             elif self.__event_type_p[0] == lib.GP_EVENT_TIMEOUT:
                 self._logger.debug("Timeout while waiting for event.")
                 continue
@@ -828,16 +2385,62 @@ class Camera(object):
                          if duration else False))
             if do_break:
                 break
-        if event_type == lib.GP_EVENT_FILE_ADDED:
-            camfile_p = ffi.cast("CameraFilePath*", self.__event_data_p[0])
-            dirname = ffi.string(camfile_p[0].folder).decode()
-            directory = next(f for f in self.list_all_directories()
-                             if f.path == dirname)
-            return File(name=ffi.string(camfile_p[0].name).decode(),
-                        directory=directory, camera=self)
+            self._free_event_data()
+        try:
+            if event_type == lib.GP_EVENT_FILE_ADDED:
+                camfile_p = ffi.cast("CameraFilePath*",
+                                     self.__event_data_p[0])
+                dirname = ffi.string(camfile_p[0].folder).decode()
+                return File(name=ffi.string(camfile_p[0].name).decode(),
+                            directory=self._directory_from_path(dirname),
+                            camera=self)
+        finally:
+            self._free_event_data()
+
+    def _free_event_data(self):
+        """ Free the data of the last event, which is allocated by
+            libgphoto2 and owned by the caller.
+        """
+        lib.free(self.__event_data_p[0])
+        self.__event_data_p[0] = ffi.NULL
+
+    def _directory_from_path(self, path):
+        directory = self.filesystem
+        for name in path.strip("/").split("/"):
+            if name:
+                directory = Directory(name=name, parent=directory,
+                                      camera=self)
+        return directory
+
+    def _file_from_path(self, path):
+        dirname, name = path.rsplit("/", 1)
+        return File(name=name, directory=self._directory_from_path(dirname),
+                    camera=self)
+
+    def _list_file_names(self, path):
+        with gp_object("CameraList") as filelist_p:
+            lib.gp_camera_folder_list_files(self._cam, path.encode(),
+                                            filelist_p, self._ctx)
+            return [get_string(lib.gp_list_get_name, filelist_p, idx)
+                    for idx in range(lib.gp_list_count(filelist_p))]
+
+    @staticmethod
+    def _writable_config(config):
+        return {section: {itm.name: itm for itm in config[section].values()
+                          if not itm.readonly}
+                for section in config
+                if 'settings' in section or section == 'other'}
 
     @exit_after
     def _get_config(self):
+        return self._read_config()
+
+    def _read_config(self):
+        """ Fetch the configuration tree.
+
+        The tree is freed once no :py:class:`ConfigItem` refers to it
+        anymore.
+        """
         def _widget_to_dict(cwidget):
             out = {}
             for idx in range(lib.gp_widget_count_children(cwidget)):
@@ -849,22 +2452,72 @@ class Camera(object):
                 if typenum in (lib.GP_WIDGET_WINDOW, lib.GP_WIDGET_SECTION):
                     out[key] = _widget_to_dict(child_p[0])
                 else:
-                    item = ConfigItem(child_p[0], self)
+                    item = ConfigItem(child_p[0], self, root)
                     out[key] = item
             return out
         root_widget = ffi.new("CameraWidget**")
         lib.gp_camera_get_config(self._cam, root_widget, self._ctx)
-        return _widget_to_dict(root_widget[0])
+        root = gc_gp_object("CameraWidget", root_widget[0])
+        return _widget_to_dict(root)
 
     @exit_after
     def exit(self):
         pass
 
+    def close(self):
+        """ Release the device and free all native resources.
+
+        The camera is initialized again if it is used afterwards. This is
+        also done when the object is garbage collected, but calling it
+        explicitly releases the device right away.
+        """
+        downloads, self.__downloads = self.__downloads, None
+        if downloads is not None:
+            downloads.close()
+        with self._lock:
+            self._release()
+
+    def _release(self):
+        """ Free the device and all native resources, with the device lock
+            held.
+        """
+        if self.__cam is not None:
+            metrics.CAMERA_LABELS.pop(self._cam_address, None)
+            cam, self.__cam = self.__cam, None
+            try:
+                lib.gp_camera_exit(cam, self._ctx)
+            finally:
+                free_gp_object("Camera", cam)
+        self.native_pool.clear()
+        self._file_infos.clear()
+        self._storage_info = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
     def __repr__(self):
         return "<Camera \"{0}\" at usb:{1:03}:{2:03}>".format(
             self.model_name, *self._usb_address)
 
     def __del__(self):
-        if self.__cam is not None:
-            lib.gp_camera_exit(self.__cam, self._ctx)
-            lib.gp_camera_unref(self.__cam)
+        # Pooled objects do not need the device lock
+        self.native_pool.clear()
+        if self.__cam is None:
+            return
+        # The thread running the garbage collector may be waiting for the
+        # device lock or hold it already, so never block on it here and
+        # release the device on another thread if it is busy
+        if self._lock.acquire(blocking=False):
+            try:
+                self._release()
+            finally:
+                self._lock.release()
+        else:
+            args = (self._lock, self.__cam, self._ctx, self._cam_address)
+            self.__cam = None
+            thread = threading.Thread(target=_release_camera, args=args)
+            thread.daemon = True
+            thread.start()
@@ -0,0 +1,155 @@
+""" Accounting of native libgphoto2 objects, to track down leaks.
+
+Enable it with
+:py:meth:`gphoto2cffi.backend.LibraryWrapper.enable_leak_tracking`:
+
+.. code:: python
+
+    from gphoto2cffi import backend, leaks
+
+    tracker = backend.lib.enable_leak_tracking(
+        leaks.LeakTracker(keep_stacks=True))
+    ...
+    print(tracker.report())
+
+Objects are accounted for when they are returned by one of the
+:py:data:`CONSTRUCTORS` and removed when they are passed to one of the
+:py:data:`DESTRUCTORS`. Objects that are freed implicitly by libgphoto2
+(e.g. child widgets together with their root) are not tracked.
+"""
+from __future__ import division
+
+import threading
+import time
+import traceback
+from collections import Counter
+
+from ._backend import ffi
+
+#: Functions that create objects, mapped to the type of the created object
+#: and the index of the argument it is returned in (`None` for the return
+#: value)
+CONSTRUCTORS = {
+    "gp_context_new": ("GPContext", None),
+    "gp_camera_new": ("Camera", 0),
+    "gp_list_new": ("CameraList", 0),
+    "gp_file_new": ("CameraFile", 0),
+    "gp_file_new_from_fd": ("CameraFile", 0),
+    "gp_port_info_list_new": ("GPPortInfoList", 0),
+    "gp_abilities_list_new": ("CameraAbilitiesList", 0),
+    "gp_widget_new": ("CameraWidget", 2),
+    "gp_camera_get_config": ("CameraWidget", 1),
+    "gp_camera_get_single_config": ("CameraWidget", 2)}
+
+#: Functions that add a reference to an object
+REFERENCES = ("gp_camera_ref",)
+
+#: Functions that drop a reference to an object or free it
+DESTRUCTORS = ("gp_context_unref", "gp_camera_unref", "gp_camera_free",
+               "gp_list_free", "gp_file_free", "gp_port_info_list_free",
+               "gp_abilities_list_free", "gp_widget_free")
+
+
+def _address(ptr):
+    return int(ffi.cast("uintptr_t", ptr))
+
+
+class LeakTracker(object):
+    """ Keeps track of the native objects that are currently alive.
+
+    :param keep_stacks: Remember the stack each object was created from, which
+                        makes creating objects considerably slower
+    """
+    def __init__(self, keep_stacks=False):
+        self.keep_stacks = keep_stacks
+        self._lock = threading.Lock()
+        # Address -> [type, reference count, creation time, stack]
+        self._live = {}
+
+    def wrap(self, name, func):
+        """ Wrap a function so that the objects it creates or frees are
+            accounted for.
+
+        :param name:    Name of the C function
+        :param func:    Function to wrap
+        :return:        Wrapped function, or `func` itself if it does not
+                        create or free objects
+        """
+        if name in CONSTRUCTORS:
+            typename, idx = CONSTRUCTORS[name]
+
+            def tracked(*args):
+                rval = func(*args)
+                if idx is None:
+                    self.created(typename, rval)
+                elif rval >= 0:
+                    self.created(typename, args[idx][0])
+                return rval
+        elif name in REFERENCES:
+            def tracked(*args):
+                rval = func(*args)
+                if rval >= 0:
+                    self.referenced(args[0])
+                return rval
+        elif name in DESTRUCTORS:
+            def tracked(*args):
+                self.freed(args[0], force=(name == "gp_camera_free"))
+                return func(*args)
+        else:
+            return func
+        return tracked
+
+    def created(self, typename, ptr):
+        if ptr == ffi.NULL:
+            return
+        stack = (traceback.format_stack(limit=12)[:-3]
+                 if self.keep_stacks else None)
+        with self._lock:
+            self._live[_address(ptr)] = [typename, 1, time.time(), stack]
+
+    def referenced(self, ptr):
+        with self._lock:
+            entry = self._live.get(_address(ptr))
+            if entry is not None:
+                entry[1] += 1
+
+    def freed(self, ptr, force=False):
+        address = _address(ptr)
+        with self._lock:
+            entry = self._live.get(address)
+            if entry is None:
+                return
+            entry[1] -= 1
+            if force or not entry[1]:
+                del self._live[address]
+
+    def live(self):
+        """ Count the objects that are alive, by type.
+
+        :rtype: dict
+        """
+        with self._lock:
+            return dict(Counter(entry[0] for entry in self._live.values()))
+
+    def report(self, min_age=0):
+        """ Describe the objects that are alive.
+
+        :param min_age: Only include objects that are at least this many
+                        seconds old
+        :return:        One paragraph per object, with its creation stack if
+                        :py:attr:`keep_stacks` is set
+        :rtype:         str
+        """
+        now = time.time()
+        with self._lock:
+            entries = sorted((created, typename, address, stack)
+                             for address, (typename, _, created, stack)
+                             in self._live.items()
+                             if now - created >= min_age)
+        lines = []
+        for created, typename, address, stack in entries:
+            lines.append("{0} at {1:#x}, created {2:.1f}s ago".format(
+                typename, address, now - created))
+            if stack:
+                lines.append("".join(stack).rstrip())
+        return "\n".join(lines)
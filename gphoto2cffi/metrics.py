@@ -0,0 +1,179 @@
+""" Call counts, error counts and latency histograms of library calls.
+
+Enable it with :py:meth:`gphoto2cffi.backend.LibraryWrapper.enable_metrics`
+and export the collected data, e.g. to Prometheus:
+
+.. code:: python
+
+    from gphoto2cffi import backend
+
+    metrics = backend.lib.enable_metrics()
+    ...
+    print(metrics.to_prometheus())
+
+Calls are attributed to the camera they operate on by the label in
+:py:data:`CAMERA_LABELS`, i.e. the USB address of the device.
+"""
+from __future__ import division
+
+import threading
+import time
+
+from ._backend import ffi
+
+#: Clock used for latency measurements
+_clock = getattr(time, 'perf_counter', time.time)
+
+#: Upper bounds (in seconds) of the default latency histogram buckets
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0,
+                   10.0)
+
+#: Mapping from the addresses of initialized `Camera*` handles to a
+#: human-readable label, used to attribute calls to a device.
+CAMERA_LABELS = {}
+
+_CAMERA_TYPE = ffi.typeof("Camera*")
+
+
+def camera_label(args):
+    """ Get the label of the camera a libgphoto2 call operates on.
+
+    :param args:    Arguments the C function was called with
+    :return:        Label of the camera or an empty string if the call is
+                    not bound to a camera
+    :rtype:         str
+    """
+    if args and isinstance(args[0], ffi.CData):
+        if ffi.typeof(args[0]) is _CAMERA_TYPE:
+            addr = int(ffi.cast("uintptr_t", args[0]))
+            return CAMERA_LABELS.get(addr, "{0:#x}".format(addr))
+    return ""
+
+
+class CallMetrics(object):
+    """ Collects call counts, error counts and latency histograms for
+        libgphoto2 calls, keyed by C function and camera.
+
+    Enable it with
+    :py:meth:`gphoto2cffi.backend.LibraryWrapper.enable_metrics`.
+
+    :param buckets:     Upper bounds of the latency histogram buckets in
+                        seconds
+    """
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def wrap(self, name, func):
+        """ Wrap a function so that its calls are recorded.
+
+        :param name:    Name of the C function
+        :param func:    Function to wrap
+        :return:        Wrapped function
+        """
+        def timed(*args, **kwargs):
+            start = _clock()
+            failed = True
+            try:
+                rval = func(*args, **kwargs)
+                failed = isinstance(rval, int) and rval < 0
+                return rval
+            finally:
+                self.record(name, camera_label(args), _clock() - start,
+                            failed)
+        return timed
+
+    def record(self, name, camera, duration, failed=False):
+        """ Record a single call.
+
+        :param name:        Name of the C function
+        :param camera:      Label of the camera
+        :param duration:    Duration of the call in seconds
+        :param failed:      Whether the call returned an error
+        """
+        with self._lock:
+            stats = self._stats.get((name, camera))
+            if stats is None:
+                stats = [0, 0, 0.0, [0] * (len(self.buckets) + 1)]
+                self._stats[(name, camera)] = stats
+            stats[0] += 1
+            if failed:
+                stats[1] += 1
+            stats[2] += duration
+            for idx, bound in enumerate(self.buckets):
+                if duration <= bound:
+                    break
+            else:
+                idx = len(self.buckets)
+            stats[3][idx] += 1
+
+    def reset(self):
+        """ Discard all recorded data. """
+        with self._lock:
+            self._stats.clear()
+
+    def snapshot(self):
+        """ Get the recorded data.
+
+        :return:    Mapping from `(function, camera)` tuples to dictionaries
+                    with the keys `calls`, `errors`, `total_time` and
+                    `buckets`, the latter being a list of
+                    `(upper_bound, count)` tuples with non-cumulative counts
+        :rtype:     dict
+        """
+        bounds = self.buckets + (float('inf'),)
+        with self._lock:
+            return {key: {'calls': calls, 'errors': errs,
+                          'total_time': total,
+                          'buckets': list(zip(bounds, hist))}
+                    for key, (calls, errs, total, hist)
+                    in self._stats.items()}
+
+    def to_prometheus(self, prefix="gphoto2"):
+        """ Render the recorded data in the Prometheus text exposition
+            format.
+
+        :param prefix:  Prefix for the metric names
+        :type prefix:   str
+        :rtype:         str
+        """
+        snapshot = sorted(self.snapshot().items())
+        lines = [
+            "# HELP {0}_calls_total Number of libgphoto2 calls.".format(
+                prefix),
+            "# TYPE {0}_calls_total counter".format(prefix)]
+        for (name, camera), stats in snapshot:
+            lines.append("{0}_calls_total{1} {2}".format(
+                prefix, _labels(name, camera), stats['calls']))
+        lines.extend([
+            "# HELP {0}_errors_total Number of failed libgphoto2 calls."
+            .format(prefix),
+            "# TYPE {0}_errors_total counter".format(prefix)])
+        for (name, camera), stats in snapshot:
+            lines.append("{0}_errors_total{1} {2}".format(
+                prefix, _labels(name, camera), stats['errors']))
+        lines.extend([
+            "# HELP {0}_call_duration_seconds Latency of libgphoto2 calls."
+            .format(prefix),
+            "# TYPE {0}_call_duration_seconds histogram".format(prefix)])
+        for (name, camera), stats in snapshot:
+            cumulative = 0
+            for bound, count in stats['buckets']:
+                cumulative += count
+                le = "+Inf" if bound == float('inf') else repr(bound)
+                lines.append("{0}_call_duration_seconds_bucket{1} {2}".format(
+                    prefix, _labels(name, camera, le=le), cumulative))
+            lines.append("{0}_call_duration_seconds_sum{1} {2!r}".format(
+                prefix, _labels(name, camera), stats['total_time']))
+            lines.append("{0}_call_duration_seconds_count{1} {2}".format(
+                prefix, _labels(name, camera), stats['calls']))
+        return "\n".join(lines) + "\n"
+
+
+def _labels(name, camera, **extra):
+    labels = [("function", name), ("camera", camera)]
+    labels.extend(sorted(extra.items()))
+    return "{{{0}}}".format(",".join(
+        '{0}="{1}"'.format(k, v.replace('\\', '\\\\').replace('"', '\\"'))
+        for k, v in labels))
@@ -0,0 +1,287 @@
+""" Index of the camera models supported by libgphoto2.
+
+Listing the supported models requires libgphoto2 to load every camera
+driver, which takes a noticeable amount of time. A :py:class:`ModelDatabase`
+is built once per version of libgphoto2 and cached on disk, so later
+lookups in this or other processes only have to read the cache:
+
+.. code:: python
+
+    from gphoto2cffi import models
+
+    database = models.get_database()
+    for model in database.by_usb_id(0x04a9, 0x3218):
+        print(model.model, model.driver, model.supported_operations)
+"""
+from __future__ import absolute_import, unicode_literals
+
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import namedtuple
+
+from . import backend
+from .backend import ffi, lib
+from .util import gc_gp_object, gp_object
+
+LOGGER = logging.getLogger(__name__)
+
+#: Version of the cache file format
+FORMAT_VERSION = 1
+
+DRIVER_STATUS = {
+    lib.GP_DRIVER_STATUS_PRODUCTION: 'production',
+    lib.GP_DRIVER_STATUS_TESTING: 'testing',
+    lib.GP_DRIVER_STATUS_EXPERIMENTAL: 'experimental',
+    lib.GP_DRIVER_STATUS_DEPRECATED: 'deprecated'}
+
+DEVICE_TYPES = {
+    lib.GP_DEVICE_STILL_CAMERA: 'still_camera',
+    lib.GP_DEVICE_AUDIO_PLAYER: 'audio_player'}
+
+
+class CameraModel(namedtuple("CameraModel", (
+        'model', 'driver', 'status', 'device_type', 'usb_vendor',
+        'usb_product', 'usb_class', 'usb_subclass', 'usb_protocol',
+        'operations', 'file_operations', 'folder_operations'))):
+    """ A model supported by libgphoto2.
+
+    :py:attr:`operations`, :py:attr:`file_operations` and
+    :py:attr:`folder_operations` are bitmasks of
+    :py:data:`gphoto2cffi.backend.CAM_OPS`,
+    :py:data:`gphoto2cffi.backend.FILE_OPS` and
+    :py:data:`gphoto2cffi.backend.DIR_OPS`.
+    """
+    __slots__ = ()
+
+    @property
+    def supported_operations(self):
+        """ All operations supported by the model. """
+        return tuple(op for op in backend.CAM_OPS if self.operations & op)
+
+    @property
+    def supported_file_operations(self):
+        """ All file operations supported by the model. """
+        return tuple(op for op in backend.FILE_OPS
+                     if self.file_operations & op)
+
+    @property
+    def supported_directory_operations(self):
+        """ All directory operations supported by the model. """
+        return tuple(op for op in backend.DIR_OPS
+                     if self.folder_operations & op)
+
+
+def _library_version():
+    return ffi.string(lib.gp_library_version(True)[0]).decode()
+
+
+def default_cache_dir():
+    """ Get the directory the database is cached in by default.
+
+    :rtype: str
+    """
+    base = (os.environ.get('XDG_CACHE_HOME') or
+            os.path.join(os.path.expanduser("~"), ".cache"))
+    return os.path.join(base, "gphoto2cffi")
+
+
+class ModelDatabase(object):
+    """ The supported camera models, indexed for lookups.
+
+    :param models:          All models
+    :type models:           iterable of :py:class:`CameraModel`
+    :param library_version: Version of libgphoto2 the models were read from
+    :param camlibs:         Directory the drivers were loaded from, if it was
+                            overridden with the `CAMLIBS` environment
+                            variable
+    """
+    def __init__(self, models, library_version, camlibs=None):
+        #: All models, in the order reported by libgphoto2
+        self.models = tuple(models)
+        self.library_version = library_version
+        self.camlibs = camlibs
+        by_usb_id = {}
+        by_driver = {}
+        self._by_model = {}
+        for model in self.models:
+            # Models without an id are matched by their USB class
+            if model.usb_vendor or model.usb_product:
+                by_usb_id.setdefault((model.usb_vendor, model.usb_product),
+                                     []).append(model)
+            by_driver.setdefault(model.driver, []).append(model)
+            self._by_model.setdefault(model.model.lower(), model)
+        self._by_usb_id = {key: tuple(val) for key, val in by_usb_id.items()}
+        self._by_driver = {key: tuple(val) for key, val in by_driver.items()}
+
+    @classmethod
+    def from_library(cls):
+        """ Build the database from the drivers of the loaded libgphoto2.
+
+        :rtype: :py:class:`ModelDatabase`
+        """
+        ctx = gc_gp_object("GPContext", lib.gp_context_new())
+        abilities = ffi.new("CameraAbilities*")
+        models = []
+        with gp_object("CameraAbilitiesList") as abilities_list_p:
+            lib.gp_abilities_list_load(abilities_list_p, ctx)
+            for idx in range(lib.gp_abilities_list_count(abilities_list_p)):
+                lib.gp_abilities_list_get_abilities(abilities_list_p, idx,
+                                                    abilities)
+                models.append(CameraModel(
+                    model=ffi.string(abilities.model).decode(),
+                    driver=os.path.basename(
+                        ffi.string(abilities.library).decode()),
+                    status=DRIVER_STATUS.get(abilities.status, 'unknown'),
+                    device_type=DEVICE_TYPES.get(abilities.device_type,
+                                                 'unknown'),
+                    usb_vendor=abilities.usb_vendor,
+                    usb_product=abilities.usb_product,
+                    usb_class=abilities.usb_class,
+                    usb_subclass=abilities.usb_subclass,
+                    usb_protocol=abilities.usb_protocol,
+                    operations=int(abilities.operations),
+                    file_operations=int(abilities.file_operations),
+                    folder_operations=int(abilities.folder_operations)))
+        return cls(models, _library_version(), os.environ.get('CAMLIBS'))
+
+    @classmethod
+    def load(cls, path):
+        """ Read a database written with :py:meth:`save`.
+
+        :param path:    Path of the file
+        :rtype:         :py:class:`ModelDatabase`
+        :raises ValueError: If the file is not a database of the current
+                            format
+        """
+        with open(path) as fp:
+            data = json.load(fp)
+        if not isinstance(data, dict) or data.get('format') != FORMAT_VERSION:
+            raise ValueError("Unsupported model database format in {0}"
+                             .format(path))
+        return cls((CameraModel(*fields) for fields in data['models']),
+                   data['library_version'], data['camlibs'])
+
+    def save(self, path):
+        """ Write the database to a file.
+
+        The file is replaced atomically, so concurrent readers never see a
+        partially written database.
+
+        :param path:    Path of the file
+        """
+        data = {'format': FORMAT_VERSION,
+                'library_version': self.library_version,
+                'camlibs': self.camlibs,
+                'models': [list(model) for model in self.models]}
+        dirname = os.path.dirname(path) or "."
+        fd, tmp_path = tempfile.mkstemp(dir=dirname, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w') as fp:
+                json.dump(data, fp, separators=(',', ':'))
+            os.rename(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def by_usb_id(self, vendor, product):
+        """ Look up the models with the given USB vendor and product id.
+
+        :param vendor:  USB vendor id
+        :type vendor:   int
+        :param product: USB product id
+        :type product:  int
+        :rtype:         tuple of :py:class:`CameraModel`
+        """
+        return self._by_usb_id.get((vendor, product), ())
+
+    def by_model(self, name):
+        """ Look up a model by its name, ignoring case.
+
+        :param name:    Model name, e.g. `Canon EOS 5D Mark III`
+        :return:        The model or `None` if it is not supported
+        :rtype:         :py:class:`CameraModel`
+        """
+        return self._by_model.get(name.lower())
+
+    def by_driver(self, driver):
+        """ Get all models supported by a driver.
+
+        :param driver:  Name of the driver, e.g. `ptp2.so`
+        :rtype:         tuple of :py:class:`CameraModel`
+        """
+        return self._by_driver.get(driver, ())
+
+    @property
+    def drivers(self):
+        """ Names of all drivers, sorted. """
+        return tuple(sorted(self._by_driver))
+
+    def __len__(self):
+        return len(self.models)
+
+    def __iter__(self):
+        return iter(self.models)
+
+
+_DATABASES = {}
+_DATABASES_LOCK = threading.Lock()
+
+
+def cache_path(cache_dir=None):
+    """ Get the path the database for the loaded libgphoto2 is cached at.
+
+    :param cache_dir:   Directory of the cache, defaults to
+                        :py:func:`default_cache_dir`
+    :rtype:             str
+    """
+    return os.path.join(cache_dir or default_cache_dir(),
+                        "models-{0}.json".format(_library_version()))
+
+
+def get_database(cache=True, cache_dir=None, refresh=False):
+    """ Get the database for the loaded libgphoto2.
+
+    The database is kept in memory for the lifetime of the process. It is
+    read from the on-disk cache if there is a valid one for the version of
+    libgphoto2, otherwise it is built from the drivers and the cache is
+    written. Failures to read or write the cache are not fatal.
+
+    :param cache:       Use the on-disk cache
+    :type cache:        bool
+    :param cache_dir:   Directory of the cache, defaults to
+                        :py:func:`default_cache_dir`
+    :param refresh:     Rebuild the database from the drivers, e.g. after
+                        they were updated without a version change
+    :type refresh:      bool
+    :rtype:             :py:class:`ModelDatabase`
+    """
+    key = (_library_version(), os.environ.get('CAMLIBS'))
+    with _DATABASES_LOCK:
+        database = None if refresh else _DATABASES.get(key)
+        if database is not None:
+            return database
+        path = cache_path(cache_dir) if cache else None
+        if path is not None and not refresh:
+            try:
+                database = ModelDatabase.load(path)
+            except (IOError, OSError, ValueError, KeyError, TypeError):
+                database = None
+            if (database is not None and
+                    (database.library_version, database.camlibs) != key):
+                database = None
+        if database is None:
+            database = ModelDatabase.from_library()
+            if path is not None:
+                try:
+                    if not os.path.isdir(os.path.dirname(path)):
+                        os.makedirs(os.path.dirname(path))
+                    database.save(path)
+                except (IOError, OSError):
+                    LOGGER.warning(
+                        "Could not cache the model database at {0}"
+                        .format(path), exc_info=True)
+        _DATABASES[key] = database
+        return database
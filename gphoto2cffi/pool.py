@@ -0,0 +1,239 @@
+""" Process-wide pool of initialized camera handles.
+
+Initializing a :py:class:`gphoto2cffi.Camera` loads the port list, looks up
+the port and runs `gp_camera_init`, which takes a significant amount of
+time. A :py:class:`CameraPool` keeps initialized cameras around, keyed by
+their USB address and model, and hands out leases on them:
+
+.. code:: python
+
+    from gphoto2cffi import pool
+
+    with pool.get_pool().lease(bus=1, device=5) as camera:
+        camera.capture()
+"""
+from __future__ import absolute_import
+
+import threading
+import time
+
+from . import errors
+from .backend import ffi, lib
+from .gphoto2 import Camera, list_cameras
+
+
+class _Entry(object):
+    def __init__(self, camera):
+        self.camera = camera
+        self.leases = 0
+        self.last_used = time.time()
+
+
+class Lease(object):
+    """ A lease on a pooled camera, returned by :py:meth:`CameraPool.lease`.
+
+    Can be used as a context manager, which releases the lease upon leaving.
+    """
+    def __init__(self, pool, entry):
+        self._pool = pool
+        self._entry = entry
+        #: The leased :py:class:`gphoto2cffi.Camera`
+        self.camera = entry.camera
+
+    def release(self):
+        """ Return the camera to the pool. """
+        if self.camera is not None:
+            self._pool._release(self._entry)
+            self.camera = None
+
+    def __enter__(self):
+        return self.camera
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+
+class CameraPool(object):
+    """ Pool of initialized camera handles.
+
+    Cameras may be leased by several users at the same time, since access to
+    a device is serialized by the camera itself.
+
+    :param max_idle:        Seconds after which cameras without leases are
+                            closed by :py:meth:`evict_idle`
+    :param check_after:     Seconds a camera has to be idle before its
+                            health is checked when it is leased again
+    """
+    def __init__(self, max_idle=300, check_after=5):
+        self.max_idle = max_idle
+        self.check_after = check_after
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def lease(self, bus, device, model=None):
+        """ Lease the camera at the given USB address.
+
+        An initialized handle from the pool is used if one exists and is
+        healthy, otherwise the camera is initialized.
+
+        :param bus:     USB bus number
+        :param device:  USB device number
+        :param model:   Expected model name, a pooled handle for a different
+                        model at the same address is discarded if it is not
+                        leased
+        :rtype:         :py:class:`Lease`
+        :raises gphoto2cffi.errors.UnsupportedDevice: If the camera at the
+                        address is not of the expected model
+        """
+        key = (bus, device)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._is_fresh(entry, model):
+                entry.leases += 1
+                entry.last_used = time.time()
+                return Lease(self, entry)
+            elif entry is not None:
+                if entry.leases:
+                    # Another model is in use at the address
+                    self._model_mismatch(key, model,
+                                         entry.camera.model_name)
+                # Not leased by anyone, check it without blocking the pool
+                del self._entries[key]
+        if entry is not None and not self._is_usable(entry, model):
+            self._close(entry.camera)
+            entry = None
+        if entry is None:
+            # Initialization is slow, do not block leases of other cameras
+            camera = Camera(bus, device)
+            if model is not None and camera.model_name != model:
+                found = camera.model_name
+                self._close(camera)
+                self._model_mismatch(key, model, found)
+            entry = _Entry(camera)
+        with self._lock:
+            # Another thread may have pooled a handle for the device in the
+            # meantime, in which case ours is dropped
+            pooled = self._entries.setdefault(key, entry)
+            found = pooled.camera.model_name
+            mismatch = model is not None and found != model
+            if not mismatch:
+                pooled.leases += 1
+                pooled.last_used = time.time()
+        if pooled is not entry:
+            self._close(entry.camera)
+        if mismatch:
+            self._model_mismatch(key, model, found)
+        return Lease(self, pooled)
+
+    def list_cameras(self):
+        """ List all attached cameras, using pooled handles where available.
+
+        :rtype: list of :py:class:`gphoto2cffi.Camera`
+        """
+        cameras = list_cameras()
+        with self._lock:
+            return [self._entries[cam._usb_address].camera
+                    if cam._usb_address in self._entries else cam
+                    for cam in cameras]
+
+    def evict_idle(self):
+        """ Close all cameras that have not been leased for longer than
+            :py:attr:`max_idle`.
+
+        :return:    Number of evicted cameras
+        :rtype:     int
+        """
+        now = time.time()
+        with self._lock:
+            idle = [self._entries.pop(key)
+                    for key, entry in list(self._entries.items())
+                    if not entry.leases and
+                    now - entry.last_used > self.max_idle]
+        # Closing is slow, do not block leases of other cameras
+        for entry in idle:
+            self._close(entry.camera)
+        return len(idle)
+
+    def close(self):
+        """ Close all cameras in the pool, regardless of leases. """
+        with self._lock:
+            entries, self._entries = self._entries, {}
+        for entry in entries.values():
+            self._close(entry.camera)
+
+    def stats(self):
+        """ Get the state of the pooled cameras.
+
+        :return:    Mapping from USB addresses to the number of active
+                    leases and the seconds since the camera was last used
+        :rtype:     dict
+        """
+        now = time.time()
+        with self._lock:
+            return {key: {'leases': entry.leases,
+                          'idle': now - entry.last_used}
+                    for key, entry in self._entries.items()}
+
+    def _release(self, entry):
+        with self._lock:
+            # The entry may have been dropped from the pool in the meantime,
+            # its count is kept consistent anyway
+            if entry.leases > 0:
+                entry.leases -= 1
+            entry.last_used = time.time()
+
+    @staticmethod
+    def _model_mismatch(key, model, found):
+        raise errors.UnsupportedDevice(
+            lib.GP_ERROR_MODEL_NOT_FOUND,
+            "Expected {0} at usb:{1:03},{2:03}, found {3}."
+            .format(model, key[0], key[1], found))
+
+    def _is_fresh(self, entry, model):
+        """ Whether the entry can be handed out without a health check. """
+        return ((model is None or entry.camera.model_name == model) and
+                (entry.leases or
+                 time.time() - entry.last_used < self.check_after))
+
+    def _is_usable(self, entry, model):
+        if model is not None and entry.camera.model_name != model:
+            return False
+        return self._is_healthy(entry.camera)
+
+    @staticmethod
+    def _is_healthy(camera):
+        """ Check whether the device still responds. """
+        info_p = ffi.new("CameraStorageInformation**")
+        num_info_p = ffi.new("int*")
+        try:
+            with camera._lock:
+                lib.gp_camera_get_storageinfo(camera._cam, info_p,
+                                              num_info_p, camera._ctx)
+                lib.free(info_p[0])
+                lib.gp_camera_exit(camera._cam, camera._ctx)
+        except errors.GPhoto2Error:
+            return False
+        return True
+
+    @staticmethod
+    def _close(camera):
+        try:
+            camera.close()
+        except errors.GPhoto2Error:
+            pass
+
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_pool():
+    """ Get the process-wide default pool.
+
+    :rtype: :py:class:`CameraPool`
+    """
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = CameraPool()
+        return _POOL
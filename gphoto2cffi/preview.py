@@ -0,0 +1,296 @@
+""" Distribution of live view frames to other local processes through shared
+memory.
+
+A :py:class:`PreviewPublisher` captures preview frames from a camera and
+writes them straight from libgphoto2's buffer into a ring of slots in a
+:py:class:`multiprocessing.shared_memory.SharedMemory` block. Any number of
+:py:class:`PreviewReader` instances, in the same or other processes, can
+then read the frames without copying them and without touching the camera:
+
+.. code:: python
+
+    # Publishing process
+    publisher = PreviewPublisher(camera, name="gphoto2-liveview")
+    publisher.start()
+
+    # Consuming processes
+    reader = PreviewReader("gphoto2-liveview")
+    frame = reader.wait()
+    while True:
+        histogram(frame.data)
+        if not frame.valid:
+            # Overwritten while it was being processed
+            pass
+        frame = reader.wait(after=frame.sequence)
+
+Every frame carries a sequence number, which starts at 1 and increases by
+one for every published frame, so readers can tell how many frames they
+missed. A frame's data stays valid until the slot is reused, i.e. for the
+next `slots - 1` frames.
+
+Requires Python 3.8 or newer.
+"""
+from __future__ import absolute_import, division
+
+import struct
+import threading
+import time
+from collections import namedtuple
+from multiprocessing import shared_memory
+
+from . import errors
+from .backend import ffi, lib
+from .util import PRIORITY_LOW
+
+MAGIC = b"GP2PREV1"
+
+# Magic, number of slots, slot size, sequence number of the latest frame
+_HEADER = struct.Struct("<8sIIQ")
+# Sequence number when writing started, sequence number when writing
+# finished, timestamp, data length
+_SLOT_HEADER = struct.Struct("<QQdQ")
+
+# Blocks created by publishers in this process (or the process it was
+# forked from), which are registered with the resource tracker already
+_PUBLISHED_NAMES = set()
+
+
+class Frame(namedtuple("Frame", ('sequence', 'timestamp', 'data',
+                                 'reader'))):
+    """ A preview frame in shared memory (:py:attr:`sequence`,
+        :py:attr:`timestamp`, :py:attr:`data`)
+
+    :py:attr:`data` is a :py:class:`memoryview` of the shared memory and
+    must be released before the reader is closed.
+    """
+    __slots__ = ()
+
+    @property
+    def valid(self):
+        """ Whether the slot still holds this frame, i.e. whether the data
+            that was read from it is consistent.
+        """
+        return self.reader._slot_sequences(self.sequence) == (
+            self.sequence, self.sequence)
+
+
+def _slot_offset(slots, slot_size, sequence):
+    return (_HEADER.size +
+            ((sequence - 1) % slots) * (_SLOT_HEADER.size + slot_size))
+
+
+class PreviewPublisher(object):
+    """ Captures preview frames and publishes them in shared memory.
+
+    Can also be used as a context manager, which stops publishing and
+    removes the shared memory block upon leaving.
+
+    :param camera:      Camera to capture frames from
+    :type camera:       :py:class:`gphoto2cffi.Camera`
+    :param name:        Name of the shared memory block, a random name is
+                        chosen if it is `None`
+    :param slots:       Number of frames in the ring
+    :param slot_size:   Maximum size of a frame in bytes
+    """
+    def __init__(self, camera, name=None, slots=4, slot_size=2**22):
+        self.camera = camera
+        self.slots = slots
+        self.slot_size = slot_size
+        self._shm = shared_memory.SharedMemory(
+            name=name, create=True,
+            size=_HEADER.size + slots * (_SLOT_HEADER.size + slot_size))
+        _HEADER.pack_into(self._shm.buf, 0, MAGIC, slots, slot_size, 0)
+        _PUBLISHED_NAMES.add(self._shm.name)
+        #: Sequence number of the latest published frame
+        self.sequence = 0
+        #: Error that ended publishing in the background, if any
+        self.error = None
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @property
+    def name(self):
+        """ Name of the shared memory block to pass to
+            :py:class:`PreviewReader`.
+        """
+        return self._shm.name
+
+    def publish_frame(self):
+        """ Capture a single preview frame and publish it.
+
+        :return:    Sequence number of the frame
+        :rtype:     int
+        :raises ValueError: If the frame does not fit into a slot
+        """
+        camera = self.camera
+        with camera._lock.held(PRIORITY_LOW), \
+                camera.native_pool.camera_file() as pooled:
+            lib.gp_camera_capture_preview(camera._cam, pooled.camfile,
+                                          camera._ctx)
+            lib.gp_file_get_data_and_size(pooled.camfile, pooled.data_p,
+                                          pooled.size_p)
+            return self._write(pooled.data_p[0], pooled.size_p[0])
+
+    def start(self, interval=0.0):
+        """ Publish frames continuously in the background.
+
+        :param interval:    Minimum number of seconds between two frames
+        :type interval:     float
+        """
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """ Stop publishing in the background. """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self.camera._lock:
+            lib.gp_camera_exit(self.camera._cam, self.camera._ctx)
+
+    def close(self):
+        """ Stop publishing and remove the shared memory block.
+
+        Readers that are attached keep their mapping until they close it.
+        """
+        self.stop()
+        _PUBLISHED_NAMES.discard(self._shm.name)
+        self._shm.close()
+        self._shm.unlink()
+
+    def _write(self, data_p, size):
+        if size > self.slot_size:
+            raise ValueError("Frame of {0} bytes does not fit into a slot "
+                             "of {1} bytes.".format(size, self.slot_size))
+        sequence = self.sequence + 1
+        buf = self._shm.buf
+        offset = _slot_offset(self.slots, self.slot_size, sequence)
+        data_offset = offset + _SLOT_HEADER.size
+        # Readers detect the torn slot by the mismatching sequence numbers
+        struct.pack_into("<Q", buf, offset, sequence)
+        buf[data_offset:data_offset + size] = ffi.buffer(data_p, size)
+        _SLOT_HEADER.pack_into(buf, offset, sequence, sequence, time.time(),
+                               size)
+        struct.pack_into("<Q", buf, _HEADER.size - 8, sequence)
+        self.sequence = sequence
+        return sequence
+
+    def _run(self, interval):
+        while not self._stopped.is_set():
+            start_time = time.time()
+            try:
+                self.publish_frame()
+            except ValueError as e:
+                self.camera._logger.warning(
+                    "Dropped preview frame: {0}".format(e))
+            except errors.GPhoto2Error as e:
+                self.camera._logger.error(
+                    "Preview publishing stopped: {0}".format(e))
+                self.error = e
+                return
+            remaining = interval - (time.time() - start_time)
+            if remaining > 0:
+                self._stopped.wait(remaining)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class PreviewReader(object):
+    """ Reads preview frames published by a :py:class:`PreviewPublisher`.
+
+    Can also be used as a context manager, which closes the reader upon
+    leaving.
+
+    :param name:            Name of the shared memory block
+    :param poll_interval:   Seconds between two checks for a new frame in
+                            :py:meth:`wait`
+    """
+    def __init__(self, name, poll_interval=0.001):
+        self.poll_interval = poll_interval
+        try:
+            self._shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # Before Python 3.13 attaching registers the block with the
+            # resource tracker, which would remove it when this process
+            # exits
+            from multiprocessing import resource_tracker
+            self._shm = shared_memory.SharedMemory(name=name)
+            if self._shm.name not in _PUBLISHED_NAMES:
+                resource_tracker.unregister(self._shm._name, "shared_memory")
+        magic, self.slots, self.slot_size, _ = _HEADER.unpack_from(
+            self._shm.buf, 0)
+        if magic != MAGIC:
+            self._shm.close()
+            raise ValueError("{0} does not contain preview frames."
+                             .format(name))
+
+    @property
+    def sequence(self):
+        """ Sequence number of the latest frame, `0` if there is none. """
+        return struct.unpack_from("<Q", self._shm.buf, _HEADER.size - 8)[0]
+
+    def latest(self):
+        """ Get the latest frame.
+
+        :return:    The frame, `None` if no frame was published yet
+        :rtype:     :py:class:`Frame`
+        """
+        while True:
+            sequence = self.sequence
+            if not sequence:
+                return None
+            offset = _slot_offset(self.slots, self.slot_size, sequence)
+            begin, end, timestamp, size = _SLOT_HEADER.unpack_from(
+                self._shm.buf, offset)
+            if begin == end == sequence:
+                data_offset = offset + _SLOT_HEADER.size
+                return Frame(sequence, timestamp,
+                             self._shm.buf[data_offset:data_offset + size],
+                             self)
+            if self.sequence == sequence:
+                # Torn without a newer frame, only possible with a single
+                # slot
+                return None
+            # The slot was reused while we were looking, try again
+
+    def wait(self, after=None, timeout=None):
+        """ Wait for a frame that is newer than the given one.
+
+        :param after:   Sequence number of the last frame that was read,
+                        `None` to accept any frame
+        :param timeout: Maximum number of seconds to wait, `None` to wait
+                        forever
+        :return:        The latest frame, `None` if the timeout expired
+        :rtype:         :py:class:`Frame`
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        after = after or 0
+        while self.sequence <= after:
+            if deadline is not None and time.time() >= deadline:
+                return None
+            time.sleep(self.poll_interval)
+        return self.latest()
+
+    def close(self):
+        """ Detach from the shared memory block.
+
+        All :py:attr:`Frame.data` views must have been released.
+        """
+        self._shm.close()
+
+    def _slot_sequences(self, sequence):
+        offset = _slot_offset(self.slots, self.slot_size, sequence)
+        return struct.unpack_from("<QQ", self._shm.buf, offset)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,159 @@
+""" Retrying of library calls that failed with transient errors.
+
+Enable it with :py:meth:`gphoto2cffi.backend.LibraryWrapper.enable_retries`:
+
+.. code:: python
+
+    from gphoto2cffi import backend, retry
+
+    policy = backend.lib.enable_retries(retry.RetryPolicy(
+        max_attempts=8, deadlines={'gp_camera_file_read': 2.0}))
+    ...
+    print(policy.snapshot())
+
+Calls that fail with one of the :py:attr:`RetryPolicy.retriable` error
+codes are repeated after a randomized, exponentially growing delay until
+they succeed, the maximum number of attempts is reached or the deadline for
+the function has passed. All other errors are raised right away.
+"""
+from __future__ import division
+
+import random
+import threading
+import time
+
+from ._backend import lib as _lib
+
+#: Error codes that usually go away when the call is repeated
+RETRIABLE_ERRORS = frozenset((
+    _lib.GP_ERROR_CAMERA_BUSY,
+    _lib.GP_ERROR_TIMEOUT,
+    _lib.GP_ERROR_IO,
+    _lib.GP_ERROR_IO_READ,
+    _lib.GP_ERROR_IO_WRITE,
+    _lib.GP_ERROR_IO_USB_CLEAR_HALT,
+    _lib.GP_ERROR_CORRUPTED_DATA))
+
+#: Functions that are never repeated since a failed attempt may have had
+#: side effects that make a repetition unsafe, e.g. a shutter that already
+#: fired or a file that was already deleted. Downloads with
+#: `gp_camera_file_get` are resumed with partial reads by
+#: :py:meth:`gphoto2cffi.File.save` instead.
+NOT_RETRIED = frozenset((
+    "gp_camera_capture",
+    "gp_camera_file_delete",
+    "gp_camera_file_get",
+    "gp_camera_folder_delete_all",
+    "gp_camera_folder_make_dir",
+    "gp_camera_folder_put_file",
+    "gp_camera_folder_remove_dir",
+    "gp_camera_trigger_capture"))
+
+
+class RetryPolicy(object):
+    """ Configuration and counters for retrying failed library calls.
+
+    :param max_attempts:    Maximum number of attempts per call
+    :param base_delay:      Upper bound of the delay before the first retry
+                            in seconds, doubled for every further retry
+    :param max_delay:       Upper bound for the delay between two attempts
+    :param deadline:        Seconds after the first attempt after which a
+                            call is no longer retried, `None` for no limit
+    :param deadlines:       Per-function deadlines, overriding `deadline`
+    :type deadlines:        dict
+    :param retriable:       Error codes that are retried
+    """
+    def __init__(self, max_attempts=5, base_delay=0.05, max_delay=2.0,
+                 deadline=None, deadlines=None, retriable=RETRIABLE_ERRORS):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.deadlines = dict(deadlines or {})
+        self.retriable = frozenset(retriable)
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def is_retriable(self, errcode):
+        """ Whether a call that failed with the error code may be repeated.
+
+        :param errcode: libgphoto2 error code
+        :rtype:         bool
+        """
+        return errcode in self.retriable
+
+    def delay(self, attempt):
+        """ Get the randomized delay before the given retry.
+
+        :param attempt: Number of the failed attempt, starting at 1
+        :return:        Delay in seconds
+        :rtype:         float
+        """
+        return random.uniform(0, min(self.max_delay,
+                                     self.base_delay * 2 ** (attempt - 1)))
+
+    def wrap(self, name, func):
+        """ Wrap a function so that calls failing with a retriable error are
+            repeated.
+
+        :param name:    Name of the C function
+        :param func:    Function to wrap
+        :return:        Wrapped function
+        """
+        if name in NOT_RETRIED:
+            return func
+        deadline = self.deadlines.get(name, self.deadline)
+
+        def retried(*args):
+            start = time.time() if deadline is not None else None
+            rval = func(*args)
+            if not (isinstance(rval, int) and rval < 0):
+                return rval
+            attempt = 1
+            while self.is_retriable(rval) and attempt < self.max_attempts:
+                delay = self.delay(attempt)
+                if (deadline is not None and
+                        time.time() - start + delay > deadline):
+                    break
+                time.sleep(delay)
+                self.record(name, 'retries')
+                attempt += 1
+                rval = func(*args)
+                if not (isinstance(rval, int) and rval < 0):
+                    self.record(name, 'recovered')
+                    return rval
+            if self.is_retriable(rval):
+                self.record(name, 'failures')
+            return rval
+        return retried
+
+    def record(self, name, counter):
+        """ Increment a counter.
+
+        :param name:    Name of the C function
+        :param counter: One of `retries`, `recovered`, `failures` or
+                        `resumed`
+        """
+        with self._lock:
+            stats = self._stats.setdefault(
+                name, {'retries': 0, 'recovered': 0, 'failures': 0,
+                       'resumed': 0})
+            stats[counter] += 1
+
+    def reset(self):
+        """ Discard all counters. """
+        with self._lock:
+            self._stats.clear()
+
+    def snapshot(self):
+        """ Get the counters.
+
+        :return:    Mapping from function names to dictionaries with the
+                    number of `retries`, of calls that succeeded after a
+                    retry (`recovered`), of calls that gave up on a
+                    retriable error (`failures`) and of downloads that were
+                    `resumed` after an error
+        :rtype:     dict
+        """
+        with self._lock:
+            return {name: dict(stats) for name, stats in self._stats.items()}
@@ -0,0 +1,900 @@
+""" Simulated libgphoto2 backend.
+
+Implements the subset of the libgphoto2 API that is used by
+:py:mod:`gphoto2cffi.gphoto2` in pure Python, so that the bindings can be
+exercised and benchmarked without a physical camera. Per-call latencies and
+the transfer bandwidth are configurable to approximate real devices.
+
+.. code:: python
+
+    from gphoto2cffi import simulator
+    import gphoto2cffi as gp
+
+    sim = simulator.SimulatedLibrary(
+        cameras=[simulator.SimulatedCamera(num_files=500)],
+        latency=0.001, bandwidth=20*1024**2)
+    with simulator.installed(sim):
+        cam = gp.Camera()
+        files = list(cam.list_all_files())
+"""
+from __future__ import division
+
+import contextlib
+import copy
+import itertools
+import os
+import time
+from collections import OrderedDict, deque
+
+from . import backend
+from ._backend import ffi, lib as _lib
+
+
+class SimulatedFile(object):
+    """ A file in the simulated camera's storage.
+
+    :param data:        Content of the file
+    :type data:         bytes
+    :param mimetype:    MIME type of the file
+    :param dimensions:  Width and height of the image
+    :param mtime:       Modification time as a UNIX timestamp
+    """
+    def __init__(self, data, mimetype="image/jpeg", dimensions=(6000, 4000),
+                 mtime=None):
+        self.data = data
+        self.mimetype = mimetype
+        self.dimensions = dimensions
+        self.mtime = int(time.time() if mtime is None else mtime)
+
+    def get(self, ftype):
+        if ftype == _lib.GP_FILE_TYPE_PREVIEW:
+            return self.data[:min(len(self.data), 160*120)]
+        elif ftype == _lib.GP_FILE_TYPE_EXIF:
+            return self.data[:min(len(self.data), 2**16)]
+        return self.data
+
+
+class SimulatedWidget(object):
+    """ A node in the simulated configuration tree.
+
+    :param wtype:       libgphoto2 widget type constant
+    :param name:        Short name
+    :param label:       Human-readable label
+    :param value:       Current value
+    :param choices:     Valid choices for radio and menu widgets
+    :param range:       `(min, max, step)` for range widgets
+    :param readonly:    Whether the value can be written to
+    :param children:    Child widgets for windows and sections
+    """
+    def __init__(self, wtype, name, label=None, value=None, choices=(),
+                 range=None, readonly=False, children=()):
+        self.type = wtype
+        self.name = name
+        self.label = label or name
+        self.info = ""
+        self.value = value
+        self.choices = list(choices)
+        self.range = range
+        self.readonly = readonly
+        self.changed = False
+        self.parent = None
+        self.children = []
+        for child in children:
+            self.append(child)
+
+    def append(self, child):
+        child.parent = self
+        self.children.append(child)
+
+    @property
+    def root(self):
+        widget = self
+        while widget.parent is not None:
+            widget = widget.parent
+        return widget
+
+    def walk(self):
+        yield self
+        for child in self.children:
+            for widget in child.walk():
+                yield widget
+
+
+def _section(name, *children):
+    return SimulatedWidget(_lib.GP_WIDGET_SECTION, name, children=children)
+
+
+def _radio(name, value, choices, readonly=False):
+    return SimulatedWidget(_lib.GP_WIDGET_RADIO, name, value=value,
+                           choices=choices, readonly=readonly)
+
+
+def _text(name, value, readonly=True):
+    return SimulatedWidget(_lib.GP_WIDGET_TEXT, name, value=value,
+                           readonly=readonly)
+
+
+def default_config():
+    """ Build a configuration tree that resembles the one of a typical PTP
+        camera.
+
+    :rtype: :py:class:`SimulatedWidget`
+    """
+    shutterspeeds = ["1/{0}".format(x)
+                     for x in (4000, 2000, 1000, 500, 250, 125, 60, 30, 15)]
+    evs = ["{0:g}".format(x / 3) for x in range(-9, 10)]
+    return SimulatedWidget(_lib.GP_WIDGET_WINDOW, "main", children=[
+        _section(
+            "actions",
+            SimulatedWidget(_lib.GP_WIDGET_TOGGLE, "movie", value=0),
+            SimulatedWidget(_lib.GP_WIDGET_TOGGLE, "autofocusdrive",
+                            value=0)),
+        _section(
+            "settings",
+            _radio("capturetarget", "Internal RAM",
+                   ["Internal RAM", "Memory card"]),
+            _text("artist", "", readonly=False),
+            SimulatedWidget(_lib.GP_WIDGET_DATE, "datetime",
+                            value=int(time.time()))),
+        _section(
+            "status",
+            _text("serialnumber", "0123456789"),
+            _text("manufacturer", "Simulated"),
+            _text("batterylevel", "100%"),
+            _text("availableshots", "999"),
+            _text("lensname", "Simulated 24-70mm"),
+            _text("d001", "0x0")),
+        _section(
+            "imgsettings",
+            _radio("iso", "100", ["Auto", "100", "200", "400", "800",
+                                  "1600", "3200", "6400"]),
+            _radio("whitebalance", "Auto", ["Auto", "Daylight", "Shadow",
+                                            "Cloudy", "Tungsten"])),
+        _section(
+            "capturesettings",
+            _radio("shutterspeed", "1/125", shutterspeeds),
+            _radio("aperture", "8", ["2.8", "4", "5.6", "8", "11", "16"]),
+            _radio("exposurecompensation", "0", evs),
+            _radio("imagequality", "JPEG Fine",
+                   ["JPEG Normal", "JPEG Fine", "NEF (Raw)"]),
+            SimulatedWidget(_lib.GP_WIDGET_RANGE, "flashcompensation",
+                            value=0.0, range=(-3.0, 3.0, 1.0))),
+        _section("other", *[_text("{0:04x}".format(0xd100 + idx), "0")
+                            for idx in range(40)])])
+
+
+class SimulatedCamera(object):
+    """ State of a simulated device.
+
+    :param model:       Model name reported by the driver
+    :param usb_address: `(bus, device)` the camera is attached to
+    :param num_files:   Number of files to populate the memory card with
+    :param file_size:   Size of each of these files in bytes
+    :param files_per_folder: Number of files per DCIM folder
+    :param preview_size: Size of the live view frames in bytes
+    :param config:      Configuration tree, defaults to
+                        :py:func:`default_config`
+    """
+    STORAGE = "/store_00010001"
+
+    def __init__(self, model="Simulated Camera", usb_address=(1, 1),
+                 num_files=100, file_size=2**20, files_per_folder=1000,
+                 preview_size=2**16, config=None):
+        self.model = model
+        self.usb_address = usb_address
+        self.config = config if config is not None else default_config()
+        self.folders = OrderedDict([
+            ("/", OrderedDict()), (self.STORAGE, OrderedDict()),
+            (self.STORAGE + "/DCIM", OrderedDict())])
+        self.ram_folder = "/"
+        self._counter = itertools.count(1)
+        payload = ((b"\xff\xd8\xff\xe0" + os.urandom(252)) *
+                   (file_size // 256 + 1))
+        for idx in range(num_files):
+            folder = "{0}/DCIM/{1}SIMUL".format(
+                self.STORAGE, 100 + idx // files_per_folder)
+            self.add_file(folder, self.next_filename(), payload[:file_size])
+        self.preview = (b"\xff\xd8\xff\xe0" +
+                        os.urandom(max(preview_size - 4, 0)))
+        self.events = deque()
+
+    def next_filename(self):
+        return "IMG_{0:04}.JPG".format(next(self._counter))
+
+    def add_file(self, folder, name, data, **kwargs):
+        """ Put a file into the simulated storage, creating its folder if
+            necessary.
+        """
+        parts = folder.strip("/").split("/")
+        for idx in range(1, len(parts) + 1):
+            self.folders.setdefault("/" + "/".join(parts[:idx]),
+                                    OrderedDict())
+        self.folders[folder][name] = SimulatedFile(data, **kwargs)
+
+    def subfolders(self, folder):
+        prefix = folder.rstrip("/") + "/"
+        return [path[len(prefix):] for path in self.folders
+                if path.startswith(prefix) and path != prefix and
+                "/" not in path[len(prefix):]]
+
+    def shoot(self):
+        """ Take a picture as if the shutter button was pressed, storing it
+            according to the capture target and queueing its events.
+
+        :return:    Folder and name of the new file
+        """
+        if self.setting("capturetarget").value == "Memory card":
+            folder = next(reversed([f for f in self.folders
+                                    if f.startswith(self.STORAGE + "/DCIM/")]),
+                          self.STORAGE + "/DCIM/100SIMUL")
+        else:
+            folder = self.ram_folder
+        name = self.next_filename()
+        self.add_file(folder, name, self.preview * 64)
+        self.events.append((_lib.GP_EVENT_FILE_ADDED, (folder, name)))
+        self.events.append((_lib.GP_EVENT_CAPTURE_COMPLETE, None))
+        return folder, name
+
+    def setting(self, name):
+        return next(w for w in self.config.walk() if w.name == name)
+
+
+class _Context(object):
+    def __init__(self):
+        self.progress = None
+        self.cancel = None
+
+
+class _Session(object):
+    def __init__(self):
+        self.port = None
+        self.camera = None
+        self.open = False
+
+
+class _CameraFile(object):
+    def __init__(self, fd=None):
+        self.fd = fd
+        self.data = b""
+        self.buffer = None
+
+
+def _str(value):
+    """ Decode a string argument, which is either passed as a Python
+        bytestring or as a `char*`.
+    """
+    if isinstance(value, ffi.CData):
+        value = ffi.string(value)
+    return value.decode()
+
+
+def _normpath(folder):
+    return "/" + _str(folder).strip("/")
+
+
+class SimulatedLibrary(object):
+    """ Pure-Python stand-in for the libgphoto2 library object.
+
+    Install it with :py:func:`installed`. Constants are taken from the real
+    library, so it is binary-compatible with all cffi types used by the
+    bindings.
+
+    :param cameras:     Simulated devices that are attached
+    :type cameras:      list of :py:class:`SimulatedCamera`
+    :param latency:     Latency of each camera operation in seconds, either
+                        as a number or as a mapping from function names to
+                        latencies (`None` is used as the default key)
+    :param bandwidth:   Transfer speed in bytes/s, `None` for unlimited
+    :param session_latency: Extra latency for the first operation after a
+                        session was closed with `gp_camera_exit`
+    :param chunk_size:  Granularity of progress and cancellation checks
+                        during transfers in bytes
+    """
+    def __init__(self, cameras=None, latency=0.0, bandwidth=None,
+                 session_latency=0.0, chunk_size=2**16):
+        self.cameras = cameras if cameras is not None else [SimulatedCamera()]
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.session_latency = session_latency
+        self.chunk_size = chunk_size
+        #: Number of calls per function
+        self.calls = {}
+        self._objects = {}
+        self._ids = itertools.count(0x10000, 0x10)
+        self._cstrings = {}
+        # Buffers handed over to the caller, until they are freed
+        self._buffers = {}
+        self._version = ffi.new("const char*[]",
+                                [self._cstr("2.5.99"), ffi.NULL])
+
+    def __getattr__(self, name):
+        if name.startswith("GP_"):
+            return getattr(_lib, name)
+        raise AttributeError(name)
+
+    # ====== Helpers ====== #
+    def _cstr(self, value):
+        if not isinstance(value, bytes):
+            value = value.encode()
+        cstr = self._cstrings.get(value)
+        if cstr is None:
+            cstr = self._cstrings[value] = ffi.new("char[]", value)
+        return cstr
+
+    def _new(self, ctype, obj):
+        handle = next(self._ids)
+        self._objects[handle] = obj
+        return ffi.cast(ctype, handle)
+
+    def _get(self, ptr):
+        return self._objects[int(ffi.cast("uintptr_t", ptr))]
+
+    def _free(self, ptr):
+        self._objects.pop(int(ffi.cast("uintptr_t", ptr)), None)
+        return _lib.GP_OK
+
+    def _hand_over(self, buf):
+        self._buffers[int(ffi.cast("uintptr_t", buf))] = buf
+        return buf
+
+    def free(self, ptr):
+        """ Release a buffer that was handed over to the caller. """
+        self._buffers.pop(int(ffi.cast("uintptr_t", ptr)), None)
+
+    def _delay(self, name, nbytes=0):
+        self.calls[name] = self.calls.get(name, 0) + 1
+        if isinstance(self.latency, dict):
+            delay = self.latency.get(name, self.latency.get(None, 0.0))
+        else:
+            delay = self.latency
+        if nbytes and self.bandwidth:
+            delay += nbytes / self.bandwidth
+        if delay:
+            time.sleep(delay)
+
+    def _session(self, cam_p, name):
+        session = self._get(cam_p)
+        if session.camera is None:
+            return None
+        if not session.open:
+            session.open = True
+            if self.session_latency:
+                time.sleep(self.session_latency)
+        self._delay(name)
+        return session.camera
+
+    def _transfer(self, ctx_p, data, fd=None):
+        """ Simulate a transfer of `data`, reporting progress and honoring
+            cancellation requests of the context.
+        """
+        ctx = self._get(ctx_p)
+        progress_id = None
+        if ctx.progress is not None:
+            start, _, _, cb_data = ctx.progress
+            progress_id = start(ctx_p, float(len(data)), ffi.NULL, cb_data)
+        for offset in range(0, len(data), self.chunk_size):
+            chunk = data[offset:offset+self.chunk_size]
+            self._delay("transfer", len(chunk))
+            if fd is not None:
+                os.write(fd, chunk)
+            if ctx.progress is not None:
+                _, update, _, cb_data = ctx.progress
+                update(ctx_p, progress_id, float(offset + len(chunk)),
+                       cb_data)
+            if ctx.cancel is not None:
+                cancel, cb_data = ctx.cancel
+                if cancel(ctx_p, cb_data) == _lib.GP_CONTEXT_FEEDBACK_CANCEL:
+                    return _lib.GP_ERROR_CANCEL
+        if ctx.progress is not None:
+            _, _, stop, cb_data = ctx.progress
+            stop(ctx_p, progress_id, cb_data)
+        return _lib.GP_OK
+
+    # ====== Context, logging and other ====== #
+    def gp_context_new(self):
+        return self._new("GPContext*", _Context())
+
+    def gp_context_unref(self, ctx_p):
+        self._free(ctx_p)
+
+    def gp_context_set_progress_funcs(self, ctx_p, start, update, stop,
+                                      data):
+        self._get(ctx_p).progress = (start, update, stop, data)
+
+    def gp_context_set_cancel_func(self, ctx_p, func, data):
+        self._get(ctx_p).cancel = (func, data)
+
+    def gp_result_as_string(self, result):
+        return self._cstr("Simulated error {0}".format(result))
+
+    def gp_library_version(self, verbose):
+        return self._version
+
+    def gp_log_add_func(self, level, func, data):
+        return next(self._ids)
+
+    def gp_log_remove_func(self, func_id):
+        return _lib.GP_OK
+
+    # ====== Lists ====== #
+    def gp_list_new(self, list_pp):
+        list_pp[0] = self._new("CameraList*", [])
+        return _lib.GP_OK
+
+    def gp_list_free(self, list_p):
+        return self._free(list_p)
+
+    def gp_list_count(self, list_p):
+        return len(self._get(list_p))
+
+    def gp_list_append(self, list_p, name, value):
+        self._get(list_p).append((
+            _str(name), _str(value) if value != ffi.NULL else None))
+        return _lib.GP_OK
+
+    def gp_list_get_name(self, list_p, idx, name_p):
+        name_p[0] = self._cstr(self._get(list_p)[idx][0])
+        return _lib.GP_OK
+
+    def gp_list_get_value(self, list_p, idx, value_p):
+        value_p[0] = self._cstr(self._get(list_p)[idx][1] or "")
+        return _lib.GP_OK
+
+    # ====== Ports ====== #
+    def gp_port_info_new(self, info_p):
+        info_p[0] = self._new("GPPortInfo", None)
+        return _lib.GP_OK
+
+    def gp_port_info_list_new(self, list_pp):
+        list_pp[0] = self._new("GPPortInfoList*", [])
+        return _lib.GP_OK
+
+    def gp_port_info_list_free(self, list_p):
+        return self._free(list_p)
+
+    def gp_port_info_list_load(self, list_p):
+        ports = self._get(list_p)
+        del ports[:]
+        ports.extend("usb:{0:03},{1:03}".format(*cam.usb_address)
+                     for cam in self.cameras)
+        return _lib.GP_OK
+
+    def gp_port_info_list_lookup_path(self, list_p, path):
+        try:
+            return self._get(list_p).index(_str(path))
+        except ValueError:
+            return _lib.GP_ERROR_UNKNOWN_PORT
+
+    def gp_port_info_list_get_info(self, list_p, idx, info_p):
+        info_p[0] = self._new("GPPortInfo", self._get(list_p)[idx])
+        return _lib.GP_OK
+
+    # ====== Abilities ====== #
+    def gp_abilities_list_new(self, list_pp):
+        list_pp[0] = self._new("CameraAbilitiesList*", [])
+        return _lib.GP_OK
+
+    def gp_abilities_list_free(self, list_p):
+        return self._free(list_p)
+
+    def gp_abilities_list_load(self, list_p, ctx_p):
+        self._delay("gp_abilities_list_load")
+        models = self._get(list_p)
+        del models[:]
+        models.extend(cam for cam in self.cameras)
+        return _lib.GP_OK
+
+    def gp_abilities_list_count(self, list_p):
+        return len(self._get(list_p))
+
+    def gp_abilities_list_detect(self, list_p, port_list_p, camlist_p,
+                                 ctx_p):
+        out = self._get(camlist_p)
+        for cam in self.cameras:
+            out.append((cam.model,
+                        "usb:{0:03},{1:03}".format(*cam.usb_address)))
+        return _lib.GP_OK
+
+    def gp_abilities_list_lookup_model(self, list_p, model):
+        model = _str(model)
+        for idx, cam in enumerate(self._get(list_p)):
+            if cam.model == model:
+                return idx
+        return _lib.GP_ERROR_MODEL_NOT_FOUND
+
+    def gp_abilities_list_get_abilities(self, list_p, idx, abilities):
+        self._fill_abilities(self._get(list_p)[idx], abilities)
+        return _lib.GP_OK
+
+    def _fill_abilities(self, cam, abilities):
+        abilities.model = cam.model.encode()
+        abilities.library = b"/usr/lib/libgphoto2/simulated/ptp2.so"
+        abilities.device_type = _lib.GP_DEVICE_STILL_CAMERA
+        abilities.operations = (
+            _lib.GP_OPERATION_CAPTURE_IMAGE |
+            _lib.GP_OPERATION_CAPTURE_PREVIEW | _lib.GP_OPERATION_CONFIG |
+            _lib.GP_OPERATION_TRIGGER_CAPTURE)
+        abilities.file_operations = (
+            _lib.GP_FILE_OPERATION_DELETE | _lib.GP_FILE_OPERATION_PREVIEW |
+            _lib.GP_FILE_OPERATION_EXIF)
+        abilities.folder_operations = (
+            _lib.GP_FOLDER_OPERATION_DELETE_ALL |
+            _lib.GP_FOLDER_OPERATION_PUT_FILE |
+            _lib.GP_FOLDER_OPERATION_MAKE_DIR |
+            _lib.GP_FOLDER_OPERATION_REMOVE_DIR)
+        abilities.usb_vendor = 0x04b0
+        abilities.usb_product = 0x0400 + cam.usb_address[1]
+
+    # ====== Camera ====== #
+    def gp_camera_new(self, cam_pp):
+        cam_pp[0] = self._new("Camera*", _Session())
+        return _lib.GP_OK
+
+    def gp_camera_set_port_info(self, cam_p, info):
+        self._get(cam_p).port = self._get(info)
+        return _lib.GP_OK
+
+    def gp_camera_init(self, cam_p, ctx_p):
+        session = self._get(cam_p)
+        self._delay("gp_camera_init")
+        for cam in self.cameras:
+            port = "usb:{0:03},{1:03}".format(*cam.usb_address)
+            if session.port in (None, port):
+                session.camera = cam
+                session.open = True
+                return _lib.GP_OK
+        return _lib.GP_ERROR_MODEL_NOT_FOUND
+
+    def gp_camera_exit(self, cam_p, ctx_p):
+        self._get(cam_p).open = False
+        return _lib.GP_OK
+
+    def gp_camera_unref(self, cam_p):
+        return self._free(cam_p)
+
+    def gp_camera_get_abilities(self, cam_p, abilities):
+        self._fill_abilities(self._get(cam_p).camera, abilities)
+        return _lib.GP_OK
+
+    def gp_camera_get_storageinfo(self, cam_p, info_pp, num_p, ctx_p):
+        cam = self._session(cam_p, "gp_camera_get_storageinfo")
+        infos = self._hand_over(ffi.new("CameraStorageInformation[1]"))
+        info = infos[0]
+        info.fields = (_lib.GP_STORAGEINFO_BASE | _lib.GP_STORAGEINFO_LABEL |
+                       _lib.GP_STORAGEINFO_STORAGETYPE |
+                       _lib.GP_STORAGEINFO_ACCESS |
+                       _lib.GP_STORAGEINFO_MAXCAPACITY |
+                       _lib.GP_STORAGEINFO_FREESPACEKBYTES |
+                       _lib.GP_STORAGEINFO_FREESPACEIMAGES)
+        info.basedir = cam.STORAGE.encode()
+        info.label = b"SIMULATED"
+        info.type = _lib.GP_STORAGEINFO_ST_REMOVABLE_RAM
+        info.access = _lib.GP_STORAGEINFO_AC_READWRITE
+        used = sum(len(f.data) for folder in cam.folders.values()
+                   for f in folder.values()) // 1024
+        info.capacitykbytes = 64 * 1024**2
+        info.freekbytes = info.capacitykbytes - used
+        info.freeimages = info.freekbytes // 8192
+        info_pp[0] = infos
+        num_p[0] = 1
+        return _lib.GP_OK
+
+    # ====== Filesystem ====== #
+    def _folder(self, cam, folder):
+        return cam.folders.get(_normpath(folder))
+
+    def gp_camera_folder_list_files(self, cam_p, folder, list_p, ctx_p):
+        cam = self._session(cam_p, "gp_camera_folder_list_files")
+        files = self._folder(cam, folder)
+        if files is None:
+            return _lib.GP_ERROR_DIRECTORY_NOT_FOUND
+        self._get(list_p).extend((name, None) for name in files)
+        return _lib.GP_OK
+
+    def gp_camera_folder_list_folders(self, cam_p, folder, list_p, ctx_p):
+        cam = self._session(cam_p, "gp_camera_folder_list_folders")
+        if self._folder(cam, folder) is None:
+            return _lib.GP_ERROR_DIRECTORY_NOT_FOUND
+        self._get(list_p).extend(
+            (name, None) for name in cam.subfolders(_normpath(folder)))
+        return _lib.GP_OK
+
+    def gp_camera_folder_delete_all(self, cam_p, folder, ctx_p):
+        cam = self._session(cam_p, "gp_camera_folder_delete_all")
+        files = self._folder(cam, folder)
+        if files is None:
+            return _lib.GP_ERROR_DIRECTORY_NOT_FOUND
+        files.clear()
+        return _lib.GP_OK
+
+    def gp_camera_folder_make_dir(self, cam_p, folder, name, ctx_p):
+        cam = self._session(cam_p, "gp_camera_folder_make_dir")
+        path = os.path.join(_normpath(folder), _str(name))
+        if path in cam.folders:
+            return _lib.GP_ERROR_DIRECTORY_EXISTS
+        cam.folders[path] = OrderedDict()
+        return _lib.GP_OK
+
+    def gp_camera_folder_remove_dir(self, cam_p, folder, name, ctx_p):
+        cam = self._session(cam_p, "gp_camera_folder_remove_dir")
+        path = os.path.join(_normpath(folder), _str(name))
+        if path not in cam.folders:
+            return _lib.GP_ERROR_DIRECTORY_NOT_FOUND
+        del cam.folders[path]
+        return _lib.GP_OK
+
+    def gp_camera_folder_put_file(self, cam_p, folder, name, ftype, file_p,
+                                  ctx_p):
+        cam = self._session(cam_p, "gp_camera_folder_put_file")
+        files = self._folder(cam, folder)
+        if files is None:
+            return _lib.GP_ERROR_DIRECTORY_NOT_FOUND
+        camfile = self._get(file_p)
+        data = camfile.data
+        if camfile.fd is not None:
+            data = b"".join(iter(lambda: os.read(camfile.fd, 2**20), b""))
+        rval = self._transfer(ctx_p, data)
+        if rval == _lib.GP_OK:
+            files[_str(name)] = SimulatedFile(data)
+        return rval
+
+    def _file(self, cam, folder, name):
+        files = self._folder(cam, folder)
+        if files is None:
+            return None
+        return files.get(_str(name))
+
+    def gp_camera_file_get_info(self, cam_p, folder, name, info, ctx_p):
+        cam = self._session(cam_p, "gp_camera_file_get_info")
+        simfile = self._file(cam, folder, name)
+        if simfile is None:
+            return _lib.GP_ERROR_FILE_NOT_FOUND
+        info.file.fields = _lib.GP_FILE_INFO_ALL
+        info.file.size = len(simfile.data)
+        info.file.type = simfile.mimetype.encode()
+        info.file.width, info.file.height = simfile.dimensions
+        info.file.permissions = _lib.GP_FILE_PERM_ALL
+        info.file.mtime = simfile.mtime
+        return _lib.GP_OK
+
+    def gp_camera_file_get(self, cam_p, folder, name, ftype, file_p, ctx_p):
+        cam = self._session(cam_p, "gp_camera_file_get")
+        simfile = self._file(cam, folder, name)
+        if simfile is None:
+            return _lib.GP_ERROR_FILE_NOT_FOUND
+        camfile = self._get(file_p)
+        data = simfile.get(ftype)
+        rval = self._transfer(ctx_p, data, camfile.fd)
+        if rval == _lib.GP_OK and camfile.fd is None:
+            camfile.data = data
+        return rval
+
+    def gp_camera_file_read(self, cam_p, folder, name, ftype, offset, buf,
+                            size_p, ctx_p):
+        cam = self._session(cam_p, "gp_camera_file_read")
+        simfile = self._file(cam, folder, name)
+        if simfile is None:
+            return _lib.GP_ERROR_FILE_NOT_FOUND
+        chunk = simfile.get(ftype)[offset:offset+size_p[0]]
+        self._delay("transfer", len(chunk))
+        ffi.memmove(buf, chunk, len(chunk))
+        size_p[0] = len(chunk)
+        return _lib.GP_OK
+
+    def gp_camera_file_delete(self, cam_p, folder, name, ctx_p):
+        cam = self._session(cam_p, "gp_camera_file_delete")
+        files = self._folder(cam, folder)
+        name = _str(name)
+        if files is None or name not in files:
+            return _lib.GP_ERROR_FILE_NOT_FOUND
+        del files[name]
+        return _lib.GP_OK
+
+    # ====== Files ====== #
+    def gp_file_new(self, file_pp):
+        file_pp[0] = self._new("CameraFile*", _CameraFile())
+        return _lib.GP_OK
+
+    def gp_file_new_from_fd(self, file_pp, fd):
+        file_pp[0] = self._new("CameraFile*", _CameraFile(fd))
+        return _lib.GP_OK
+
+    def gp_file_free(self, file_p):
+        # Like libgphoto2, close the descriptor of files created from one
+        fd = self._get(file_p).fd
+        if fd is not None:
+            os.close(fd)
+        return self._free(file_p)
+
+    def gp_file_clean(self, file_p):
+        self._get(file_p).data = b""
+        return _lib.GP_OK
+
+    def gp_file_append(self, file_p, data, size):
+        camfile = self._get(file_p)
+        if isinstance(data, ffi.CData):
+            data = ffi.buffer(data, size)
+        camfile.data += bytes(data[:size])
+        return _lib.GP_OK
+
+    def gp_file_get_data_and_size(self, file_p, data_p, size_p):
+        camfile = self._get(file_p)
+        camfile.buffer = ffi.from_buffer(camfile.data)
+        data_p[0] = ffi.cast("char*", camfile.buffer)
+        size_p[0] = len(camfile.data)
+        return _lib.GP_OK
+
+    # ====== Capture and events ====== #
+    def gp_camera_trigger_capture(self, cam_p, ctx_p):
+        cam = self._session(cam_p, "gp_camera_trigger_capture")
+        cam.shoot()
+        return _lib.GP_OK
+
+    def gp_camera_wait_for_event(self, cam_p, timeout, type_p, data_p,
+                                 ctx_p):
+        cam = self._session(cam_p, "gp_camera_wait_for_event")
+        if not cam.events:
+            time.sleep(min(timeout / 1000, 0.01))
+            type_p[0] = _lib.GP_EVENT_TIMEOUT
+            return _lib.GP_OK
+        event_type, payload = cam.events.popleft()
+        type_p[0] = event_type
+        if event_type == _lib.GP_EVENT_FILE_ADDED:
+            path_p = self._hand_over(ffi.new("CameraFilePath*"))
+            path_p.folder = payload[0].encode()
+            path_p.name = payload[1].encode()
+            data_p[0] = path_p
+        else:
+            data_p[0] = ffi.NULL
+        return _lib.GP_OK
+
+    def gp_camera_capture_preview(self, cam_p, file_p, ctx_p):
+        cam = self._session(cam_p, "gp_camera_capture_preview")
+        self._delay("transfer", len(cam.preview))
+        self._get(file_p).data = cam.preview
+        return _lib.GP_OK
+
+    # ====== Configuration ====== #
+    def gp_camera_get_config(self, cam_p, window_pp, ctx_p):
+        cam = self._session(cam_p, "gp_camera_get_config")
+        window_pp[0] = self._new_widget(copy.deepcopy(cam.config))
+        return _lib.GP_OK
+
+    def gp_camera_get_single_config(self, cam_p, name, widget_pp, ctx_p):
+        cam = self._session(cam_p, "gp_camera_get_single_config")
+        name = _str(name)
+        widget = next((w for w in cam.config.walk() if w.name == name), None)
+        if widget is None:
+            return _lib.GP_ERROR_BAD_PARAMETERS
+        # Detach the copy from the rest of the tree
+        parent, widget.parent = widget.parent, None
+        try:
+            widget_pp[0] = self._new_widget(copy.deepcopy(widget))
+        finally:
+            widget.parent = parent
+        return _lib.GP_OK
+
+    def gp_camera_set_config(self, cam_p, window_p, ctx_p):
+        cam = self._session(cam_p, "gp_camera_set_config")
+        current = dict((w.name, w) for w in cam.config.walk())
+        for widget in self._get(window_p).walk():
+            if widget.changed and not widget.readonly:
+                current[widget.name].value = widget.value
+                widget.changed = False
+        return _lib.GP_OK
+
+    def _new_widget(self, widget):
+        ptr = getattr(widget, "handle", None)
+        if ptr is None:
+            ptr = widget.handle = self._new("CameraWidget*", widget)
+        return ptr
+
+    def gp_widget_free(self, widget_p):
+        for widget in self._get(widget_p).walk():
+            handle = getattr(widget, "handle", None)
+            if handle is not None:
+                self._free(handle)
+        return _lib.GP_OK
+
+    def gp_widget_count_children(self, widget_p):
+        return len(self._get(widget_p).children)
+
+    def gp_widget_get_child(self, widget_p, idx, child_pp):
+        child_pp[0] = self._new_widget(self._get(widget_p).children[idx])
+        return _lib.GP_OK
+
+    def gp_widget_get_child_by_name(self, widget_p, name, child_pp):
+        name = _str(name)
+        for widget in self._get(widget_p).walk():
+            if widget.name == name:
+                child_pp[0] = self._new_widget(widget)
+                return _lib.GP_OK
+        return _lib.GP_ERROR_BAD_PARAMETERS
+
+    def gp_widget_get_root(self, widget_p, root_pp):
+        root_pp[0] = self._new_widget(self._get(widget_p).root)
+        return _lib.GP_OK
+
+    def gp_widget_get_name(self, widget_p, name_p):
+        name_p[0] = self._cstr(self._get(widget_p).name)
+        return _lib.GP_OK
+
+    def gp_widget_get_label(self, widget_p, label_p):
+        label_p[0] = self._cstr(self._get(widget_p).label)
+        return _lib.GP_OK
+
+    def gp_widget_get_info(self, widget_p, info_p):
+        info_p[0] = self._cstr(self._get(widget_p).info)
+        return _lib.GP_OK
+
+    def gp_widget_get_type(self, widget_p, type_p):
+        type_p[0] = self._get(widget_p).type
+        return _lib.GP_OK
+
+    def gp_widget_get_readonly(self, widget_p, readonly_p):
+        readonly_p[0] = int(self._get(widget_p).readonly)
+        return _lib.GP_OK
+
+    def gp_widget_get_value(self, widget_p, value_p):
+        widget = self._get(widget_p)
+        if widget.type in (_lib.GP_WIDGET_TEXT, _lib.GP_WIDGET_RADIO,
+                           _lib.GP_WIDGET_MENU):
+            ffi.cast("const char**", value_p)[0] = self._cstr(widget.value)
+        elif widget.type == _lib.GP_WIDGET_RANGE:
+            ffi.cast("float*", value_p)[0] = widget.value
+        elif widget.type in (_lib.GP_WIDGET_TOGGLE, _lib.GP_WIDGET_DATE):
+            ffi.cast("int*", value_p)[0] = widget.value
+        else:
+            return _lib.GP_ERROR_BAD_PARAMETERS
+        return _lib.GP_OK
+
+    def gp_widget_set_value(self, widget_p, value_p):
+        widget = self._get(widget_p)
+        if widget.type in (_lib.GP_WIDGET_TEXT, _lib.GP_WIDGET_RADIO,
+                           _lib.GP_WIDGET_MENU):
+            widget.value = ffi.string(ffi.cast("const char*", value_p)
+                                      ).decode()
+        elif widget.type == _lib.GP_WIDGET_RANGE:
+            widget.value = ffi.cast("float*", value_p)[0]
+        elif widget.type in (_lib.GP_WIDGET_TOGGLE, _lib.GP_WIDGET_DATE):
+            widget.value = ffi.cast("int*", value_p)[0]
+        else:
+            return _lib.GP_ERROR_BAD_PARAMETERS
+        widget.changed = True
+        return _lib.GP_OK
+
+    def gp_widget_changed(self, widget_p):
+        return int(self._get(widget_p).changed)
+
+    def gp_widget_set_changed(self, widget_p, changed):
+        self._get(widget_p).changed = bool(changed)
+        return _lib.GP_OK
+
+    def gp_widget_get_range(self, widget_p, min_p, max_p, inc_p):
+        min_p[0], max_p[0], inc_p[0] = self._get(widget_p).range
+        return _lib.GP_OK
+
+    def gp_widget_count_choices(self, widget_p):
+        return len(self._get(widget_p).choices)
+
+    def gp_widget_get_choice(self, widget_p, idx, choice_p):
+        choice_p[0] = self._cstr(self._get(widget_p).choices[idx])
+        return _lib.GP_OK
+
+
+@contextlib.contextmanager
+def installed(library):
+    """ Context manager that routes all library calls of the bindings to
+        `library` while it is active.
+
+    Objects such as :py:class:`gphoto2cffi.Camera` must be created and used
+    within the block.
+
+    :param library:     Library to install
+    :type library:      :py:class:`SimulatedLibrary`
+    """
+    previous = backend.lib.use_library(library)
+    try:
+        yield library
+    finally:
+        backend.lib.use_library(previous)
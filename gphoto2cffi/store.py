@@ -0,0 +1,258 @@
+""" Content-addressed store that downloads every file only once.
+
+A :py:class:`DownloadStore` keeps the content of downloaded files as blobs
+named by their SHA-256 digest and hard-links them into any number of views,
+e.g. one per camera or per session. Before a file is transferred, a cheap
+key is computed from its name, size and modification time and, if the
+driver supports partial reads, a digest of its first and last bytes. Files
+whose key is already known are linked from the existing blob without
+touching the USB bus:
+
+.. code:: python
+
+    from gphoto2cffi import list_cameras, store
+
+    downloads = store.DownloadStore("/srv/offload")
+    for camera in list_cameras():
+        results = downloads.fetch_many(camera.list_all_files(),
+                                       view=camera.model_name)
+
+All paths below the root must be on the same filesystem, since blobs are
+hard-linked into the views.
+"""
+from __future__ import absolute_import, division, unicode_literals
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+from . import errors
+from .backend import ffi, lib
+from .util import SimpleNamespace
+
+
+class DownloadStore(object):
+    """ Content-addressed store for downloaded files.
+
+    :param root:        Directory of the store, created if necessary
+    :param probe_size:  Number of bytes from the start and the end of a file
+                        that are included in its key, `0` to only use its
+                        name, size and modification time
+    """
+    def __init__(self, root, probe_size=2**16):
+        self.root = root
+        self.probe_size = probe_size
+        for subdir in ("objects", "keys", "tmp", "views"):
+            path = os.path.join(root, subdir)
+            if not os.path.isdir(path):
+                os.makedirs(path)
+        self._lock = threading.Lock()
+        self._stats = {'downloaded': 0, 'deduplicated': 0,
+                       'bytes_downloaded': 0, 'bytes_saved': 0}
+
+    def fetch(self, fobj, view, ftype='normal', progress=None, cancel=None):
+        """ Make a file from the camera available in a view, downloading it
+            only if its content is not in the store yet.
+
+        :param fobj:        File to fetch
+        :type fobj:         :py:class:`gphoto2cffi.gphoto2.File`
+        :param view:        Name of the view, may contain slashes to create
+                            nested views
+        :type view:         str
+        :param ftype:       Type of the file, see :py:meth:`File.save`
+        :type ftype:        str
+        :param progress:    Passed on to :py:meth:`File.save` if the file
+                            has to be downloaded
+        :param cancel:      Passed on to :py:meth:`File.save`
+        :return:            Result with the attributes `path` (in the
+                            view, below the file's path on the camera),
+                            `digest`, `size` and `downloaded`
+                            (`False` if the content was already stored)
+        :rtype:             :py:class:`SimpleNamespace`
+        """
+        camera = fobj._cam
+        # Probe and download in a single session
+        with camera._lock:
+            try:
+                key = self._key(fobj, ftype)
+                digest = self._lookup(key)
+                downloaded = digest is None
+                if downloaded:
+                    digest = self._download(fobj, ftype, progress, cancel)
+                    self._remember(key, digest)
+            finally:
+                lib.gp_camera_exit(camera._cam, camera._ctx)
+        blob_path = self.blob_path(digest)
+        size = os.path.getsize(blob_path)
+        # Files with the same name in different folders get separate links
+        view_path = os.path.join(self.root, "views", view,
+                                 *fobj.path.strip("/").split("/"))
+        self._link(blob_path, view_path)
+        with self._lock:
+            if downloaded:
+                self._stats['downloaded'] += 1
+                self._stats['bytes_downloaded'] += size
+            else:
+                self._stats['deduplicated'] += 1
+                self._stats['bytes_saved'] += size
+        return SimpleNamespace(path=view_path, digest=digest, size=size,
+                               downloaded=downloaded)
+
+    def fetch_many(self, files, view, ftype='normal', progress=None,
+                   cancel=None):
+        """ Fetch multiple files into a view.
+
+        Errors for individual files are logged and do not abort the
+        remaining files. A cancelled transfer ends the batch.
+
+        :param files:   Files to fetch
+        :type files:    iterable of :py:class:`gphoto2cffi.gphoto2.File`
+        :return:        One result per file, see :py:meth:`fetch`, with an
+                        additional `error` attribute (`None` if the file
+                        was fetched)
+        :rtype:         list of :py:class:`SimpleNamespace`
+        """
+        results = []
+        for fobj in files:
+            try:
+                result = self.fetch(fobj, view, ftype, progress, cancel)
+                result.error = None
+            except errors.OperationCancelled as e:
+                results.append(SimpleNamespace(
+                    path=None, digest=None, size=0, downloaded=False,
+                    error=e))
+                break
+            except (errors.GPhoto2Error, ValueError, IOError, OSError) as e:
+                fobj._cam._logger.warning(
+                    "Could not fetch {0}: {1}".format(fobj.path, e))
+                result = SimpleNamespace(path=None, digest=None, size=0,
+                                         downloaded=False, error=e)
+            results.append(result)
+        return results
+
+    def blob_path(self, digest):
+        """ Get the path of the blob with the given digest. """
+        return os.path.join(self.root, "objects", digest[:2], digest[2:])
+
+    def stats(self):
+        """ Get the number of downloaded and deduplicated files and bytes.
+
+        :rtype: dict
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def _key(self, fobj, ftype):
+        """ Compute the pre-hash key of a file on the camera. """
+        # The camera only reports the size of the file itself, the size of
+        # e.g. its preview is not known before downloading it
+        fields = [fobj.name, ftype, fobj.size, fobj.last_modified.isoformat()]
+        if self.probe_size:
+            fields.append(self._probe(
+                fobj, ftype, fobj.size if ftype == 'normal' else None))
+        return hashlib.sha256(json.dumps(fields).encode()).hexdigest()
+
+    def _probe(self, fobj, ftype, size):
+        """ Digest the first and last bytes of a file with partial reads.
+
+        :param size:    Size of the data of the file type, `None` if it is
+                        unknown, in which case only the first bytes are
+                        included
+        :return:        Hex digest or `None` if partial reads are not
+                        supported
+        """
+        if size is None:
+            ranges = [(0, self.probe_size)]
+        elif size <= 2 * self.probe_size:
+            ranges = [(0, size)]
+        else:
+            ranges = [(0, self.probe_size),
+                      (size - self.probe_size, self.probe_size)]
+        digest = hashlib.sha256()
+        size_p = ffi.new("uint64_t*")
+        try:
+            with fobj._cam.native_pool.buffer(max(1, ranges[0][1])) as buf_p:
+                for offset, length in ranges:
+                    nread = fobj._read_chunk(offset, buf_p, size_p, ftype,
+                                             length)
+                    digest.update(ffi.buffer(buf_p, nread))
+        except errors.GPhoto2Error as e:
+            if e.error_code != lib.GP_ERROR_NOT_SUPPORTED:
+                raise
+            return None
+        return digest.hexdigest()
+
+    def _key_path(self, key):
+        return os.path.join(self.root, "keys", key[:2], key[2:])
+
+    def _lookup(self, key):
+        """ Get the digest of the content for a key, `None` if the key is
+            unknown or its blob is gone.
+        """
+        try:
+            with open(self._key_path(key)) as fp:
+                digest = fp.read().strip()
+        except (IOError, OSError):
+            return None
+        if not os.path.exists(self.blob_path(digest)):
+            return None
+        return digest
+
+    def _remember(self, key, digest):
+        self._write_atomically(self._key_path(key), digest.encode())
+
+    def _download(self, fobj, ftype, progress, cancel):
+        """ Download a file into the store.
+
+        :return:    Digest of the content
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.join(self.root, "tmp"))
+        os.close(fd)
+        try:
+            fobj._save(tmp_path, ftype, progress, cancel)
+            digest = hashlib.sha256()
+            with open(tmp_path, 'rb') as fp:
+                for chunk in iter(lambda: fp.read(2**20), b''):
+                    digest.update(chunk)
+            digest = digest.hexdigest()
+            blob_path = self.blob_path(digest)
+            if not os.path.exists(blob_path):
+                # Same content under a different key is stored only once
+                self._makedirs(os.path.dirname(blob_path))
+                os.rename(tmp_path, blob_path)
+            return digest
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    def _link(self, blob_path, view_path):
+        """ Hard-link a blob into a view, replacing an existing file. """
+        if (os.path.exists(view_path) and
+                os.path.samefile(blob_path, view_path)):
+            return
+        self._makedirs(os.path.dirname(view_path))
+        tmp_path = "{0}.{1}-{2}.tmp".format(view_path, os.getpid(),
+                                            threading.current_thread().ident)
+        os.link(blob_path, tmp_path)
+        os.rename(tmp_path, view_path)
+
+    def _write_atomically(self, path, data):
+        self._makedirs(os.path.dirname(path))
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.join(self.root, "tmp"))
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                fp.write(data)
+            os.rename(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @staticmethod
+    def _makedirs(path):
+        try:
+            os.makedirs(path)
+        except OSError:
+            if not os.path.isdir(path):
+                raise
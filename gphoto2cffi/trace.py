@@ -0,0 +1,296 @@
+""" Recording and replaying of libgphoto2 call traces.
+
+A :py:class:`TraceRecorder` writes every library call with its arguments,
+return code, duration and outputs to a gzip-compressed file of JSON lines.
+:py:class:`ReplayLibrary` serves the recorded results again, optionally with
+the original timings, so that slow code paths from the field can be profiled
+offline:
+
+.. code:: python
+
+    from gphoto2cffi import backend, trace, simulator
+
+    # On the rig
+    backend.lib.enable_recording("offload.trace.gz")
+    ...
+    backend.lib.disable_recording()
+
+    # At the desk
+    with simulator.installed(trace.ReplayLibrary("offload.trace.gz")):
+        ...
+
+Pointers to opaque libgphoto2 objects are recorded as plain identifiers and
+handed out again as such during replay, since they are never dereferenced
+on the Python side. Bulk payloads (file contents, preview frames) are only
+recorded by size and replayed as zero-filled buffers.
+"""
+from __future__ import division
+
+import base64
+import gzip
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+
+from ._backend import ffi, lib as _lib
+from .leaks import DESTRUCTORS
+
+#: Clock used for measuring call durations
+_clock = getattr(time, 'perf_counter', time.time)
+
+#: Functions whose `char**` output points to binary data of the length
+#: given by the following argument, rather than to a string.
+PAYLOAD_FUNCTIONS = ("gp_file_get_data_and_size",)
+
+_CHAR_TYPES = (ffi.typeof("char"),)
+
+LOGGER = logging.getLogger(__name__)
+
+
+def _is_char_pointer(ctype):
+    return ctype.kind == 'pointer' and ctype.item in _CHAR_TYPES
+
+
+def _handle(ptr):
+    return int(ffi.cast("uintptr_t", ptr))
+
+
+def _encode_bytes(data):
+    return base64.b64encode(data).decode('ascii')
+
+
+def _encode_arg(arg):
+    if isinstance(arg, ffi.CData):
+        if ffi.typeof(arg).kind == 'function':
+            return None
+        return _handle(arg)
+    elif isinstance(arg, bytes):
+        return arg.decode('utf8', 'replace')
+    return arg
+
+
+def _encode_rval(rval):
+    if not isinstance(rval, ffi.CData):
+        return rval
+    ctype = ffi.typeof(rval)
+    if rval == ffi.NULL:
+        return {"h": 0, "t": ctype.cname}
+    elif _is_char_pointer(ctype):
+        return {"s": ffi.string(rval).decode('utf8', 'replace')}
+    elif ctype.kind == 'pointer' and _is_char_pointer(ctype.item):
+        strings = []
+        for idx in range(64):
+            if rval[idx] == ffi.NULL:
+                break
+            strings.append(ffi.string(rval[idx]).decode('utf8', 'replace'))
+        return {"l": strings}
+    return {"h": _handle(rval), "t": ctype.cname}
+
+
+def _struct_size(ctype):
+    try:
+        return ffi.sizeof(ctype)
+    except Exception:
+        # Opaque type, the exception type differs between cffi backends
+        return None
+
+
+def _encode_outputs(name, args):
+    """ Capture the values the C function wrote into its pointer arguments.
+
+    :return:    List of `[index, kind, value]` entries
+    """
+    outputs = []
+    for idx, arg in enumerate(args):
+        if not isinstance(arg, ffi.CData):
+            continue
+        ctype = ffi.typeof(arg)
+        if ctype.kind != 'pointer':
+            continue
+        item = ctype.item
+        if name == "gp_camera_get_storageinfo" and idx == 1:
+            count = args[2][0]
+            outputs.append([idx, "a", _encode_bytes(ffi.buffer(
+                arg[0], count * ffi.sizeof(item.item))[:])])
+        elif name == "gp_camera_wait_for_event" and idx == 3:
+            if args[2][0] == _lib.GP_EVENT_FILE_ADDED:
+                path_p = ffi.cast("CameraFilePath*", arg[0])
+                outputs.append([idx, "e", _encode_bytes(
+                    ffi.buffer(path_p)[:])])
+        elif name in PAYLOAD_FUNCTIONS and _is_char_pointer(item):
+            outputs.append([idx, "p", int(args[idx + 1][0])])
+        elif _is_char_pointer(item):
+            outputs.append([idx, "s", (
+                None if arg[0] == ffi.NULL else
+                ffi.string(arg[0]).decode('utf8', 'replace'))])
+        elif item.kind == 'pointer':
+            outputs.append([idx, "h", _handle(arg[0])])
+        elif item.kind in ('primitive', 'enum'):
+            outputs.append([idx, "v", arg[0]])
+        elif item.kind == 'struct' and _struct_size(item) is not None:
+            outputs.append([idx, "b", _encode_bytes(ffi.buffer(arg)[:])])
+    return outputs
+
+
+class TraceRecorder(object):
+    """ Records library calls to a trace file.
+
+    Enable it with
+    :py:meth:`gphoto2cffi.backend.LibraryWrapper.enable_recording`.
+
+    :param path:    Path of the trace file to write
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._fp = gzip.open(path, 'wb')
+
+    def wrap(self, name, func):
+        """ Wrap a function so that its calls are recorded.
+
+        :param name:    Name of the C function
+        :param func:    Function to wrap
+        :return:        Wrapped function
+        """
+        def recorded(*args):
+            start = _clock()
+            rval = func(*args)
+            duration = _clock() - start
+            failed = isinstance(rval, int) and rval < 0
+            self.write({
+                "f": name, "a": [_encode_arg(a) for a in args],
+                "r": _encode_rval(rval), "t": round(duration, 6),
+                "o": [] if failed else _encode_outputs(name, args)})
+            return rval
+        return recorded
+
+    def write(self, record):
+        line = (json.dumps(record, separators=(',', ':')) + "\n").encode()
+        with self._lock:
+            if self._fp is not None:
+                self._fp.write(line)
+
+    def close(self):
+        """ Flush and close the trace file. """
+        with self._lock:
+            if self._fp is not None:
+                self._fp.close()
+                self._fp = None
+
+
+def load_trace(path):
+    """ Read the records of a trace file.
+
+    :param path:    Path of the trace file
+    :return:        Records in the order they were recorded
+    :rtype:         list of dict
+    """
+    with gzip.open(path, 'rb') as fp:
+        return [json.loads(line.decode()) for line in fp if line.strip()]
+
+
+class ReplayLibrary(object):
+    """ Library object that serves the results of a recorded trace.
+
+    Calls are matched to the recorded ones by function name, in the order
+    they were recorded. Calls for which no record is left fail with
+    `GP_ERROR_NOT_SUPPORTED`, except for those that free objects.
+
+    :param path:    Path of the trace file
+    :param speed:   Factor the recorded call durations are divided by,
+                    `None` to replay without any delays
+    """
+    def __init__(self, path, speed=1.0):
+        self.speed = speed
+        self._records = defaultdict(deque)
+        for record in load_trace(path):
+            self._records[record["f"]].append(record)
+        self._keepalive = deque(maxlen=4096)
+
+    def __getattr__(self, name):
+        if name.startswith("GP_"):
+            return getattr(_lib, name)
+        elif not name.startswith("gp_"):
+            raise AttributeError(name)
+
+        def replay(*args):
+            return self._replay(name, args)
+        replay.__name__ = str(name)
+        setattr(self, name, replay)
+        return replay
+
+    @property
+    def remaining(self):
+        """ Number of recorded calls that were not replayed yet, per
+            function.
+        """
+        return {name: len(records)
+                for name, records in self._records.items() if records}
+
+    def free(self, ptr):
+        """ Buffers handed over by replayed calls are kept alive by the
+            library itself, so this only consumes the recorded call.
+        """
+        records = self._records.get("free")
+        if records:
+            records.popleft()
+
+    def _keep(self, obj):
+        self._keepalive.append(obj)
+        return obj
+
+    def _replay(self, name, args):
+        records = self._records.get(name)
+        if not records:
+            LOGGER.debug("No recorded call left for {0}".format(name))
+            if name in DESTRUCTORS:
+                # Objects owned by garbage collected pointers are not
+                # necessarily freed at the same time as during recording
+                return _lib.GP_OK
+            return _lib.GP_ERROR_NOT_SUPPORTED
+        record = records.popleft()
+        if self.speed:
+            time.sleep(record["t"] / self.speed)
+        for idx, kind, value in record["o"]:
+            self._apply_output(args[idx], kind, value, args, idx)
+        return self._decode_rval(record["r"])
+
+    def _apply_output(self, arg, kind, value, args, idx):
+        item = ffi.typeof(arg).item
+        if kind == "h":
+            arg[0] = ffi.cast(item, value)
+        elif kind == "s":
+            arg[0] = (ffi.NULL if value is None else
+                      self._keep(ffi.new("char[]", value.encode())))
+        elif kind == "v":
+            arg[0] = value
+        elif kind == "b":
+            data = base64.b64decode(value)
+            ffi.memmove(arg, data, len(data))
+        elif kind == "p":
+            arg[0] = self._keep(ffi.new("char[]", max(value, 1)))
+        elif kind == "a":
+            data = base64.b64decode(value)
+            count = len(data) // ffi.sizeof(item.item)
+            array = self._keep(ffi.new(
+                "{0}[{1}]".format(item.item.cname, count)))
+            ffi.memmove(array, data, len(data))
+            arg[0] = array
+        elif kind == "e":
+            data = base64.b64decode(value)
+            path_p = self._keep(ffi.new("CameraFilePath*"))
+            ffi.memmove(path_p, data, len(data))
+            arg[0] = path_p
+
+    def _decode_rval(self, rval):
+        if not isinstance(rval, dict):
+            return rval
+        elif "s" in rval:
+            return self._keep(ffi.new("char[]", rval["s"].encode()))
+        elif "l" in rval:
+            strings = [self._keep(ffi.new("char[]", s.encode()))
+                       for s in rval["l"]]
+            return self._keep(ffi.new("const char*[]", strings + [ffi.NULL]))
+        return ffi.cast(rval["t"], rval["h"])
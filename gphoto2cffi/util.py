@@ -1,5 +1,18 @@
+import contextlib
+import heapq
+import itertools
+import os
+import threading
+
 from . import backend
 
+#: Lock priority for operations that may be pre-empted, e.g. live view
+PRIORITY_LOW = -10
+#: Default lock priority
+PRIORITY_NORMAL = 0
+#: Lock priority for latency-critical operations, e.g. capturing
+PRIORITY_HIGH = 10
+
 
 class SimpleNamespace(object):
     """ A simple :class:`object` subclass that provides attribute access to its
@@ -57,5 +70,304 @@ def new_gp_object(typename):
     :return:            A pointer to the specified data type.
     """
     obj_p = backend.ffi.new("{0}**".format(typename))
-    backend.CONSTRUCTORS[typename](obj_p)
+    getattr(backend.lib, backend.CONSTRUCTORS[typename])(obj_p)
     return obj_p[0]
+
+
+def free_gp_object(typename, obj):
+    """ Free a GPhoto2 object with its matching destructor function.
+
+    :param typename:    Name of the object's type
+    :param obj:         Pointer to the object
+    """
+    getattr(backend.lib, backend.DESTRUCTORS[typename])(obj)
+
+
+def gc_gp_object(typename, obj):
+    """ Tie the lifetime of a GPhoto2 object to the returned pointer, the
+        object is freed once the pointer is garbage collected.
+
+    :param typename:    Name of the object's type
+    :param obj:         Pointer to the object
+    :return:            Owning pointer to the object
+    """
+    return backend.ffi.gc(obj, getattr(backend.lib,
+                                       backend.DESTRUCTORS[typename]))
+
+
+@contextlib.contextmanager
+def gp_object(typename):
+    """ Context manager that creates a GPhoto2 object and frees it upon
+        leaving.
+
+    :param typename:    Name of the type to create.
+    :return:            A pointer to the specified data type.
+    """
+    obj = new_gp_object(typename)
+    try:
+        yield obj
+    finally:
+        free_gp_object(typename, obj)
+
+
+@contextlib.contextmanager
+def gp_file_from_fd(fileobj):
+    """ Context manager that creates a :c:type:`CameraFile` backed by a file
+        object and frees it upon leaving.
+
+    The :c:type:`CameraFile` works on a duplicate of the file descriptor,
+    since libgphoto2 closes the descriptor when the file is freed.
+
+    :param fileobj:     File object opened in binary mode
+    :return:            A pointer to the :c:type:`CameraFile`
+    """
+    camfile_p = backend.ffi.new("CameraFile**")
+    fd = os.dup(fileobj.fileno())
+    try:
+        backend.lib.gp_file_new_from_fd(camfile_p, fd)
+    except Exception:
+        os.close(fd)
+        raise
+    try:
+        yield camfile_p[0]
+    finally:
+        backend.lib.gp_file_free(camfile_p[0])
+
+
+class PooledFile(object):
+    """ A :c:type:`CameraFile` handed out by a :py:class:`NativePool`, along
+        with pointers to receive its data and size.
+    """
+    __slots__ = ('camfile', 'data_p', 'size_p')
+
+    def __init__(self, camfile):
+        self.camfile = camfile
+        self.data_p = backend.ffi.new("char**")
+        self.size_p = backend.ffi.new("unsigned long*")
+
+    def get_data(self):
+        """ Copy the content of the file.
+
+        :rtype: bytes
+        """
+        backend.lib.gp_file_get_data_and_size(self.camfile, self.data_p,
+                                              self.size_p)
+        return backend.ffi.buffer(self.data_p[0], self.size_p[0])[:]
+
+
+class NativePool(object):
+    """ Pool of reusable :c:type:`CameraFile` handles and chunk buffers.
+
+    Idle objects are kept up to the configured limits, anything beyond is
+    freed when it is returned. Buffer sizes are rounded up to multiples of
+    :py:attr:`BUFFER_ALIGNMENT`, so that requests for similar sizes can
+    share buffers.
+
+    :param max_files:           Maximum number of idle camera files
+    :param max_buffer_bytes:    Maximum total size of idle buffers
+    """
+    #: Granularity of buffer sizes in bytes
+    BUFFER_ALIGNMENT = 2**16
+
+    def __init__(self, max_files=4, max_buffer_bytes=2**25):
+        self.max_files = max_files
+        self.max_buffer_bytes = max_buffer_bytes
+        self._lock = threading.Lock()
+        self._files = []
+        self._buffers = {}
+        self._buffer_bytes = 0
+
+    @contextlib.contextmanager
+    def camera_file(self):
+        """ Context manager that borrows an empty in-memory camera file.
+
+        :return:    The borrowed file
+        :rtype:     :py:class:`PooledFile`
+        """
+        with self._lock:
+            pooled = self._files.pop() if self._files else None
+        if pooled is None:
+            pooled = PooledFile(new_gp_object("CameraFile"))
+        try:
+            yield pooled
+        finally:
+            self._put_file(pooled)
+
+    @contextlib.contextmanager
+    def buffer(self, size):
+        """ Context manager that borrows a buffer of at least the given size.
+
+        :param size:    Minimum size in bytes
+        :return:        The borrowed `char[]` buffer
+        """
+        buf = self.take_buffer(size)
+        try:
+            yield buf
+        finally:
+            self.put_buffer(buf)
+
+    def take_buffer(self, size):
+        """ Borrow a buffer of at least the given size, to be returned with
+            :py:meth:`put_buffer`.
+
+        :param size:    Minimum size in bytes
+        :return:        `char[]` buffer
+        """
+        size = -(-size // self.BUFFER_ALIGNMENT) * self.BUFFER_ALIGNMENT
+        with self._lock:
+            idle = self._buffers.get(size)
+            if idle:
+                self._buffer_bytes -= size
+                return idle.pop()
+        return backend.ffi.new("char[]", size)
+
+    def put_buffer(self, buf):
+        """ Return a buffer borrowed with :py:meth:`take_buffer`. """
+        size = len(buf)
+        with self._lock:
+            if self._buffer_bytes + size <= self.max_buffer_bytes:
+                self._buffers.setdefault(size, []).append(buf)
+                self._buffer_bytes += size
+
+    def clear(self):
+        """ Free all idle objects. """
+        with self._lock:
+            files, self._files = self._files, []
+            self._buffers.clear()
+            self._buffer_bytes = 0
+        for pooled in files:
+            free_gp_object("CameraFile", pooled.camfile)
+
+    def _put_file(self, pooled):
+        keep = False
+        try:
+            backend.lib.gp_file_clean(pooled.camfile)
+            with self._lock:
+                if len(self._files) < self.max_files:
+                    self._files.append(pooled)
+                    keep = True
+        finally:
+            if not keep:
+                free_gp_object("CameraFile", pooled.camfile)
+
+
+class PriorityRLock(object):
+    """ Reentrant lock that grants access by priority and, within the same
+        priority, in the order it was requested.
+
+    Unlike :py:class:`threading.RLock`, waiting threads are served fairly,
+    so a thread that repeatedly acquires the lock cannot starve others.
+    """
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._owner = None
+        self._count = 0
+        self._priority = None
+        self._waiters = []
+        self._tickets = itertools.count()
+
+    def acquire(self, priority=PRIORITY_NORMAL, blocking=True):
+        """ Acquire the lock, blocking until it is available.
+
+        :param priority:    Priority of the request, higher values are
+                            served first
+        :type priority:     int
+        :param blocking:    Return right away if the lock is held or
+                            requested by another thread
+        :type blocking:     bool
+        :return:            Whether the lock was acquired
+        :rtype:             bool
+        """
+        me = threading.current_thread()
+        with self._cond:
+            if self._owner is me:
+                self._count += 1
+                return True
+            if not blocking:
+                if self._owner is not None or self._waiters:
+                    return False
+                self._owner, self._count, self._priority = me, 1, priority
+                return True
+            entry = (-priority, next(self._tickets))
+            heapq.heappush(self._waiters, entry)
+            acquired = False
+            try:
+                while self._owner is not None or self._waiters[0] != entry:
+                    self._cond.wait()
+                acquired = True
+            finally:
+                if acquired:
+                    heapq.heappop(self._waiters)
+                else:
+                    # Interrupted, e.g. by KeyboardInterrupt, the next
+                    # waiter must not be blocked by the stale entry
+                    self._waiters.remove(entry)
+                    heapq.heapify(self._waiters)
+                    self._cond.notify_all()
+            self._owner, self._count, self._priority = me, 1, priority
+            return True
+
+    def release(self):
+        """ Release the lock. """
+        with self._cond:
+            if self._owner is not threading.current_thread():
+                raise RuntimeError("Cannot release un-acquired lock.")
+            self._count -= 1
+            if not self._count:
+                self._owner = self._priority = None
+                self._cond.notify_all()
+
+    @property
+    def preempt_requested(self):
+        """ Whether a request with a higher priority than the current
+            holder's is waiting for the lock.
+        """
+        with self._cond:
+            return (self._owner is not None and bool(self._waiters) and
+                    -self._waiters[0][0] > self._priority)
+
+    def yield_if_preempted(self):
+        """ Temporarily give up the lock if a request with a higher priority
+            is waiting, and re-acquire it once that request was served.
+
+        Must only be called by the thread holding the lock.
+
+        :return:    Whether the lock was given up
+        :rtype:     bool
+        """
+        if not self.preempt_requested:
+            return False
+        with self._cond:
+            count, priority = self._count, self._priority
+            self._count = 1
+        self.release()
+        self.acquire(priority)
+        with self._cond:
+            self._count = count
+        return True
+
+    def held(self, priority=PRIORITY_NORMAL):
+        """ Get a context manager that holds the lock with the given
+            priority.
+        """
+        return _HeldLock(self, priority)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+
+class _HeldLock(object):
+    def __init__(self, lock, priority):
+        self.lock = lock
+        self.priority = priority
+
+    def __enter__(self):
+        self.lock.acquire(self.priority)
+        return self.lock
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.lock.release()
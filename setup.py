@@ -41,6 +41,7 @@ setup(
     packages=['gphoto2cffi'],
     include_package_data=True,
     setup_requires=['cffi >= 1.4'],
+    # Building needs libgphoto2 >= 2.5.10 (gp_camera_get_single_config)
     cffi_modules=['gphoto2cffi/backend_build.py:ffi'],
     install_requires=REQUIRES,
     zip_safe=False,
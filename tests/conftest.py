@@ -0,0 +1,24 @@
+import pytest
+
+import gphoto2cffi as gp
+from gphoto2cffi import simulator
+
+
+@pytest.fixture
+def simcam():
+    return simulator.SimulatedCamera(num_files=6, file_size=20000,
+                                     files_per_folder=3)
+
+
+@pytest.fixture
+def sim(simcam):
+    library = simulator.SimulatedLibrary(cameras=[simcam])
+    with simulator.installed(library):
+        yield library
+
+
+@pytest.fixture
+def camera(sim, simcam):
+    cam = gp.Camera(*simcam.usb_address)
+    yield cam
+    cam.close()
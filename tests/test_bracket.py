@@ -0,0 +1,44 @@
+import pytest
+
+EVS = ["-2", "-1", "0", "1", "2"]
+
+
+def current(simcam, name):
+    return simcam.setting(name).value
+
+
+def test_bracket_to_memory(sim, simcam, camera):
+    images = camera.bracket("exposurecompensation", EVS)
+    assert len(images) == len(EVS)
+    assert all(image.startswith(b"\xff\xd8") for image in images)
+    assert sim.calls["gp_camera_trigger_capture"] == len(EVS)
+    # Downloaded images are removed from the camera's RAM
+    assert list(simcam.folders[simcam.ram_folder]) == []
+    assert current(simcam, "exposurecompensation") == "0"
+
+
+def test_bracket_to_camera_storage(simcam, camera):
+    files = camera.bracket("shutterspeed", ["1/60", "1/125", "1/250"],
+                           to_camera_storage=True, restore=False)
+    assert [f.name for f in files] == ["IMG_0007.JPG", "IMG_0008.JPG",
+                                       "IMG_0009.JPG"]
+    assert current(simcam, "shutterspeed") == "1/250"
+    assert current(simcam, "capturetarget") == "Internal RAM"
+
+
+def test_bracket_validates_first(sim, camera):
+    with pytest.raises(ValueError):
+        camera.bracket("exposurecompensation", ["0", "42"])
+    with pytest.raises(ValueError):
+        camera.bracket("nosuchoption", ["0"])
+    assert "gp_camera_trigger_capture" not in sim.calls
+
+
+def test_bracket_restores_on_error(sim, simcam, camera):
+    def broken(*args):
+        return sim.GP_ERROR_IO
+    sim.gp_camera_trigger_capture = broken
+    with pytest.raises(Exception):
+        camera.bracket("exposurecompensation", EVS, to_camera_storage=True)
+    assert current(simcam, "exposurecompensation") == "0"
+    assert current(simcam, "capturetarget") == "Internal RAM"
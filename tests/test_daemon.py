@@ -0,0 +1,51 @@
+import sys
+
+import pytest
+
+pytestmark = pytest.mark.skipif(sys.version_info < (3,),
+                                reason="The daemon requires Python 3")
+
+
+@pytest.fixture
+def client(tmpdir, camera):
+    from gphoto2cffi import daemon
+    socket_path = str(tmpdir.join("daemon.sock"))
+    server = daemon.CameraDaemon(socket_path, cameras=[camera])
+    thread = server.start()
+    client = daemon.CameraClient(socket_path)
+    yield client
+    client.close()
+    server.shutdown()
+    thread.join()
+
+
+def test_list(client):
+    assert client.list() == [{'id': "usb:001,001",
+                              'model': "Simulated Camera"}]
+
+
+def test_download(client, camera):
+    paths = client.list_files("usb:001,001")
+    assert paths == [f.path for f in camera.list_all_files()]
+    data = client.download("usb:001,001", paths[0])
+    assert data[:] == camera._file_from_path(paths[0]).get_data()
+
+
+def test_capture_and_preview(client):
+    assert client.capture("usb:001,001")[:2] == b"\xff\xd8"
+    assert client.preview("usb:001,001")[:2] == b"\xff\xd8"
+
+
+def test_config(client, simcam):
+    client.set_config("usb:001,001", "imgsettings", "iso", "400")
+    assert client.config("usb:001,001")['imgsettings']['iso']['value'] == \
+        "400"
+    assert simcam.setting("iso").value == "400"
+
+
+def test_errors_are_reported(client):
+    from gphoto2cffi import daemon
+    with pytest.raises(daemon.DaemonError):
+        client.download("usb:001,001", "/store_00010001/nope.jpg")
+    # The connection is still usable
+    assert len(client.list()) == 1
@@ -0,0 +1,70 @@
+import os
+
+import pytest
+
+from gphoto2cffi import errors
+
+FOLDER_A = "/store_00010001/DCIM/100SIMUL"
+FOLDER_B = "/store_00010001/DCIM/101SIMUL"
+
+
+def test_remove_files(sim, simcam, camera):
+    files = list(camera.list_all_files())
+    doomed = [f for f in files if f.directory.path == FOLDER_A] + files[3:4]
+    assert camera.remove_files(doomed) == []
+    assert list(simcam.folders[FOLDER_A]) == []
+    assert len(simcam.folders[FOLDER_B]) == 2
+    # The complete folder was purged at once
+    assert sim.calls.get("gp_camera_folder_delete_all") == 1
+    assert sim.calls.get("gp_camera_file_delete") == 1
+    assert len(list(camera.list_all_files())) == 2
+
+
+def test_remove_files_reports_errors(simcam, camera):
+    files = list(camera.list_all_files())
+    del simcam.folders[FOLDER_B]
+    failed = camera.remove_files(files)
+    assert sorted(f.path for f, _ in failed) == sorted(
+        f.path for f in files if f.directory.path == FOLDER_B)
+    assert all(isinstance(e, errors.GPhoto2Error) for _, e in failed)
+    assert list(simcam.folders[FOLDER_A]) == []
+
+
+def test_upload_many(tmpdir, simcam, camera):
+    paths = []
+    for idx in range(3):
+        path = tmpdir.join("upload{0}.jpg".format(idx))
+        path.write_binary(os.urandom(5000 + idx))
+        paths.append(str(path))
+    paths.append(str(tmpdir.join("missing.jpg")))
+    directory = camera._directory_from_path(FOLDER_B)
+    progress = []
+    results = directory.upload_many(paths, progress=progress.append)
+    assert [r.path for r in results] == paths
+    for path, result in zip(paths[:3], results):
+        assert result.error is None
+        assert result.size == os.path.getsize(path)
+        with open(path, 'rb') as fp:
+            stored = simcam.folders[FOLDER_B][os.path.basename(path)]
+            assert stored.data == fp.read()
+    assert isinstance(results[3].error, (IOError, OSError))
+    assert progress
+
+
+def test_save_streaming(tmpdir, camera):
+    fobj = next(iter(camera.list_all_files()))
+    target = str(tmpdir.join("streamed.jpg"))
+    fobj.save_streaming(target, chunk_size=4096)
+    with open(target, 'rb') as fp:
+        assert fp.read() == fobj.get_data()
+
+
+def test_save_streaming_returns_buffers(tmpdir, sim, camera):
+    fobj = next(iter(camera.list_all_files()))
+    assert fobj.size
+    del sim.cameras[0].folders[fobj.directory.path][fobj.name]
+    with pytest.raises(errors.GPhoto2Error):
+        fobj.save_streaming(str(tmpdir.join("x")), chunk_size=4096,
+                            num_buffers=2)
+    assert sum(len(bufs)
+               for bufs in camera.native_pool._buffers.values()) == 2
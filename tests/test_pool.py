@@ -0,0 +1,54 @@
+import time
+
+import pytest
+
+from gphoto2cffi import errors, pool
+
+
+@pytest.fixture
+def camera_pool(sim):
+    camera_pool = pool.CameraPool(max_idle=0, check_after=60)
+    yield camera_pool
+    camera_pool.close()
+
+
+def test_lease_reuses_camera(camera_pool):
+    with camera_pool.lease(1, 1) as first:
+        with camera_pool.lease(1, 1) as second:
+            assert second is first
+            assert camera_pool.stats()[(1, 1)]['leases'] == 2
+        assert camera_pool.stats()[(1, 1)]['leases'] == 1
+    assert camera_pool.stats()[(1, 1)]['leases'] == 0
+
+
+def test_release_twice(camera_pool):
+    lease = camera_pool.lease(1, 1)
+    other = camera_pool.lease(1, 1)
+    lease.release()
+    lease.release()
+    assert camera_pool.stats()[(1, 1)]['leases'] == 1
+    other.release()
+
+
+def test_release_after_close(camera_pool):
+    lease = camera_pool.lease(1, 1)
+    camera_pool.close()
+    lease.release()
+    assert camera_pool.stats() == {}
+
+
+def test_model_mismatch_keeps_leased_camera(camera_pool):
+    with camera_pool.lease(1, 1) as camera:
+        with pytest.raises(errors.UnsupportedDevice):
+            camera_pool.lease(1, 1, model="Other Camera")
+        assert camera_pool.stats()[(1, 1)]['leases'] == 1
+        assert len(list(camera.list_all_files())) == 6
+
+
+def test_evict_idle(camera_pool):
+    with camera_pool.lease(1, 1):
+        time.sleep(0.01)
+        assert camera_pool.evict_idle() == 0
+    time.sleep(0.01)
+    assert camera_pool.evict_idle() == 1
+    assert camera_pool.stats() == {}
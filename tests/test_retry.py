@@ -0,0 +1,60 @@
+import pytest
+
+from gphoto2cffi import errors, retry
+from gphoto2cffi.backend import lib
+
+
+def fail_first(sim, name, times, errcode=lib.GP_ERROR_CAMERA_BUSY):
+    """ Let the first calls of a simulated function fail. """
+    func = getattr(sim, name)
+    calls = []
+
+    def flaky(*args):
+        calls.append(args)
+        if len(calls) <= times:
+            return errcode
+        return func(*args)
+    setattr(sim, name, flaky)
+    return calls
+
+
+@pytest.fixture
+def policy(sim):
+    policy = lib.enable_retries(retry.RetryPolicy(base_delay=0.001))
+    yield policy
+    lib.disable_retries()
+
+
+def test_transient_error_is_retried(policy, sim, camera):
+    calls = fail_first(sim, "gp_camera_folder_list_files", 2)
+    assert len(list(camera.list_all_files())) == 6
+    stats = policy.snapshot()["gp_camera_folder_list_files"]
+    assert stats['retries'] == 2
+    assert stats['recovered'] == 1
+    assert len(calls) > 2
+
+
+def test_gives_up_after_max_attempts(policy, sim, camera):
+    policy.max_attempts = 3
+    calls = fail_first(sim, "gp_camera_folder_list_files", 10)
+    with pytest.raises(errors.CameraBusy):
+        list(camera.list_all_files())
+    assert len(calls) == 3
+    assert policy.snapshot()["gp_camera_folder_list_files"]['failures'] == 1
+
+
+def test_permanent_error_is_not_retried(policy, sim, camera):
+    calls = fail_first(sim, "gp_camera_folder_list_files", 1,
+                       lib.GP_ERROR_DIRECTORY_NOT_FOUND)
+    with pytest.raises(errors.GPhoto2Error):
+        list(camera.list_all_files())
+    assert len(calls) == 1
+    assert policy.snapshot() == {}
+
+
+def test_deletion_is_not_retried(policy, sim, camera):
+    fobj = next(iter(camera.list_all_files()))
+    calls = fail_first(sim, "gp_camera_file_delete", 1)
+    with pytest.raises(errors.CameraBusy):
+        fobj.remove()
+    assert len(calls) == 1
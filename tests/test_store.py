@@ -0,0 +1,59 @@
+import os
+
+import pytest
+
+from gphoto2cffi import store
+
+
+@pytest.fixture
+def download_store(tmpdir):
+    return store.DownloadStore(str(tmpdir.join("store")), probe_size=1024)
+
+
+def test_fetch_deduplicates(download_store, sim, camera):
+    fobj = next(iter(camera.list_all_files()))
+    first = download_store.fetch(fobj, "session1")
+    reads = sim.calls.get("gp_camera_file_get", 0)
+    second = download_store.fetch(fobj, "session2")
+    assert first.downloaded and not second.downloaded
+    assert first.digest == second.digest
+    assert sim.calls.get("gp_camera_file_get", 0) == reads
+    assert os.path.samefile(first.path, second.path)
+    assert second.path.endswith(os.path.join("session2", *fobj.path.split(
+        "/")))
+    with open(second.path, 'rb') as fp:
+        assert fp.read() == fobj.get_data()
+    stats = download_store.stats()
+    assert stats['downloaded'] == 1
+    assert stats['deduplicated'] == 1
+    assert stats['bytes_saved'] == fobj.size
+
+
+def test_fetch_same_name_in_different_folders(download_store, simcam,
+                                              camera):
+    data = b"\xff\xd8" + os.urandom(3000)
+    simcam.add_file("/store_00010001/DCIM/100SIMUL", "SAME.JPG", data)
+    simcam.add_file("/store_00010001/DCIM/101SIMUL", "SAME.JPG", data[::-1])
+    files = [f for f in camera.list_all_files() if f.name == "SAME.JPG"]
+    results = download_store.fetch_many(files, "view")
+    assert [r.error for r in results] == [None, None]
+    assert results[0].path != results[1].path
+    assert results[0].digest != results[1].digest
+
+
+def test_fetch_preview(download_store, camera):
+    fobj = next(iter(camera.list_all_files()))
+    full = download_store.fetch(fobj, "full")
+    preview = download_store.fetch(fobj, "preview", ftype='preview')
+    assert preview.downloaded
+    assert preview.digest != full.digest
+    assert not download_store.fetch(fobj, "preview2",
+                                    ftype='preview').downloaded
+
+
+def test_fetch_many_records_errors(download_store, simcam, camera):
+    files = list(camera.list_all_files())[:2]
+    del simcam.folders[files[0].directory.path][files[0].name]
+    results = download_store.fetch_many(files, "view")
+    assert results[0].error is not None
+    assert results[1].error is None and results[1].downloaded